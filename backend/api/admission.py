@@ -0,0 +1,106 @@
+"""
+Admission control for ``/api/llm-advice``.
+
+Without a limit, requests keep piling up behind an exhausted upstream until
+the proxy times out or the process runs out of memory. The controller counts
+assessments in flight and looks at the LLM calls already waiting in the
+scheduler. A new assessment is shed when
+
+- the number of assessments in flight reached ``max_in_flight``;
+- the number of queued LLM calls reached ``max_queued_calls``; or
+- the queued calls would take longer than ``slo_seconds`` to drain at the
+  current capacity and typical call latency.
+
+Shed requests are either rejected (503 with ``Retry-After``) or diverted to
+the background path (template advice now, the LLM report on the next fetch),
+depending on ``overflow``.
+
+Environment:
+    LLM_ADMISSION_MAX_IN_FLIGHT      assessments generating at once (default 64)
+    LLM_ADMISSION_MAX_QUEUED_CALLS   LLM calls waiting for a slot (default 1024)
+    LLM_ADMISSION_SLO_S              longest acceptable queue wait (default 30)
+    LLM_ADMISSION_OVERFLOW           "reject" (default) or "divert"
+    LLM_ADMISSION_MAX_DIVERTED       background reports pending before diverting turns into rejecting (default 200)
+"""
+
+import math
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+ADMIT = "admit"
+REJECT = "reject"
+DIVERT = "divert"
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_in_flight: int = 64,
+        max_queued_calls: int = 1024,
+        slo_seconds: float = 30.0,
+        overflow: str = REJECT,
+        max_diverted: int = 200,
+    ) -> None:
+        if overflow not in (REJECT, DIVERT):
+            raise ValueError(f"LLM_ADMISSION_OVERFLOW must be '{REJECT}' or '{DIVERT}', got {overflow!r}")
+        self.max_in_flight = max_in_flight
+        self.max_queued_calls = max_queued_calls
+        self.slo_seconds = slo_seconds
+        self.overflow = overflow
+        self.max_diverted = max_diverted
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.diverted = 0
+        self.shed_reasons: Dict[str, int] = {"in_flight": 0, "queue": 0, "slo": 0}
+        self.retry_after = 1
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            max_in_flight=int(os.getenv("LLM_ADMISSION_MAX_IN_FLIGHT", 64)),
+            max_queued_calls=int(os.getenv("LLM_ADMISSION_MAX_QUEUED_CALLS", 1024)),
+            slo_seconds=float(os.getenv("LLM_ADMISSION_SLO_S", 30)),
+            overflow=os.getenv("LLM_ADMISSION_OVERFLOW", REJECT).lower(),
+            max_diverted=int(os.getenv("LLM_ADMISSION_MAX_DIVERTED", 200)),
+        )
+
+    def decide(self, queued_calls: int, capacity: int, call_latency: float, pending_diverted: int = 0) -> str:
+        """Admit, reject or divert a new assessment given the current LLM queue."""
+        expected_wait = queued_calls / max(capacity, 1) * call_latency
+        if self.in_flight >= self.max_in_flight:
+            reason = "in_flight"
+        elif queued_calls >= self.max_queued_calls:
+            reason = "queue"
+        elif expected_wait > self.slo_seconds:
+            reason = "slo"
+        else:
+            return ADMIT
+        self.shed_reasons[reason] += 1
+        # Tell clients to come back roughly when the current queue has drained
+        self.retry_after = max(1, min(300, math.ceil(expected_wait)))
+        if self.overflow == DIVERT and pending_diverted < self.max_diverted:
+            self.diverted += 1
+            return DIVERT
+        self.rejected += 1
+        return REJECT
+
+    @contextmanager
+    def admitted_request(self) -> Iterator[None]:
+        self.in_flight += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "overflow": self.overflow,
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "diverted": self.diverted,
+            "shed_reasons": dict(self.shed_reasons),
+        }
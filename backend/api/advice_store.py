@@ -0,0 +1,144 @@
+"""
+Store of precomputed advice, consulted before calling the LLM.
+
+Advice for a question depends only on the business profile, the question id
+and text, its (re-weighted) category and the user's answer, as long as the
+user wrote no ``additionalText``. Those combinations are few, so the frequent
+ones can be generated offline (see ``backend/precompute_advice.py``) and
+served without any LLM latency.
+
+``TrafficRecorder`` writes the anonymised combinations seen by the live
+service to a JSONL file, which is the input of the precompute job. The
+combinations hold exactly the prompt inputs (the canonical profile as the
+system prompt shows it, the question text), so the job rebuilds the prompt
+the live path would send.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from .background_writer import BackgroundWriter
+
+PROFILE_FIELDS = ("industry", "business_challenge", "service_type", "revenue_type")
+
+
+def prompt_profile(business_profile: Dict[str, str]) -> Dict[str, str]:
+    """The profile fields that end up in the system prompt, as they appear there."""
+    return {field: str(business_profile.get(field, "N/A")) for field in PROFILE_FIELDS}
+
+
+def is_precomputable(q_data: Dict[str, Any]) -> bool:
+    """Free-text answers make the prompt unique, so only plain option answers are precomputed."""
+    return not str(q_data.get("additionalText", "") or "").strip()
+
+
+def combination(business_profile: Dict[str, str], q_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Everything that determines the advice for a precomputable question."""
+    return {
+        "profile": prompt_profile(business_profile),
+        "question_id": q_data["question_id"],
+        "question": q_data.get("question", ""),
+        "new_category": q_data["new_category"],
+        "catmapping": q_data.get("catmapping", ""),
+        "anwser": q_data.get("anwser", "N/A"),
+    }
+
+
+def advice_key(business_profile: Dict[str, str], q_data: Dict[str, Any]) -> str:
+    payload = json.dumps(combination(business_profile, q_data), sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AdviceStore:
+    """SQLite key/value store of advice text, safe to share between threads and processes."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS advice ("
+                "key TEXT PRIMARY KEY, advice TEXT NOT NULL, meta TEXT, created_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        # Called from worker threads: count under the lock as well
+        with self._lock:
+            row = self._conn.execute("SELECT advice FROM advice WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row[0]
+
+    def put(self, key: str, advice: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO advice (key, advice, meta, created_at) VALUES (?, ?, ?, ?)",
+                (key, advice, json.dumps(meta) if meta is not None else None, time.time()),
+            )
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM advice WHERE key = ?", (key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM advice").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class TrafficRecorder:
+    """Append anonymised question combinations (no user ids, no free text) to a JSONL file.
+
+    ``record`` only queues the lines; a writer thread appends them, so the
+    request handler never waits on the file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._writer: BackgroundWriter[str] = BackgroundWriter(self._append, name="traffic-recorder")
+
+    def record(self, business_profile: Dict[str, str], questions: Any) -> None:
+        lines = [
+            json.dumps(combination(business_profile, q), sort_keys=True)
+            for q in questions
+            if is_precomputable(q)
+        ]
+        if lines:
+            self._writer.put("\n".join(lines) + "\n")
+
+    def _append(self, chunks: List[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(chunks))
+
+    def close(self) -> None:
+        """Write out everything recorded so far and stop the writer."""
+        self._writer.close()
+
+
+def read_traffic(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
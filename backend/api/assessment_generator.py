@@ -0,0 +1,235 @@
+"""
+Seeded generator of realistic /api/llm-advice payloads for load tests and benchmarks.
+
+Payloads have the shape ``generateNewJsonFormat`` in
+``frontend/components/assessment-flow.tsx`` sends: the serviceOffering block
+(industry and challenge as free text, then R1..R16 with the option letter in
+``anwserselete``) and the six pillar sections with their 34 questions, each
+with ``question_name`` (pillar prefix + counter), ``category``, the phase in
+``catmapping`` (``CATEGORY_MAPPING`` in ``frontend/lib/score-calculator.ts``)
+and the score of the chosen answer. Keep the tables below in step with those
+two files.
+
+The same seed gives the same sequence of payloads. Answers are drawn from
+``answer_weights`` and a share of answers (``text_rate``) carries free text.
+
+Environment (``AssessmentGenerator.from_env``, used by locustfile.py):
+    ASSESSMENT_SEED            seed of the payload sequence (default 0)
+    ASSESSMENT_ANSWER_WEIGHTS  e.g. "Strongly Disagree=1,Disagree=2,N/A=1,Agree=4,Strongly Agree=2"
+    ASSESSMENT_TEXT_RATE       share of answers with additionalText (default 0.3)
+"""
+
+import os
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+SCORE_MAPPING: Dict[str, int] = {
+    "Strongly Disagree": -2,
+    "Disagree": -1,
+    "N/A": 0,
+    "Agree": 1,
+    "Strongly Agree": 2,
+}
+
+# Skewed towards agreeing, as self-assessments are
+DEFAULT_ANSWER_WEIGHTS: Dict[str, float] = {
+    "Strongly Disagree": 1.0,
+    "Disagree": 2.0,
+    "N/A": 0.5,
+    "Agree": 4.0,
+    "Strongly Agree": 2.5,
+}
+
+# The R-questions, in the order they are numbered R1..R16
+SERVICE_OFFERING_QUESTIONS: List[Tuple[str, str, List[str]]] = [
+    ("service-type", "How would you describe what you offer?", ["Service", "Platform", "Product"]),
+    ("opportunity-type", "How would you describe the opportunity you have?", ["First mover", "Disruptor", "Competitive"]),
+    ("concerns", "What keeps you awake at night?", ["Cashflow", "Readiness of your offering", "Customer Acquisition"]),
+    ("growth-route", "What do you believe is your best route to growth?", ["Marketing", "Direct Sales", "Sales via a partner"]),
+    ("business-age", "How long has your business been trading?", ["Less than 3 years", "3-5 years", "5 years plus"]),
+    ("business-size-employees", "How big is your business? (Employees)", ["5 people or less", "5-15 people", "15 people or more"]),
+    ("business-size-revenue", "How big is your business? (Annual Revenue)", ["Less than £1m", "£1m - £2.5m", "£2.5m"]),
+    ("paying-clients", "How many paying clients do you have?", ["3 or less", "4 to 8", "9 plus"]),
+    ("biggest-client-revenue", "How much of your revenue does your biggest client account for?", [">50%", "25-50%", "<25%"]),
+    ("revenue-type", "What sort of revenue do you mainly have currently?", ["One-off fees", "Monthly recurring revenue", "Multi-year recurring revenue"]),
+    ("funding-status", "How are you currently funded?", ["Bootstrapped", "Seed Funded", "Series A & beyond"]),
+    ("revenue-targets", "What are your revenue targets in the next year?", ["50%+ growth", "100%+ growth", "200%+ growth"]),
+    ("growth-ambitions", "What are your growth ambitions in the next three years?", ["Not even contemplated", "Regular, Steady growth", "Explosive growth"]),
+    ("clients-needed", "How many more clients do you need to achieve those growth ambitions?", ["1 to 2", "3 to 6", "7+"]),
+    ("preferred-revenue", "What sort of revenue would you be happy with as the majority of your earnings?", ["One-off fees", "Monthly recurring revenue", "Multi-year recurring revenue"]),
+    ("funding-plans", "What are your future funding plans?", ["Self-funded from here", "VC / Angel Investment", "Sale of company"]),
+]
+
+# (section name, question prefix, category, [(question id, phase, question)])
+PILLARS: List[Tuple[str, str, str, List[Tuple[str, str, str]]]] = [
+    ("Base camp for success (go to market GTM)", "GTM", "go to market", [
+        ("target-niche", "Profitable", "We know exactly which niche sector(s), and in which geographies, to target"),
+        ("pinpoint-clients", "Profitable", "We could pinpoint specific clients right now who need our offering"),
+        ("targeted-pipeline", "Repeatable", "We've purposely targeted the clients in our pipeline because they all share the same characteristics"),
+        ("know-buyers", "Profitable", "We know exactly who the typical buyers, influencers & decision-makers are for our offering"),
+        ("clear-problems", "Profitable", "We are clear on the specific problems we solve and can articulate that to everyone we speak to"),
+        ("proven-approach", "Profitable", "We have a proven approach to secure new clients who we've never even spoken to before"),
+        ("partners-resellers", "Scalable", "We use partners or resellers effectively to help achieve our revenue goals"),
+        ("account-management", "Scalable", "We're in control of our biggest accounts and have a structured approach to account management"),
+        ("global-growth", "Scalable", "We want to, and have a clear plan for how to, grow our service offering globally"),
+        ("know-competitors", "Profitable", "We know who all of our competitors are and can articulate how our offering differs to theirs"),
+    ]),
+    ("Tracking the climb (Performance Metrics PM)", "PM", "performance metrics", [
+        ("commercial-performance", "Profitable", "We have a good grasp of our current commercial performance including revenue, gross profit, average deal value"),
+        ("revenue-profit-targets", "Profitable", "Everyone, that needs to know, has clarity on what our revenue & profit targets are for this current financial year"),
+        ("pipeline-management", "Profitable", "Our pipeline is managed by stages in a sales funnel, and we can use it to forecast sales for the next 12 months"),
+        ("great-sale-recognition", "Profitable", "Everyone that is responsible for working with clients recognises what makes a great sale for this business"),
+        ("three-year-targets", "Repeatable", "We have clarity on what our sales & profit targets need to be for the next 3 years to achieve our goals"),
+        ("kpis-metrics", "Repeatable", "We have KPIs or metrics defined at each stage of our sales funnel leading to our ultimate targets"),
+    ]),
+    ("Scaling essentials (Commercial Essentials CE)", "CE", "commercial essentials", [
+        ("objections-techniques", "Profitable", "We know all of the objections prospects or clients may come up with, and have clear techniques to overcome them"),
+        ("commercial-model", "Scalable", "Our commercial model is easy to understand and makes it easy for clients to buy from us"),
+        ("pricing-testing", "Repeatable", "We've tested our pricing to ensure it is competitive whilst at the same time allows us to achieve our targets"),
+        ("terms-conditions", "Scalable", "We have terms & conditions and an SoW which can be agreed quickly and promote a win-win relationship"),
+    ]),
+    ("Streamlining the climb (Optimal Processes OP)", "OP", "optimal processes", [
+        ("outbound-sales-approach", "Repeatable", "We have a proven approach to bringing new leads into this business via an outbound sales approach"),
+        ("marketing-brand-awareness", "Repeatable", "Our marketing efforts are increasing brand awareness whilst also bringing in new regular inbound leads"),
+        ("lead-qualification", "Repeatable", "We have a structured approach to qualifying every lead, which enables us to prioritise hot leads and say no to the wrong ones"),
+        ("delivery-handoff", "Scalable", "Once a sale is closed, the process for handing off to the team responsible for delivery is clearly defined & understood"),
+    ]),
+    ("Assembling the team (People, Structure & Culture PSC)", "PSC", "people structure culture", [
+        ("team-structure", "Repeatable", "We have the right team structure in place to support our growth ambitions"),
+        ("right-people-roles", "Repeatable", "We have the right people in the right roles to achieve our growth ambitions"),
+        ("compensation-plans", "Profitable", "We have compensation plans in place that incentivise the right behaviours"),
+        ("sales-culture", "Scalable", "We have a sales culture that supports our growth ambitions"),
+        ("performance-management", "Scalable", "We have a performance management system in place that supports our growth ambitions"),
+    ]),
+    ("Toolbox for success (Systems & Tools ST)", "ST", "systems tools", [
+        ("central-shared-drive", "Scalable", "Anyone involved in sales has access to a central shared drive, where they can easily access any information they might need"),
+        ("client-collateral", "Profitable", "Our collateral to share with clients paints us in the best possible light and sets us apart from the competition"),
+        ("capability-demonstration", "Repeatable", "We have a repeatable way to demonstrate our full capability, in a way which is engaging and effective"),
+        ("digital-tools", "Scalable", "Our team have access to the digital & online tools they need to run effective outbound activity"),
+        ("crm-implementation", "Scalable", "We have a CRM implemented which allows us to run an efficient sales organisation, including pipeline management"),
+    ]),
+]
+
+QUESTION_COUNT = sum(len(questions) for _, _, _, questions in PILLARS)
+
+INDUSTRIES = [
+    "EdTech", "FinTech", "Healthcare SaaS", "Cyber security", "Logistics software",
+    "Marketing agency", "IT managed services", "Legal tech", "Recruitment", "Manufacturing analytics",
+]
+CHALLENGES = [
+    "Lead generation", "Converting pipeline into closed deals", "Hiring experienced sales people",
+    "Too dependent on one big client", "Long sales cycles with enterprise buyers",
+    "Pricing our offering", "Founder still does all the selling", "Expanding into new markets",
+]
+ADDITIONAL_TEXTS = [
+    "We mostly rely on referrals.",
+    "Only the founders know this today.",
+    "We started on this last quarter but it is not finished.",
+    "It differs a lot between our two product lines.",
+    "We tried this before and it did not stick.",
+    "Our CRM is a spreadsheet at the moment.",
+    "This is handled by a partner in the US.",
+    "We are reviewing it with our board this year.",
+]
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Parse "Agree=4,Disagree=1" into answer weights; answers not given get weight 0."""
+    weights = {answer: 0.0 for answer in SCORE_MAPPING}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in weights:
+            raise ValueError(f"unknown answer {name!r} in answer weights")
+        weights[name] = float(weight)
+    return weights
+
+
+class AssessmentGenerator:
+    def __init__(
+        self,
+        seed: Optional[int] = 0,
+        answer_weights: Optional[Dict[str, float]] = None,
+        text_rate: float = 0.3,
+    ) -> None:
+        weights = answer_weights or DEFAULT_ANSWER_WEIGHTS
+        self.answers = [answer for answer in SCORE_MAPPING if weights.get(answer, 0) > 0]
+        if not self.answers:
+            raise ValueError("answer weights must give at least one answer a positive weight")
+        self.weights = [weights[answer] for answer in self.answers]
+        self.text_rate = text_rate
+        self.rng = random.Random(seed)
+        self.generated = 0
+
+    @classmethod
+    def from_env(cls) -> "AssessmentGenerator":
+        spec = os.getenv("ASSESSMENT_ANSWER_WEIGHTS", "")
+        return cls(
+            seed=int(os.getenv("ASSESSMENT_SEED", 0)),
+            answer_weights=parse_weights(spec) if spec else None,
+            text_rate=float(os.getenv("ASSESSMENT_TEXT_RATE", 0.3)),
+        )
+
+    def _additional_text(self) -> str:
+        return self.rng.choice(ADDITIONAL_TEXTS) if self.rng.random() < self.text_rate else ""
+
+    def service_offering(self) -> Dict[str, Any]:
+        service_offering: Dict[str, Any] = {
+            "industry": {"text": self.rng.choice(INDUSTRIES)},
+            "business-challenge": {"text": self.rng.choice(CHALLENGES)},
+        }
+        for number, (question_id, question, options) in enumerate(SERVICE_OFFERING_QUESTIONS, start=1):
+            index = self.rng.randrange(len(options))
+            service_offering[question_id] = {
+                "question": question,
+                "question_name": f"R{number}",
+                "anwser": options[index],
+                "anwserselete": chr(ord("a") + index),
+                "additionalText": self._additional_text(),
+            }
+        return service_offering
+
+    def assessment(self, questions: int = QUESTION_COUNT) -> Dict[str, Any]:
+        """One assessment with ``questions`` answered questions.
+
+        Up to 34 this is a prefix of the real questionnaire (a partial submission); beyond
+        that the pillars are cycled through again, with ``-<round>`` appended to the ids.
+        """
+        data: Dict[str, Any] = {"serviceOffering": self.service_offering()}
+        for name, _, _, _ in PILLARS:
+            data[name] = {}
+        counters = {prefix: 0 for _, prefix, _, _ in PILLARS}
+        answers = self.rng.choices(self.answers, self.weights, k=questions)
+        all_questions = [
+            (round_, pillar, question)
+            for round_ in range(-(-questions // QUESTION_COUNT))
+            for pillar in PILLARS
+            for question in pillar[3]
+        ][:questions]
+        for (round_, (name, prefix, category, _), (question_id, phase, question)), answer in zip(all_questions, answers):
+            counters[prefix] += 1
+            data[name][question_id if round_ == 0 else f"{question_id}-{round_}"] = {
+                "question_name": f"{prefix}{counters[prefix]}",
+                "category": category,
+                "catmapping": phase,
+                "question": question,
+                "anwser": answer,
+                "score": SCORE_MAPPING[answer],
+                "additionalText": self._additional_text(),
+            }
+        return data
+
+    def request(self, user_id: Optional[str] = None, questions: int = QUESTION_COUNT) -> Dict[str, Any]:
+        """A complete /api/llm-advice request body."""
+        self.generated += 1
+        return {
+            "userId": user_id or f"synthetic-{self.generated}",
+            "assessmentData": self.assessment(questions),
+        }
+
+
+def generate_request(
+    seed: Optional[int] = 0, questions: int = QUESTION_COUNT, user_id: Optional[str] = None, **kwargs: Any
+) -> Dict[str, Any]:
+    """One request body from a fresh generator; ``kwargs`` go to ``AssessmentGenerator``."""
+    return AssessmentGenerator(seed, **kwargs).request(user_id, questions)
@@ -0,0 +1,80 @@
+"""
+Background writer thread shared by the logs, trace files, traffic recording and profiles.
+
+``put`` only queues an item, so code on the event loop never waits on a file
+or stream; a daemon thread hands whatever has queued up since its last
+write to ``write`` in one batch. With ``max_queue`` set, items are dropped
+and counted once the thread falls that far behind, instead of blocking the
+caller. ``close`` (also run at exit) writes out what is queued and stops
+the thread.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+from typing import Callable, Generic, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BackgroundWriter(Generic[T]):
+    def __init__(self, write: Callable[[List[T]], None], name: str, max_queue: int = 0) -> None:
+        self.name = name
+        self.dropped = 0
+        self._write = write
+        self._queue: "queue.Queue[Optional[T]]" = queue.Queue(max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def put(self, item: T) -> bool:
+        """Queue ``item`` for the thread; False if it was dropped (queue full or writer closed)."""
+        if self._closed:
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def flush(self) -> None:
+        """Wait until everything queued so far has been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Write out what is queued and stop the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            items = [item for item in batch if item is not None]
+            stopping = len(items) < len(batch)
+            try:
+                if items:
+                    self._write(items)
+            except Exception:
+                logger.exception("Background writer %s failed to write %d item(s)", self.name, len(items))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
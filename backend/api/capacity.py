@@ -0,0 +1,247 @@
+"""
+Step-load capacity finder, driven by ``locustfile_capacity.py``.
+
+Load starts at ``start_users`` and grows by ``step_users`` every
+``step_seconds``. Each step drops its first ``warmup_seconds`` (users still
+spawning, queues filling) and then measures completed assessments: p50/p95/
+p99 latency, failure ratio and throughput. The first step whose p95 exceeds
+the SLO, or whose failure ratio exceeds ``max_fail_ratio``, is the knee;
+the run stops there, and the step before it is the sustainable capacity.
+
+The report divides that throughput by ``workers`` (the API processes under
+test) for a per-worker figure, and when an LLM stats sampler is given (the
+in-process ``FakeLLM`` when Locust boots the API itself), it adds the LLM
+calls and tokens per minute at that load, i.e. the RPM/TPM quota the
+deployments need. Numbers hold for the LLM latency profile of the run, which
+the report records.
+
+Environment (``CapacityFinder.from_env``):
+    CAPACITY_START_USERS      users in the first step (default 1)
+    CAPACITY_STEP_USERS       users added per step (default 1)
+    CAPACITY_STEP_SECONDS     length of a step (default 30)
+    CAPACITY_WARMUP_SECONDS   start of each step left out of its numbers (default 5)
+    CAPACITY_MAX_USERS        stop here if no knee was found (default 50)
+    CAPACITY_SLO_P95_MS       p95 latency SLO for one assessment (default 10000)
+    CAPACITY_MAX_FAIL_RATIO   failure ratio that counts as the knee (default 0.01)
+    CAPACITY_API_WORKERS      API worker processes serving the load (default 1)
+    CAPACITY_REPORT           where to write the JSON report (default capacity_report.json)
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .loop_monitor import percentile
+
+LLM_PROFILE_VARS = ("FAKE_LLM_LATENCY", "FAKE_LLM_TOKENS_PER_S", "FAKE_LLM_COMPLETION_TOKENS", "FAKE_LLM_429_RATE", "FAKE_LLM_500_RATE", "FAKE_LLM_RPM", "FAKE_LLM_TPM")
+
+LLMStats = Callable[[], Optional[Dict[str, Any]]]
+
+# An assessment fans out to 34 LLM calls and lasts as long as the slowest. Under the default
+# profile (fake_openai.LOAD_TEST_PROFILE) that is about 6 s at p95 on an idle worker, so the
+# SLO leaves room for a few steps of load before the knee
+DEFAULT_SLO_P95_MS = 10000.0
+
+
+@dataclass
+class Step:
+    users: int
+    started: float  # run time when the step began
+    measure_from: float
+    measure_to: Optional[float] = None
+    latencies_ms: List[float] = field(default_factory=list)
+    failures: int = 0
+    llm_before: Optional[Dict[str, Any]] = None
+    llm_after: Optional[Dict[str, Any]] = None
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies_ms) + self.failures
+
+    def summary(self, slo_p95_ms: float, max_fail_ratio: float) -> Dict[str, Any]:
+        seconds = max((self.measure_to or self.measure_from) - self.measure_from, 1e-9)
+        ok = sorted(self.latencies_ms)
+        fail_ratio = self.failures / self.requests if self.requests else 0.0
+        summary: Dict[str, Any] = {
+            "users": self.users,
+            "requests": self.requests,
+            "failures": self.failures,
+            "fail_ratio": round(fail_ratio, 4),
+            "assessments_per_s": round(len(ok) / seconds, 3),
+            "p50_ms": round(percentile(ok, 0.5), 1),
+            "p95_ms": round(percentile(ok, 0.95), 1),
+            "p99_ms": round(percentile(ok, 0.99), 1),
+        }
+        # A step where nothing completed is past the knee whatever its percentiles say
+        summary["within_slo"] = bool(ok) and summary["p95_ms"] <= slo_p95_ms and fail_ratio <= max_fail_ratio
+        if self.llm_before is not None and self.llm_after is not None:
+            delta = {key: self.llm_after[key] - self.llm_before[key] for key in ("calls", "throttled", "prompt_tokens", "completion_tokens")}
+            summary["llm"] = {
+                "calls_per_min": round(delta["calls"] / seconds * 60, 1),
+                "tokens_per_min": round((delta["prompt_tokens"] + delta["completion_tokens"]) / seconds * 60, 1),
+                "throttled": delta["throttled"],
+                "calls_per_assessment": round(delta["calls"] / len(ok), 2) if ok else None,
+            }
+        return summary
+
+
+class CapacityFinder:
+    def __init__(
+        self,
+        start_users: int = 1,
+        step_users: int = 1,
+        step_seconds: float = 30,
+        warmup_seconds: float = 5,
+        max_users: int = 50,
+        slo_p95_ms: float = DEFAULT_SLO_P95_MS,
+        max_fail_ratio: float = 0.01,
+        workers: int = 1,
+        llm_stats: Optional[LLMStats] = None,
+    ) -> None:
+        if not 0 <= warmup_seconds < step_seconds:
+            raise ValueError("warmup_seconds must be shorter than step_seconds")
+        self.start_users = start_users
+        self.step_users = step_users
+        self.step_seconds = step_seconds
+        self.warmup_seconds = warmup_seconds
+        self.max_users = max_users
+        self.slo_p95_ms = slo_p95_ms
+        self.max_fail_ratio = max_fail_ratio
+        self.workers = workers
+        self.llm_stats = llm_stats
+        self.steps: List[Dict[str, Any]] = []
+        self.knee: Optional[Dict[str, Any]] = None
+        self.done = False
+        self._step: Optional[Step] = None
+        self._index = -1
+        self._measuring = False
+
+    @classmethod
+    def from_env(cls, llm_stats: Optional[LLMStats] = None) -> "CapacityFinder":
+        return cls(
+            start_users=int(os.getenv("CAPACITY_START_USERS", 1)),
+            step_users=int(os.getenv("CAPACITY_STEP_USERS", 1)),
+            step_seconds=float(os.getenv("CAPACITY_STEP_SECONDS", 30)),
+            warmup_seconds=float(os.getenv("CAPACITY_WARMUP_SECONDS", 5)),
+            max_users=int(os.getenv("CAPACITY_MAX_USERS", 50)),
+            slo_p95_ms=float(os.getenv("CAPACITY_SLO_P95_MS", DEFAULT_SLO_P95_MS)),
+            max_fail_ratio=float(os.getenv("CAPACITY_MAX_FAIL_RATIO", 0.01)),
+            workers=int(os.getenv("CAPACITY_API_WORKERS", 1)),
+            llm_stats=llm_stats,
+        )
+
+    def record(self, response_time_ms: float, failed: bool) -> None:
+        """Count one finished request towards the current step, unless it is warming up."""
+        step = self._step
+        if not self._measuring or step is None:
+            return
+        if failed:
+            step.failures += 1
+        else:
+            step.latencies_ms.append(response_time_ms)
+
+    def tick(self, run_time: float) -> Optional[Tuple[int, float]]:
+        """Locust ``LoadTestShape.tick``: (users, spawn rate) for now, or None to stop the run."""
+        if self.done:
+            return None
+        index = int(run_time // self.step_seconds)
+        if index > self._index:
+            if self._step is not None:
+                self._close(run_time)
+            self._index = index
+            users = self.start_users + index * self.step_users
+            if self.done or users > self.max_users:
+                self.done = True
+                return None
+            started = index * self.step_seconds
+            self._step = Step(users=users, started=started, measure_from=started + self.warmup_seconds)
+            self._measuring = False
+        step = self._step
+        if step is None:
+            return None
+        if not self._measuring and run_time >= step.measure_from:
+            step.measure_from = run_time
+            step.llm_before = self._sample_llm()
+            self._measuring = True
+        # Spawn a step's new users within its warmup
+        return step.users, max(self.step_users, self.start_users) / max(self.warmup_seconds, 1)
+
+    def finish(self, run_time: float) -> None:
+        """Close the running step, e.g. when the run is stopped before the knee."""
+        if self._step is not None and not self.done:
+            self._close(run_time)
+            self.done = True
+
+    def _close(self, run_time: float) -> None:
+        step, self._step = self._step, None
+        measured = self._measuring
+        self._measuring = False
+        if step is None or not measured:
+            return
+        step.measure_to = run_time
+        step.llm_after = self._sample_llm() if step.llm_before is not None else None
+        summary = step.summary(self.slo_p95_ms, self.max_fail_ratio)
+        self.steps.append(summary)
+        if not summary["within_slo"]:
+            self.knee = summary
+            self.done = True
+
+    def _sample_llm(self) -> Optional[Dict[str, Any]]:
+        return self.llm_stats() if self.llm_stats else None
+
+    def report(self) -> Dict[str, Any]:
+        passing = [s for s in self.steps if s["within_slo"]]
+        best = passing[-1] if passing else None
+        capacity: Optional[Dict[str, Any]] = None
+        if best is not None:
+            capacity = {
+                "users": best["users"],
+                "assessments_per_s": best["assessments_per_s"],
+                "assessments_per_s_per_worker": round(best["assessments_per_s"] / self.workers, 3),
+                "p95_ms": best["p95_ms"],
+            }
+            if "llm" in best:
+                # The quota the deployments need to carry this load
+                capacity["llm_rpm"] = best["llm"]["calls_per_min"]
+                capacity["llm_tpm"] = best["llm"]["tokens_per_min"]
+        return {
+            "slo": {"p95_ms": self.slo_p95_ms, "max_fail_ratio": self.max_fail_ratio},
+            "workers": self.workers,
+            "llm_profile": {name: os.environ[name] for name in LLM_PROFILE_VARS if name in os.environ},
+            "steps": self.steps,
+            "knee": self.knee,
+            # Without a knee, capacity is at least this much: the run hit max_users first
+            "capacity_is_lower_bound": self.knee is None,
+            "capacity": capacity,
+        }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"{'users':>6} {'req':>6} {'fail%':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"]
+    for s in report["steps"]:
+        lines.append(
+            f"{s['users']:>6} {s['requests']:>6} {s['fail_ratio'] * 100:>6.1f} {s['assessments_per_s']:>8.2f} "
+            f"{s['p50_ms']:>8.0f} {s['p95_ms']:>8.0f} {s['p99_ms']:>8.0f}{'' if s['within_slo'] else '  <- knee'}"
+        )
+    profile = ", ".join(f"{k}={v}" for k, v in report["llm_profile"].items()) or "not recorded"
+    lines.append(f"SLO p95 <= {report['slo']['p95_ms']:.0f} ms, failures <= {report['slo']['max_fail_ratio']:.1%}; LLM profile: {profile}")
+    capacity = report["capacity"]
+    if capacity is None:
+        lines.append("No step met the SLO: lower CAPACITY_START_USERS or relax the SLO.")
+        return "\n".join(lines)
+    bound = "at least " if report["capacity_is_lower_bound"] else ""
+    lines.append(
+        f"Capacity: {bound}{capacity['assessments_per_s']:.2f} assessments/s at {capacity['users']} users "
+        f"({capacity['assessments_per_s_per_worker']:.2f}/s per worker over {report['workers']})"
+    )
+    if "llm_rpm" in capacity:
+        lines.append(f"LLM quota at that load: {capacity['llm_rpm']:.0f} RPM, {capacity['llm_tpm']:.0f} TPM")
+    return "\n".join(lines)
+
+
+def write_report(report: Dict[str, Any], path: Optional[str] = None) -> str:
+    target = path or os.getenv("CAPACITY_REPORT") or "capacity_report.json"
+    with open(target, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return target
@@ -0,0 +1,147 @@
+"""
+Adaptive (AIMD) concurrency limit for LLM calls.
+
+``AdaptiveLimiter`` caps the number of in-flight completions. Every call that
+finishes under the latency target without throttling raises the limit by
+``increase / limit`` (about +1 per limit's worth of successes); a 429 or a
+call slower than the target cuts it by ``decrease_factor``, at most once per
+``decrease_cooldown`` so a burst of failures counts as one signal. The limit
+therefore tracks the capacity actually available upstream.
+
+Environment:
+    LLM_AIMD_INITIAL_LIMIT   starting limit (default 32)
+    LLM_AIMD_MIN_LIMIT       lower bound (default 1)
+    LLM_AIMD_MAX_LIMIT       upper bound (default 256)
+    LLM_AIMD_TARGET_MS       latency above which a call counts as congestion (default 15000)
+    LLM_AIMD_DECREASE        multiplicative decrease factor (default 0.7)
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Tuple
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        initial_limit: float = 32,
+        min_limit: float = 1,
+        max_limit: float = 256,
+        latency_target: float = 15.0,
+        increase: float = 1.0,
+        decrease_factor: float = 0.7,
+        decrease_cooldown: float = 1.0,
+        history_size: int = 500,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = min(max(initial_limit, min_limit), max_limit)
+        self.latency_target = latency_target
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.in_flight = 0
+        self.successes = 0
+        self.throttles = 0
+        self.slow_calls = 0
+        self.history: Deque[Tuple[float, float]] = deque(maxlen=history_size)
+        self._last_decrease = float("-inf")
+        # Plain futures rather than asyncio.Condition, so the limiter is not tied to one event loop
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._record_limit()
+
+    @classmethod
+    def from_env(cls) -> "AdaptiveLimiter":
+        return cls(
+            initial_limit=float(os.getenv("LLM_AIMD_INITIAL_LIMIT", 32)),
+            min_limit=float(os.getenv("LLM_AIMD_MIN_LIMIT", 1)),
+            max_limit=float(os.getenv("LLM_AIMD_MAX_LIMIT", 256)),
+            latency_target=float(os.getenv("LLM_AIMD_TARGET_MS", 15000)) / 1000,
+            decrease_factor=float(os.getenv("LLM_AIMD_DECREASE", 0.7)),
+        )
+
+    def _record_limit(self) -> None:
+        self.history.append((time.time(), round(self.limit, 2)))
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # A slot was handed over just as we were cancelled
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._grant()
+
+    def _grant(self) -> None:
+        """Hand free slots to waiters in arrival order."""
+        while self._waiters and self.in_flight < int(self.limit):
+            future = self._waiters.popleft()
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one unit of concurrency for the duration of the block."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def on_success(self, latency: float) -> None:
+        if latency > self.latency_target:
+            self.slow_calls += 1
+            self._decrease()
+            return
+        self.successes += 1
+        new_limit = min(self.max_limit, self.limit + self.increase / self.limit)
+        # Only grow when the current limit is actually being used
+        if new_limit != self.limit and self.in_flight + self.waiting >= int(self.limit) - 1:
+            previous = int(self.limit)
+            self.limit = new_limit
+            if int(self.limit) != previous:
+                self._record_limit()
+                self._grant()
+
+    def on_throttle(self) -> None:
+        self.throttles += 1
+        self._decrease()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self._record_limit()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "limit_exact": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "successes": self.successes,
+            "throttles": self.throttles,
+            "slow_calls": self.slow_calls,
+            "history": [{"time": t, "limit": limit} for t, limit in self.history],
+        }
@@ -1,8 +1,13 @@
 import os
 import logging
+import time
 from typing import Optional, List, Dict, Any, TYPE_CHECKING
 from dotenv import load_dotenv
 
+from .metrics import COSMOS_QUERIES, COSMOS_QUERY_SECONDS
+
+logger = logging.getLogger(__name__)
+
 # Import only CosmosClient to avoid import issues
 if TYPE_CHECKING:
     from azure.cosmos import CosmosClient, ContainerProxy
@@ -32,13 +37,13 @@ try:
         client = CosmosClient(url=ENDPOINT, credential=KEY)
         database_client = client.get_database_client(DATABASE_NAME)
         container_client = database_client.get_container_client(CONTAINER_NAME)
-        logging.info("Cosmos DB client initialized successfully for cosmos_retriever module.")
+        logger.info("Cosmos DB client initialized successfully for cosmos_retriever module.")
     else:
-        logging.error("Missing required environment variables: COSMOS_ENDPOINT or COSMOS_KEY")
+        logger.error("Missing required environment variables: COSMOS_ENDPOINT or COSMOS_KEY")
 except Exception as e:
     client = None
     container_client = None
-    logging.error(f"Failed to initialize Cosmos DB client: {e}")
+    logger.error("Failed to initialize Cosmos DB client: %s", e)
     # 在应用无法连接数据库时，应该有更健壮的处理，这里仅作记录
 
 def get_answer_text(question_id: str, category: str) -> Optional[str]:
@@ -53,7 +58,8 @@ def get_answer_text(question_id: str, category: str) -> Optional[str]:
         Optional[str]: 如果找到，返回回答文本；否则返回 None。
     """
     if not container_client:
-        logging.error("数据库客户端未初始化，无法执行查询。")
+        logger.error("数据库客户端未初始化，无法执行查询。")
+        COSMOS_QUERIES.inc(outcome="unavailable")
         return None
 
     # 1. 构造参数化SQL查询以防止SQL注入
@@ -67,8 +73,10 @@ def get_answer_text(question_id: str, category: str) -> Optional[str]:
         {"name": "@category", "value": category},
     ]
 
-    logging.info(f"执行查询: {query} with params: {parameters}")
+    # Once per question and request: DEBUG, so it is off (or sampled) in production
+    logger.debug("执行查询", extra={"question_id": question_id, "category": category})
 
+    started = time.perf_counter()
     try:
         # 2. 执行查询
         # enable_cross_partition_query 设为 True 是一个好习惯，尽管此查询会命中特定分区
@@ -80,18 +88,24 @@ def get_answer_text(question_id: str, category: str) -> Optional[str]:
         
         # 3. 处理查询结果
         if not items:
-            logging.warning(f"未找到匹配项: question_id='{question_id}', category='{category}'")
+            logger.warning("未找到匹配项: question_id='%s', category='%s'", question_id, category)
+            COSMOS_QUERIES.inc(outcome="miss")
+            COSMOS_QUERY_SECONDS.observe(time.perf_counter() - started, outcome="miss")
             return None
         
         if len(items) > 1:
-            logging.warning(
-                f"找到 {len(items)} 条匹配项，预期为1条。将返回第一条。 "
-                f"Query: question_id='{question_id}', category='{category}'"
+            logger.warning(
+                "找到 %d 条匹配项，预期为1条。将返回第一条。 Query: question_id='%s', category='%s'",
+                len(items), question_id, category
             )
         
+        COSMOS_QUERIES.inc(outcome="hit")
+        COSMOS_QUERY_SECONDS.observe(time.perf_counter() - started, outcome="hit")
         # 返回第一条记录中的 'text' 字段
         return items[0].get("text")
 
     except Exception as e:
-        logging.error(f"查询数据库时发生错误: {e}")
+        logger.error("查询数据库时发生错误: %s", e)
+        COSMOS_QUERIES.inc(outcome="error")
+        COSMOS_QUERY_SECONDS.observe(time.perf_counter() - started, outcome="error")
         return None
\ No newline at end of file
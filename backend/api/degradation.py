@@ -0,0 +1,161 @@
+"""
+Degradation mode for advice generation.
+
+``LLMHealthMonitor`` watches recent LLM calls and switches into degraded mode
+when the error rate or p95 latency crosses a threshold. While degraded,
+``/api/llm-advice`` answers straight away with the retrieved tip text lightly
+tailored to the business profile (see ``template_advice``) and refines the
+report with the LLM in the background; the refined report is kept in a
+``ReportStore`` and served on the next fetch of the same report.
+
+Environment:
+    LLM_DEGRADE_MODE          auto (default), on (always degraded) or off
+    LLM_DEGRADE_ERROR_RATE    error rate that triggers degradation (default 0.5)
+    LLM_DEGRADE_P95_MS        p95 latency that triggers degradation (default 20000)
+    LLM_DEGRADE_MIN_SAMPLES   calls needed in the window before deciding (default 10)
+    LLM_DEGRADE_WINDOW_S      sliding window length (default 60)
+    LLM_DEGRADE_COOLDOWN_S    minimum time to stay degraded (default 30)
+    LLM_REFINED_REPORT_TTL_S  how long refined reports are kept (default 3600)
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+class LLMHealthMonitor:
+    def __init__(
+        self,
+        mode: str = "auto",
+        error_rate_threshold: float = 0.5,
+        p95_latency_threshold: float = 20.0,
+        min_samples: int = 10,
+        window_seconds: float = 60.0,
+        cooldown_seconds: float = 30.0,
+    ) -> None:
+        self.mode = mode
+        self.error_rate_threshold = error_rate_threshold
+        self.p95_latency_threshold = p95_latency_threshold
+        self.min_samples = min_samples
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.degraded_until = 0.0
+        self.times_degraded = 0
+        self._samples: Deque[Tuple[float, float, bool]] = deque()
+
+    @classmethod
+    def from_env(cls) -> "LLMHealthMonitor":
+        return cls(
+            mode=os.getenv("LLM_DEGRADE_MODE", "auto").lower(),
+            error_rate_threshold=float(os.getenv("LLM_DEGRADE_ERROR_RATE", 0.5)),
+            p95_latency_threshold=float(os.getenv("LLM_DEGRADE_P95_MS", 20000)) / 1000,
+            min_samples=int(os.getenv("LLM_DEGRADE_MIN_SAMPLES", 10)),
+            window_seconds=float(os.getenv("LLM_DEGRADE_WINDOW_S", 60)),
+            cooldown_seconds=float(os.getenv("LLM_DEGRADE_COOLDOWN_S", 30)),
+        )
+
+    def _expire(self, now: float) -> None:
+        while self._samples and now - self._samples[0][0] > self.window_seconds:
+            self._samples.popleft()
+
+    def record(self, latency: float, ok: bool) -> None:
+        now = time.monotonic()
+        self._samples.append((now, latency, ok))
+        self._expire(now)
+        if self.mode == "auto" and self._unhealthy():
+            if now >= self.degraded_until:
+                self.times_degraded += 1
+            self.degraded_until = now + self.cooldown_seconds
+
+    def _window(self) -> Tuple[int, float, float]:
+        """Return (samples, error_rate, p95_latency) for the current window."""
+        n = len(self._samples)
+        if n == 0:
+            return 0, 0.0, 0.0
+        errors = sum(1 for _, _, ok in self._samples if not ok)
+        latencies = sorted(latency for _, latency, _ in self._samples)
+        p95 = latencies[min(n - 1, int(0.95 * n))]
+        return n, errors / n, p95
+
+    def _unhealthy(self) -> bool:
+        n, error_rate, p95 = self._window()
+        if n < self.min_samples:
+            return False
+        return error_rate >= self.error_rate_threshold or p95 >= self.p95_latency_threshold
+
+    def typical_latency(self) -> float:
+        """Median latency of the calls in the current window (0 when there are none)."""
+        self._expire(time.monotonic())
+        latencies = sorted(latency for _, latency, _ in self._samples)
+        return latencies[len(latencies) // 2] if latencies else 0.0
+
+    def is_degraded(self) -> bool:
+        if self.mode == "on":
+            return True
+        if self.mode == "off":
+            return False
+        self._expire(time.monotonic())
+        return time.monotonic() < self.degraded_until
+
+    def stats(self) -> Dict[str, Any]:
+        n, error_rate, p95 = self._window()
+        return {
+            "mode": self.mode,
+            "degraded": self.is_degraded(),
+            "times_degraded": self.times_degraded,
+            "window_samples": n,
+            "error_rate": round(error_rate, 3),
+            "p95_latency_ms": round(p95 * 1000, 1),
+        }
+
+
+class ReportStore:
+    """Small in-memory LRU of finished reports with a TTL."""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._items.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        self._items[key] = (time.monotonic(), value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def report_key(user_id: str, assessment_data: Dict[str, Any]) -> str:
+    """Stable key for "the same report": same user, same answers."""
+    payload = json.dumps([user_id, assessment_data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def template_advice(retrieved_text: str, business_profile: Dict[str, str]) -> str:
+    """Retrieved tip text with a short profile-specific lead-in, used while the LLM is degraded."""
+    industry = business_profile.get("industry", "N/A")
+    challenge = business_profile.get("business_challenge", "N/A")
+    context = []
+    if industry and industry != "N/A":
+        context.append(f"in {industry}")
+    if challenge and challenge != "N/A":
+        context.append(f"facing {challenge}")
+    if not context:
+        return retrieved_text
+    return f"For a business {' '.join(context)}: {retrieved_text}"
@@ -0,0 +1,557 @@
+"""
+In-memory stand-in for the Azure Cosmos DB SDK, for offline tests and benchmarks.
+
+Covers what the project uses: ``CosmosClient`` -> database -> container,
+parameterised ``SELECT ... FROM c WHERE ...`` queries (``=``, ``!=``, ``IN``,
+``AND``, ``OR``, ``NOT``, parentheses; ``*``, field lists or ``VALUE``
+projections, ``TOP n``), point reads, creates and upserts. Every operation
+sleeps for a sampled latency, is charged request units and can be
+throttled with the SDK's 429 error, so retrieval caching and batching can
+be measured without an account.
+
+Request charges are rough figures from Azure's guidance: a point read costs
+1 RU per started KB, a write 6 RU per KB, a query 2.3 RU plus 1 RU for each
+further partition it fans out to and 0.4 RU per KB returned. Queries that
+pin the partition key (``c.question_id = @id``) stay on one partition. The
+charge of the last operation is in ``last_response_headers`` as in the SDK.
+A container with ``ru_per_second`` answers with 429 and
+``x-ms-retry-after-ms`` once the current second's budget is spent.
+
+``install()`` registers this module as ``azure.cosmos`` (and
+``azure.cosmos.exceptions``). All clients share one ``FakeCosmosAccount``,
+so data seeded by a test is what the retriever module reads.
+
+Environment (``FakeCosmosAccount.from_env``):
+    FAKE_COSMOS_LATENCY   latency of each operation, as FAKE_LLM_LATENCY (default 0)
+    FAKE_COSMOS_RU_PER_S  provisioned throughput per container (default 0: unlimited)
+    FAKE_COSMOS_429_RATE  share of operations throttled regardless of load (default 0)
+    FAKE_COSMOS_SEED      seed for latencies and injected throttles
+    FAKE_COSMOS_DATA      answers JSONL to load into PromptEngineeringDB/answers (see load_answers)
+"""
+
+import copy
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import types
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from .fake_openai import Latency, parse_latency
+
+POINT_READ_RU_PER_KB = 1.0
+WRITE_RU_PER_KB = 6.0
+QUERY_RU_BASE = 2.3
+QUERY_RU_PER_EXTRA_PARTITION = 1.0
+QUERY_RU_PER_KB_RETURNED = 0.4
+
+DATABASE_NAME = "PromptEngineeringDB"
+CONTAINER_NAME = "answers"
+
+
+class CosmosHttpResponseError(Exception):
+    """Same attributes as the SDK's error: ``status_code``, ``headers`` and ``message``."""
+
+    def __init__(self, status_code: int, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+        super().__init__(f"({status_code}) {message}")
+        self.status_code = status_code
+        self.message = message
+        self.headers = headers or {}
+        self.sub_status = None
+
+
+class CosmosResourceNotFoundError(CosmosHttpResponseError):
+    def __init__(self, message: str) -> None:
+        super().__init__(404, message)
+
+
+class CosmosResourceExistsError(CosmosHttpResponseError):
+    def __init__(self, message: str) -> None:
+        super().__init__(409, message)
+
+
+class PartitionKey:
+    def __init__(self, path: str, kind: str = "Hash") -> None:
+        self.path = path
+        self.kind = kind
+
+
+# --- Query language -------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r"\s*(?:(@\w+)|('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\")|(-?\d+(?:\.\d+)?)|(!=|<>|[=(),*])|([A-Za-z_]\w*(?:\.\w+)*))")
+_KEYWORDS = {"SELECT", "TOP", "VALUE", "FROM", "WHERE", "AND", "OR", "NOT", "IN", "TRUE", "FALSE", "NULL"}
+
+Predicate = Callable[[Dict[str, Any]], bool]
+Operand = Callable[[Dict[str, Any]], Any]
+_MISSING = object()
+
+
+class Query:
+    """A parsed query: projection, filter and the partition key values it is limited to."""
+
+    def __init__(self, text: str, parameters: Dict[str, Any], partition_key_path: str) -> None:
+        self.tokens = self._tokenize(text)
+        self.position = 0
+        self.parameters = parameters
+        self.partition_field = partition_key_path.strip("/").split("/")
+        self.top: Optional[int] = None
+        self.value = False
+        self.fields: Optional[List[List[str]]] = None  # None means SELECT *
+        self.predicate: Predicate = lambda item: True
+        # Partition key values the filter pins (None: all partitions)
+        self.partitions: Optional[Set[Any]] = None
+        self._parse()
+
+    @staticmethod
+    def _tokenize(text: str) -> List[str]:
+        tokens, position = [], 0
+        text = text.rstrip()
+        while position < len(text):
+            match = _TOKEN_RE.match(text, position)
+            if not match or match.end() == position:
+                raise CosmosHttpResponseError(400, f"Syntax error near {text[position:position + 20]!r}")
+            tokens.append(next(group for group in match.groups() if group is not None))
+            position = match.end()
+        return tokens
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _accept(self, keyword: str) -> bool:
+        token = self._peek()
+        if token is not None and token.upper() == keyword:
+            self.position += 1
+            return True
+        return False
+
+    def _expect(self, keyword: str) -> None:
+        if not self._accept(keyword):
+            raise CosmosHttpResponseError(400, f"Syntax error: expected {keyword} at {self._peek()!r}")
+
+    def _path(self) -> List[str]:
+        token = self._peek()
+        if token is None or token.upper() in _KEYWORDS or not re.fullmatch(r"[A-Za-z_]\w*(\.\w+)+", token):
+            raise CosmosHttpResponseError(400, f"Syntax error: expected a property path at {token!r}")
+        self.position += 1
+        return token.split(".")[1:]  # drop the alias
+
+    def _parse(self) -> None:
+        self._expect("SELECT")
+        if self._accept("TOP"):
+            self.top = int(self.tokens[self.position])
+            self.position += 1
+        if self._accept("VALUE"):
+            self.value = True
+            self.fields = [self._path()]
+        elif not self._accept("*"):
+            self.fields = [self._path()]
+            while self._accept(","):
+                self.fields.append(self._path())
+        self._expect("FROM")
+        self.position += 1  # the alias
+        if self._accept("WHERE"):
+            self.predicate, self.partitions = self._or()
+        if self._peek() is not None:
+            raise CosmosHttpResponseError(400, f"Syntax error: unsupported clause at {self._peek()!r}")
+
+    def _or(self) -> Tuple[Predicate, Optional[Set[Any]]]:
+        branches = [self._and()]
+        while self._accept("OR"):
+            branches.append(self._and())
+        if len(branches) == 1:
+            return branches[0]
+        predicates = [predicate for predicate, _ in branches]
+        pinned = [partitions for _, partitions in branches if partitions is not None]
+        # One unpinned branch can match any partition
+        partitions = set().union(*pinned) if len(pinned) == len(branches) else None
+        return (lambda item: any(p(item) for p in predicates)), partitions
+
+    def _and(self) -> Tuple[Predicate, Optional[Set[Any]]]:
+        terms = [self._not()]
+        while self._accept("AND"):
+            terms.append(self._not())
+        if len(terms) == 1:
+            return terms[0]
+        predicates = [predicate for predicate, _ in terms]
+        pinned = [partitions for _, partitions in terms if partitions is not None]
+        partitions = set.intersection(*pinned) if pinned else None
+        return (lambda item: all(p(item) for p in predicates)), partitions
+
+    def _not(self) -> Tuple[Predicate, Optional[Set[Any]]]:
+        if self._accept("NOT"):
+            predicate, _ = self._not()
+            return (lambda item: not predicate(item)), None
+        if self._accept("("):
+            result = self._or()
+            self._expect(")")
+            return result
+        return self._comparison()
+
+    def _operand(self) -> Tuple[Operand, Optional[List[str]]]:
+        token = self._peek()
+        if token is None:
+            raise CosmosHttpResponseError(400, "Syntax error: unexpected end of query")
+        if token.startswith("@"):
+            if token not in self.parameters:
+                raise CosmosHttpResponseError(400, f"Parameter {token} is not defined")
+            self.position += 1
+            value = self.parameters[token]
+            return (lambda item: value), None
+        if token[0] in "'\"":
+            self.position += 1
+            text = re.sub(r"\\(.)", r"\1", token[1:-1])
+            return (lambda item: text), None
+        if re.fullmatch(r"-?\d+(\.\d+)?", token):
+            self.position += 1
+            number = float(token) if "." in token else int(token)
+            return (lambda item: number), None
+        if token.upper() in ("TRUE", "FALSE", "NULL"):
+            self.position += 1
+            constant = {"TRUE": True, "FALSE": False, "NULL": None}[token.upper()]
+            return (lambda item: constant), None
+        path = self._path()
+        return (lambda item: _get(item, path)), path
+
+    def _comparison(self) -> Tuple[Predicate, Optional[Set[Any]]]:
+        left, path = self._operand()
+        pins_partition = path == self.partition_field
+        if self._accept("IN"):
+            self._expect("(")
+            options = [self._operand()[0]]
+            while self._accept(","):
+                options.append(self._operand()[0])
+            self._expect(")")
+            values = [option({}) for option in options]
+            partitions = set(values) if pins_partition and all(_hashable(v) for v in values) else None
+            return (lambda item: any(_equal(left(item), value) for value in values)), partitions
+        operator = self._peek()
+        if operator not in ("=", "!=", "<>"):
+            raise CosmosHttpResponseError(400, f"Syntax error: unsupported operator {operator!r}")
+        self.position += 1
+        right, _ = self._operand()
+        if operator == "=":
+            value = right({})
+            partitions = {value} if pins_partition and _hashable(value) else None
+            return (lambda item: _equal(left(item), right(item))), partitions
+        return (lambda item: not _equal(left(item), right(item))), None
+
+    def project(self, item: Dict[str, Any]) -> Any:
+        if self.fields is None:
+            return copy.deepcopy(item)
+        if self.value:
+            value = _get(item, self.fields[0])
+            return None if value is _MISSING else copy.deepcopy(value)
+        projected = {}
+        for path in self.fields:
+            value = _get(item, path)
+            if value is not _MISSING:
+                projected[path[-1]] = copy.deepcopy(value)
+        return projected
+
+
+def _get(item: Dict[str, Any], path: List[str]) -> Any:
+    value: Any = item
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return _MISSING
+        value = value[key]
+    return value
+
+
+def _equal(left: Any, right: Any) -> bool:
+    # Comparing with an undefined property is never true in Cosmos SQL, nor across types
+    if left is _MISSING or right is _MISSING or isinstance(left, bool) != isinstance(right, bool):
+        return False
+    numbers = (int, float)
+    if isinstance(left, numbers) and isinstance(right, numbers):
+        return left == right
+    return type(left) is type(right) and left == right
+
+
+def _hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _kb(document: Any) -> int:
+    return max(1, math.ceil(len(json.dumps(document, ensure_ascii=False).encode("utf-8")) / 1024))
+
+
+# --- Resources ------------------------------------------------------------------------
+
+class FakeContainer:
+    def __init__(
+        self,
+        id: str,
+        partition_key_path: str = "/question_id",
+        latency: Latency = lambda rng: 0.0,
+        ru_per_second: float = 0.0,
+        throttle_rate: float = 0.0,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.id = id
+        self.partition_key_path = partition_key_path
+        self.latency = latency
+        self.ru_per_second = ru_per_second
+        self.throttle_rate = throttle_rate
+        self.rng = rng or random.Random()
+        self._partitions: Dict[Any, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._second = 0
+        self._second_ru = 0.0
+        self.last_response_headers: Dict[str, str] = {}
+        self.client_connection = types.SimpleNamespace(last_response_headers=self.last_response_headers)
+        self.reads = 0
+        self.writes = 0
+        self.queries = 0
+        self.throttled = 0
+        self.request_charge = 0.0
+
+    def _partition_value(self, body: Dict[str, Any]) -> Any:
+        value = _get(body, self.partition_key_path.strip("/").split("/"))
+        return None if value is _MISSING else value
+
+    def _operation(self, charge: Callable[[], Tuple[float, Any]]) -> Any:
+        """Run one operation: latency, throttling, then ``charge`` (returns its RU and result)."""
+        time.sleep(max(0.0, self.latency(self.rng)))
+        with self._lock:
+            if self.rng.random() < self.throttle_rate:
+                self._throttle(1000)
+            now = time.time()
+            if int(now) != self._second:
+                self._second, self._second_ru = int(now), 0.0
+            # As in Cosmos, the operation that crosses the budget goes through; later ones are throttled
+            if self.ru_per_second > 0 and self._second_ru >= self.ru_per_second:
+                self._throttle(max(1, int((self._second + 1 - now) * 1000)))
+            ru, result = charge()
+            self._second_ru += ru
+            self.request_charge += ru
+            self._set_headers(ru)
+            return result
+
+    def _throttle(self, retry_after_ms: int) -> None:
+        self.throttled += 1
+        self._set_headers(0.0)
+        raise CosmosHttpResponseError(
+            429,
+            "Request rate is large. More Request Units may be needed, so no changes were made.",
+            {"x-ms-retry-after-ms": str(retry_after_ms), "x-ms-request-charge": "0"},
+        )
+
+    def _set_headers(self, ru: float) -> None:
+        self.last_response_headers.clear()
+        self.last_response_headers.update({"x-ms-request-charge": f"{ru:.2f}", "x-ms-activity-id": str(uuid.uuid4())})
+
+    def _stored(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(body.get("id"), str) or not body["id"]:
+            raise CosmosHttpResponseError(400, "The input content is invalid because the required property 'id' is missing")
+        stored = copy.deepcopy(body)
+        stored.update({"_rid": uuid.uuid4().hex[:16], "_etag": f'"{uuid.uuid4()}"', "_ts": int(time.time())})
+        return stored
+
+    def seed(self, items: List[Dict[str, Any]]) -> None:
+        """Store items directly: no latency, charge or throttling."""
+        with self._lock:
+            for body in items:
+                self._partitions.setdefault(self._partition_value(body), {})[body["id"]] = self._stored(body)
+
+    def upsert_item(self, body: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        def write() -> Tuple[float, Dict[str, Any]]:
+            stored = self._stored(body)
+            self._partitions.setdefault(self._partition_value(body), {})[stored["id"]] = stored
+            self.writes += 1
+            return WRITE_RU_PER_KB * _kb(stored), copy.deepcopy(stored)
+        return self._operation(write)
+
+    def create_item(self, body: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        def write() -> Tuple[float, Dict[str, Any]]:
+            stored = self._stored(body)
+            partition = self._partitions.setdefault(self._partition_value(body), {})
+            if stored["id"] in partition:
+                raise CosmosResourceExistsError(f"Entity with the specified id {stored['id']!r} already exists")
+            partition[stored["id"]] = stored
+            self.writes += 1
+            return WRITE_RU_PER_KB * _kb(stored), copy.deepcopy(stored)
+        return self._operation(write)
+
+    def read_item(self, item: str, partition_key: Any, **kwargs: Any) -> Dict[str, Any]:
+        def read() -> Tuple[float, Dict[str, Any]]:
+            stored = self._partitions.get(partition_key, {}).get(item)
+            if stored is None:
+                raise CosmosResourceNotFoundError(f"Entity with the specified id {item!r} does not exist")
+            self.reads += 1
+            return POINT_READ_RU_PER_KB * _kb(stored), copy.deepcopy(stored)
+        return self._operation(read)
+
+    def query_items(
+        self,
+        query: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        partition_key: Any = None,
+        enable_cross_partition_query: Optional[bool] = None,
+        max_item_count: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Iterator[Any]:
+        parsed = Query(query, {p["name"]: p["value"] for p in parameters or []}, self.partition_key_path)
+
+        def run() -> Tuple[float, List[Any]]:
+            if partition_key is not None:
+                keys: List[Any] = [partition_key]
+            elif parsed.partitions is not None:
+                keys = list(parsed.partitions)
+            else:
+                keys = list(self._partitions)
+            results = []
+            for key in keys:
+                for stored in self._partitions.get(key, {}).values():
+                    if parsed.predicate(stored):
+                        results.append(parsed.project(stored))
+            if parsed.top is not None:
+                results = results[:parsed.top]
+            self.queries += 1
+            returned_kb = sum(len(json.dumps(r, ensure_ascii=False).encode("utf-8")) for r in results) / 1024
+            ru = QUERY_RU_BASE + QUERY_RU_PER_EXTRA_PARTITION * max(0, len(keys) - 1) + QUERY_RU_PER_KB_RETURNED * math.ceil(returned_kb)
+            return ru, results
+        return iter(self._operation(run))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "items": sum(len(partition) for partition in self._partitions.values()),
+            "reads": self.reads,
+            "writes": self.writes,
+            "queries": self.queries,
+            "throttled": self.throttled,
+            "request_charge": round(self.request_charge, 2),
+        }
+
+
+class FakeDatabase:
+    def __init__(self, id: str, account: "FakeCosmosAccount") -> None:
+        self.id = id
+        self.account = account
+        self.containers: Dict[str, FakeContainer] = {}
+
+    def create_container(self, id: str, partition_key: PartitionKey, **kwargs: Any) -> FakeContainer:
+        if id in self.containers:
+            raise CosmosResourceExistsError(f"Container {id!r} already exists")
+        return self.create_container_if_not_exists(id, partition_key)
+
+    def create_container_if_not_exists(self, id: str, partition_key: PartitionKey, **kwargs: Any) -> FakeContainer:
+        if id not in self.containers:
+            self.containers[id] = self.account.new_container(id, partition_key.path)
+        return self.containers[id]
+
+    def get_container_client(self, container: str) -> FakeContainer:
+        # Like the SDK, a container that does not exist yet only fails on first use; here it is created
+        return self.create_container_if_not_exists(container, PartitionKey("/question_id"))
+
+
+class FakeCosmosAccount:
+    def __init__(
+        self,
+        latency: Latency = lambda rng: 0.0,
+        ru_per_second: float = 0.0,
+        throttle_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency = latency
+        self.ru_per_second = ru_per_second
+        self.throttle_rate = throttle_rate
+        self.rng = random.Random(seed)
+        self.databases: Dict[str, FakeDatabase] = {}
+
+    @classmethod
+    def from_env(cls) -> "FakeCosmosAccount":
+        seed = os.getenv("FAKE_COSMOS_SEED")
+        account = cls(
+            latency=parse_latency(os.getenv("FAKE_COSMOS_LATENCY", "0")),
+            ru_per_second=float(os.getenv("FAKE_COSMOS_RU_PER_S", 0)),
+            throttle_rate=float(os.getenv("FAKE_COSMOS_429_RATE", 0)),
+            seed=int(seed) if seed else None,
+        )
+        data = os.getenv("FAKE_COSMOS_DATA")
+        if data:
+            load_answers(account.database(DATABASE_NAME).get_container_client(CONTAINER_NAME), data)
+        return account
+
+    def database(self, id: str) -> FakeDatabase:
+        return self.databases.setdefault(id, FakeDatabase(id, self))
+
+    def new_container(self, id: str, partition_key_path: str) -> FakeContainer:
+        return FakeContainer(id, partition_key_path, self.latency, self.ru_per_second, self.throttle_rate, self.rng)
+
+
+def load_answers(container: FakeContainer, path: str) -> int:
+    """Load an answers JSONL file in the shape backend/retrieval/data_load.py uploads it."""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            source = json.loads(line)
+            if "id" not in source:
+                continue
+            items.append({
+                "id": str(uuid.uuid4()),
+                "question_id": source["id"],
+                "category": source["category"],
+                "text": source["text"],
+            })
+    container.seed(items)
+    return len(items)
+
+
+_account: Optional[FakeCosmosAccount] = None
+
+
+def get_account() -> FakeCosmosAccount:
+    global _account
+    if _account is None:
+        _account = FakeCosmosAccount.from_env()
+    return _account
+
+
+class CosmosClient:
+    """Accepts the SDK's constructor arguments; all clients share one ``FakeCosmosAccount``."""
+
+    def __init__(self, url: Optional[str] = None, credential: Any = None, **kwargs: Any) -> None:
+        self.account = get_account()
+
+    def create_database(self, id: str, **kwargs: Any) -> FakeDatabase:
+        if id in self.account.databases:
+            raise CosmosResourceExistsError(f"Database {id!r} already exists")
+        return self.account.database(id)
+
+    def create_database_if_not_exists(self, id: str, **kwargs: Any) -> FakeDatabase:
+        return self.account.database(id)
+
+    def get_database_client(self, database: str) -> FakeDatabase:
+        return self.account.database(database)
+
+
+ContainerProxy = FakeContainer
+DatabaseProxy = FakeDatabase
+
+
+def install(account: Optional[FakeCosmosAccount] = None) -> FakeCosmosAccount:
+    """Register this module as ``azure.cosmos``, backed by ``account`` (built from the environment if not given)."""
+    global _account
+    if account is not None:
+        _account = account
+    module = sys.modules[__name__]
+    exceptions = types.ModuleType("azure.cosmos.exceptions")
+    for error in (CosmosHttpResponseError, CosmosResourceNotFoundError, CosmosResourceExistsError):
+        setattr(exceptions, error.__name__, error)
+    module.exceptions = exceptions  # type: ignore[attr-defined]
+    azure = sys.modules.get("azure") or types.ModuleType("azure")
+    azure.cosmos = module  # type: ignore[attr-defined]
+    sys.modules.update({"azure": azure, "azure.cosmos": module, "azure.cosmos.exceptions": exceptions})
+    return get_account()
@@ -0,0 +1,384 @@
+"""
+Stand-in for Azure OpenAI chat completions, for load tests and benchmarks.
+
+``FakeLLM`` answers chat completions the way a loaded deployment does: the
+first token arrives after a sampled latency, the rest stream at
+``tokens_per_second``, a share of calls fails with 429 or 500, and each
+deployment has an RPM/TPM quota over a sliding minute (calls over it get a
+429 with ``retry-after-ms``, counting ``max_tokens`` as Azure does).
+
+Two ways to use it:
+
+- In process: this module has the parts of the ``openai`` package the app
+  uses (``AsyncAzureOpenAI`` with an async ``chat.completions.create``,
+  ``RateLimitError``, ...). ``install()`` registers it as ``openai``, so the
+  app's own client, router, limiter and quota code run unchanged against it.
+  All clients share one ``FakeLLM``, so quotas hold across clients the way
+  they do across one Azure resource.
+- As a server with the Azure REST routes, for an app using the real SDK:
+      cd backend && python -m api.fake_openai --port 8001
+  then AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8001 and any API key.
+
+Latency specs: "0.8" (fixed), "uniform:0.2,1.5", "lognormal:0.8,0.5"
+(median, sigma) or "exponential:0.8" (mean), all in seconds.
+
+Environment (``FakeLLM.from_env``):
+    FAKE_LLM_LATENCY            time to first token (default 0)
+    FAKE_LLM_TOKENS_PER_S       completion speed after the first token (default 0: no extra delay)
+    FAKE_LLM_COMPLETION_TOKENS  length of an answer, capped by max_tokens (default 150)
+    FAKE_LLM_429_RATE           share of calls rejected with 429 (default 0)
+    FAKE_LLM_500_RATE           share of calls failing with 500 (default 0)
+    FAKE_LLM_RPM / FAKE_LLM_TPM per-deployment quota (default 0: unlimited)
+    FAKE_LLM_SEED               seed for latencies and injected errors
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+from .token_budget import count_message_tokens
+
+FILLER = (
+    "Start by writing down the three client types that bought from you most often this year "
+    "and what they had in common, then focus next quarter's outreach on those. "
+)
+
+Latency = Callable[[random.Random], float]
+
+# Production-like profile locustfile.py runs the stand-in with, unless FAKE_LLM_* say otherwise
+LOAD_TEST_PROFILE = {"FAKE_LLM_LATENCY": "lognormal:0.8,0.5", "FAKE_LLM_TOKENS_PER_S": "60"}
+
+
+def parse_latency(spec: str) -> Latency:
+    kind, _, params = spec.partition(":")
+    if not params:
+        value = float(kind)
+        return lambda rng: value
+    args = [float(p) for p in params.split(",")]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(args[0], args[1])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(args[0]), args[1])
+    if kind == "exponential":
+        return lambda rng: rng.expovariate(1 / args[0])
+    raise ValueError(f"unknown latency distribution {kind!r}")
+
+
+class APIStatusError(Exception):
+    """Same attributes as the SDK's errors: ``status_code`` and ``response.headers``."""
+
+    def __init__(self, message: str, status_code: int, headers: Optional[Dict[str, str]] = None) -> None:
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+        self.body = {"error": {"code": str(status_code), "message": message}}
+
+
+class RateLimitError(APIStatusError):
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message, 429, {"retry-after-ms": str(int(retry_after * 1000)), "retry-after": str(math.ceil(retry_after))})
+
+
+class InternalServerError(APIStatusError):
+    def __init__(self, message: str) -> None:
+        super().__init__(message, 500)
+
+
+class _MinuteQuota:
+    """Requests and tokens used over the last 60 seconds for one deployment."""
+
+    def __init__(self, rpm: int, tpm: int) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self.used: Deque[Tuple[float, int]] = deque()
+        self.tokens = 0
+
+    def take(self, tokens: int, now: float) -> Optional[float]:
+        """Count the call, or return the seconds until it would fit."""
+        while self.used and self.used[0][0] <= now - 60:
+            self.tokens -= self.used.popleft()[1]
+        if self._fits(len(self.used), self.tokens, tokens):
+            self.used.append((now, tokens))
+            self.tokens += tokens
+            return None
+        # Wait until enough of the oldest calls have left the window
+        freed = 0
+        for expired, (started, used) in enumerate(self.used, start=1):
+            freed += used
+            if self._fits(len(self.used) - expired, self.tokens - freed, tokens):
+                return max(started + 60 - now, 0.001)
+        return 60.0  # pragma: no cover - an empty window always fits
+
+    def _fits(self, requests: int, used_tokens: int, tokens: int) -> bool:
+        if self.rpm and requests >= self.rpm:
+            return False
+        # A call larger than the whole budget still goes through on an empty window
+        return not self.tpm or requests == 0 or used_tokens + tokens <= self.tpm
+
+
+def _namespace(value: Any) -> Any:
+    """JSON-style dicts to attribute access, like the SDK's response models."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_namespace(v) for v in value]
+    return value
+
+
+class FakeLLM:
+    def __init__(
+        self,
+        latency: Latency = lambda rng: 0.0,
+        tokens_per_second: float = 0.0,
+        completion_tokens: int = 150,
+        rate_429: float = 0.0,
+        rate_500: float = 0.0,
+        rpm: int = 0,
+        tpm: int = 0,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.rpm = rpm
+        self.tpm = tpm
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self._quotas: Dict[str, _MinuteQuota] = {}
+        self.calls = 0
+        self.ok = 0
+        self.throttled = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompt_tokens = 0
+        self.generated_tokens = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeLLM":
+        seed = os.getenv("FAKE_LLM_SEED")
+        return cls(
+            latency=parse_latency(os.getenv("FAKE_LLM_LATENCY", "0")),
+            tokens_per_second=float(os.getenv("FAKE_LLM_TOKENS_PER_S", 0)),
+            completion_tokens=int(os.getenv("FAKE_LLM_COMPLETION_TOKENS", 150)),
+            rate_429=float(os.getenv("FAKE_LLM_429_RATE", 0)),
+            rate_500=float(os.getenv("FAKE_LLM_500_RATE", 0)),
+            rpm=int(os.getenv("FAKE_LLM_RPM", 0)),
+            tpm=int(os.getenv("FAKE_LLM_TPM", 0)),
+            seed=int(seed) if seed else None,
+        )
+
+    def _admit(self, model: str, prompt_tokens: int, max_tokens: int) -> None:
+        """Raise the 429 the service would answer with before doing any work."""
+        if self.rng.random() < self.rate_429:
+            raise RateLimitError(f"Requests to {model} exceeded the rate limit", self.retry_after)
+        if self.rpm or self.tpm:
+            quota = self._quotas.setdefault(model, _MinuteQuota(self.rpm, self.tpm))
+            wait = quota.take(prompt_tokens + max_tokens, time.monotonic())
+            if wait is not None:
+                raise RateLimitError(f"Requests to {model} exceeded the rate limit", wait)
+
+    def _answer(self, messages: List[Dict[str, str]], tokens: int, json_mode: bool) -> str:
+        text = " ".join((FILLER * (tokens // len(FILLER.split()) + 1)).split()[:tokens])
+        if not json_mode:
+            return text
+        # Batched prompts (see micro_batch.py) get one answer per request id
+        try:
+            requests = json.loads(messages[-1]["content"]).get("requests", [])
+        except (ValueError, AttributeError, KeyError, IndexError):
+            requests = []
+        return json.dumps({"results": [{"id": r.get("id"), "content": text} for r in requests if isinstance(r, dict)]})
+
+    async def complete(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 4096,
+        stream: bool = False,
+        response_format: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """A chat completion as a dict, or an async iterator of chunk dicts when ``stream``."""
+        prompt_tokens = count_message_tokens(messages)
+        self.calls += 1
+        try:
+            self._admit(model, prompt_tokens, max_tokens)
+        except RateLimitError:
+            self.throttled += 1
+            raise
+        tokens = max(1, min(self.completion_tokens, max_tokens))
+        text = self._answer(messages, tokens, (response_format or {}).get("type") == "json_object")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency(self.rng))
+            if self.rng.random() < self.rate_500:
+                self.errors += 1
+                raise InternalServerError("The server had an error while processing your request")
+        except BaseException:
+            self.in_flight -= 1
+            raise
+        self.prompt_tokens += prompt_tokens
+        if stream:
+            return self._stream(completion_id, model, text, tokens)
+        try:
+            if self.tokens_per_second > 0:
+                await asyncio.sleep(tokens / self.tokens_per_second)
+        finally:
+            self.in_flight -= 1
+        self._finish(tokens)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": tokens, "total_tokens": prompt_tokens + tokens},
+        }
+
+    def _finish(self, tokens: int) -> None:
+        self.ok += 1
+        self.generated_tokens += tokens
+
+    async def _stream(self, completion_id: str, model: str, text: str, tokens: int) -> AsyncIterator[Dict[str, Any]]:
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        try:
+            yield chunk({"role": "assistant", "content": ""})
+            words = text.split(" ")
+            for i, word in enumerate(words):
+                if i and self.tokens_per_second > 0:
+                    await asyncio.sleep(tokens / self.tokens_per_second / len(words))
+                yield chunk({"content": word if i == 0 else " " + word})
+        finally:
+            self.in_flight -= 1
+        self._finish(tokens)
+        yield chunk({}, "stop")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "ok": self.ok,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.generated_tokens,
+        }
+
+
+_llm: Optional[FakeLLM] = None
+
+
+def get_fake_llm() -> FakeLLM:
+    global _llm
+    if _llm is None:
+        _llm = FakeLLM.from_env()
+    return _llm
+
+
+def install(llm: Optional[FakeLLM] = None) -> FakeLLM:
+    """Register this module as ``openai``, answering through ``llm`` (built from the environment if not given)."""
+    global _llm
+    if llm is not None:
+        _llm = llm
+    sys.modules["openai"] = sys.modules[__name__]
+    return get_fake_llm()
+
+
+class _Completions:
+    async def create(self, model: str, messages: List[Dict[str, str]], stream: bool = False, **kwargs: Any) -> Any:
+        result = await get_fake_llm().complete(model, messages, stream=stream, **kwargs)
+        if not stream:
+            return _namespace(result)
+
+        async def chunks() -> AsyncIterator[Any]:
+            async for chunk in result:
+                yield _namespace(chunk)
+        return chunks()
+
+
+class AsyncAzureOpenAI:
+    """Accepts the SDK's constructor arguments; calls go to the shared ``FakeLLM``."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.chat = SimpleNamespace(completions=_Completions())
+
+
+AsyncOpenAI = AsyncAzureOpenAI
+
+
+def create_app(llm: Optional[FakeLLM] = None) -> Any:
+    """An HTTP server with the Azure (and plain OpenAI) chat completion routes."""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    llm = llm or get_fake_llm()
+    app = FastAPI(title="Fake Azure OpenAI")
+
+    async def respond(model: str, body: Dict[str, Any]) -> Any:
+        body.pop("model", None)
+        try:
+            result = await llm.complete(model, **body)
+        except APIStatusError as exc:
+            return JSONResponse(exc.body, status_code=exc.status_code, headers=exc.response.headers)
+        if not body.get("stream"):
+            return JSONResponse(result)
+
+        async def events() -> AsyncIterator[str]:
+            async for chunk in result:
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def azure_chat(deployment: str, request: Request) -> Any:
+        return await respond(deployment, await request.json())
+
+    @app.post("/v1/chat/completions")
+    async def openai_chat(request: Request) -> Any:
+        body = await request.json()
+        return await respond(body.get("model", "default"), body)
+
+    @app.get("/stats")
+    async def stats() -> Dict[str, Any]:
+        return llm.stats()
+
+    return app
+
+
+def main() -> None:  # pragma: no cover - CLI entry point
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+    uvicorn.run(create_app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
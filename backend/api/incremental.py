@@ -0,0 +1,133 @@
+"""
+Incremental report regeneration for users who edit a few answers.
+
+The last per-question results of each user (score, category, prompt
+fingerprint and advice) are kept together with the R-question options they
+were scored against. On the next submission:
+
+- ``rule_index`` maps every R-question in ``score_rule.csv`` to the assessment
+  questions it weights, so only questions whose own score changed or that
+  are weighted by a changed R answer are rescored;
+- a question whose prompt fingerprint is unchanged reuses its stored advice,
+  so only questions whose effective prompt changed reach the LLM.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+PROMPT_FIELDS = ("question_id", "question", "catmapping", "new_category", "anwser", "additionalText")
+
+
+def rule_name(rule: str) -> Optional[str]:
+    """"R2 - A or B" -> "R2"; blank cells give None."""
+    if not rule or "-" not in rule:
+        return None
+    return rule.split("-")[0].strip()
+
+
+def rule_index(score_rules: Dict[str, List[str]]) -> Dict[str, Set[str]]:
+    """Reverse index: R-question name -> ids of the questions it weights."""
+    index: Dict[str, Set[str]] = {}
+    for question_id, rules in score_rules.items():
+        for rule in rules:
+            name = rule_name(rule)
+            if name:
+                index.setdefault(name, set()).add(question_id)
+    return index
+
+
+def r_answers(service_offering: Dict[str, Any]) -> Dict[str, str]:
+    """Selected option per R-question, as check_weighting reads it."""
+    return {
+        so["question_name"]: str(so.get("anwserselete", "")).lower()
+        for so in service_offering.values()
+        if isinstance(so, dict) and so.get("question_name")
+    }
+
+
+def prompt_fingerprint(q_data: Dict[str, Any], business_profile: Dict[str, str]) -> str:
+    """Hash of everything that goes into the advice prompt for one question."""
+    payload = {
+        "profile": business_profile,
+        "question": {k: str(q_data.get(k, "") or "").strip() for k in PROMPT_FIELDS},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class QuestionResult:
+    score: float
+    new_score: float
+    new_category: str
+    prompt_hash: str
+    advice: Optional[str] = None
+
+
+@dataclass
+class UserResults:
+    r_answers: Dict[str, str]
+    questions: Dict[str, QuestionResult] = field(default_factory=dict)
+
+
+class UserResultStore:
+    """In-memory LRU of the last results per user."""
+
+    def __init__(self, max_users: int = 10000) -> None:
+        self.max_users = max_users
+        self.rescored = 0
+        self.rescore_skipped = 0
+        self.regenerated = 0
+        self.reused = 0
+        self._users: "OrderedDict[str, UserResults]" = OrderedDict()
+
+    def get(self, user_id: str) -> Optional[UserResults]:
+        results = self._users.get(user_id)
+        if results is not None:
+            self._users.move_to_end(user_id)
+        return results
+
+    def put(self, user_id: str, results: UserResults) -> None:
+        self._users[user_id] = results
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def stats(self) -> Dict[str, Any]:
+        generated = self.regenerated + self.reused
+        return {
+            "users": len(self._users),
+            "rescored": self.rescored,
+            "rescore_skipped": self.rescore_skipped,
+            "regenerated": self.regenerated,
+            "reused": self.reused,
+            "reuse_rate": round(self.reused / generated, 3) if generated else 0.0,
+        }
+
+
+def questions_to_rescore(
+    previous: Optional[UserResults],
+    current_r_answers: Dict[str, str],
+    questions: List[Dict[str, Any]],
+    index: Dict[str, Set[str]],
+) -> Set[str]:
+    """Ids of questions whose weighted score may differ from the stored one."""
+    if previous is None:
+        return {q["question_id"] for q in questions}
+    changed_r = {
+        name for name in set(previous.r_answers) | set(current_r_answers)
+        if previous.r_answers.get(name) != current_r_answers.get(name)
+    }
+    affected: Set[str] = set()
+    for name in changed_r:
+        affected |= index.get(name, set())
+    for q in questions:
+        stored = previous.questions.get(q["question_id"])
+        if stored is None or stored.score != q.get("score", 0):
+            affected.add(q["question_id"])
+    return affected
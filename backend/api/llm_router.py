@@ -0,0 +1,212 @@
+"""
+Latency-aware router for spreading chat completions over several Azure OpenAI deployments.
+
+Each call goes to the deployment with the lowest expected wait, estimated as
+``(routed + 1) * ewma_latency``, where ``routed`` counts the calls sent to the
+deployment that have not finished yet, including those still queued locally
+for a quota or concurrency slot. A deployment that answers 429 is taken out
+of rotation for its Retry-After window and the call is retried on the next
+best deployment.
+
+Latency is measured by the call itself: it wraps the upstream request in
+``Deployment.upstream()``, so local queueing never counts as deployment latency.
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Set, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_COOLDOWN_SECONDS = 10.0
+EWMA_ALPHA = 0.2
+
+
+class Deployment:
+    """One Azure OpenAI deployment plus the live statistics used for routing."""
+
+    def __init__(
+        self,
+        name: str,
+        model: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        api_key: Optional[str] = None,
+        tier: str = "default",
+    ) -> None:
+        self.name = name
+        self.model = model or name
+        self.tier = tier
+        # endpoint/api_key of None means "use the default AZURE_OPENAI_* client"
+        self.endpoint = endpoint
+        self.api_key = api_key
+
+        self.routed = 0  # calls routed here and not finished, queued locally or upstream
+        self.in_flight = 0  # requests upstream right now
+        self.ewma_latency: Optional[float] = None
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.throttled = 0
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    @contextmanager
+    def upstream(self) -> Iterator[None]:
+        """Count and time one upstream request; a successful one updates the latency estimate."""
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+        self.observe_latency(time.monotonic() - started)
+
+    def observe_latency(self, latency: float) -> None:
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma_latency
+
+    def observe_throttle(self, retry_after: float) -> None:
+        self.throttled += 1
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + retry_after)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "name": self.name,
+            "model": self.model,
+            "endpoint": self.endpoint,
+            "tier": self.tier,
+            "routed": self.routed,
+            "in_flight": self.in_flight,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            "available": self.is_available(now),
+            "cooldown_remaining_s": round(max(0.0, self.cooldown_until - now), 3),
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "throttled": self.throttled,
+        }
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Return the cooldown for a 429 error, or None if the error is not a throttle."""
+    if getattr(exc, "status_code", None) != 429:
+        return None
+
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except (TypeError, ValueError):
+            continue
+    return DEFAULT_COOLDOWN_SECONDS
+
+
+class LLMRouter:
+    """Pick a deployment per call and keep per-deployment statistics."""
+
+    def __init__(self, deployments: List[Deployment]) -> None:
+        if not deployments:
+            raise ValueError("LLMRouter needs at least one deployment")
+        self.deployments = deployments
+
+    def _expected_wait(self, deployment: Deployment, default_latency: float) -> float:
+        latency = deployment.ewma_latency if deployment.ewma_latency is not None else default_latency
+        return (deployment.routed + 1) * latency
+
+    def pool(self, tier: Optional[str] = None) -> List[Deployment]:
+        """Deployments serving ``tier``; all deployments if none is tagged with it."""
+        if tier is None:
+            return self.deployments
+        return [d for d in self.deployments if d.tier == tier] or self.deployments
+
+    def pick(self, exclude: Optional[Set[str]] = None, tier: Optional[str] = None) -> Deployment:
+        """Return the deployment with the lowest expected wait.
+
+        Deployments in cooldown are skipped unless every candidate is cooling
+        down, in which case the one that recovers first is returned.
+        """
+        exclude = exclude or set()
+        pool = self.pool(tier)
+        candidates = [d for d in pool if d.name not in exclude] or pool
+        now = time.monotonic()
+        available = [d for d in candidates if d.is_available(now)]
+        if not available:
+            return min(candidates, key=lambda d: d.cooldown_until)
+
+        # Unmeasured deployments are assumed to be as fast as the measured average
+        known = [d.ewma_latency for d in pool if d.ewma_latency is not None]
+        default_latency = sum(known) / len(known) if known else 1.0
+        return min(available, key=lambda d: self._expected_wait(d, default_latency))
+
+    async def run(self, call: Callable[[Deployment], Awaitable[T]], tier: Optional[str] = None) -> T:
+        """Run ``call`` against the best deployment of ``tier``, failing over on 429.
+
+        ``call`` must wrap its upstream request in ``deployment.upstream()``;
+        that is the latency the router learns from.
+        """
+        pool_size = len(self.pool(tier))
+        tried: Set[str] = set()
+        while True:
+            deployment = self.pick(exclude=tried, tier=tier)
+            deployment.routed += 1
+            deployment.requests += 1
+            try:
+                result = await call(deployment)
+            except Exception as exc:
+                retry_after = retry_after_seconds(exc)
+                if retry_after is None:
+                    deployment.failures += 1
+                    raise
+                deployment.observe_throttle(retry_after)
+                tried.add(deployment.name)
+                if len(tried) >= pool_size:
+                    raise
+                continue
+            else:
+                deployment.successes += 1
+                return result
+            finally:
+                deployment.routed -= 1
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [d.snapshot() for d in self.deployments]
+
+
+def deployments_from_env() -> List[Deployment]:
+    """Build the deployment list from the environment.
+
+    ``AZURE_OPENAI_DEPLOYMENTS`` is either a comma-separated list of deployment
+    names on the default endpoint, or a JSON list of objects with ``name`` and
+    optional ``model``, ``endpoint``, ``api_key`` and ``tier`` (see
+    api.routing_policy). Without it the single ``AZURE_OPENAI_DEPLOYMENT`` is
+    used.
+    """
+    raw = os.getenv("AZURE_OPENAI_DEPLOYMENTS", "").strip()
+    if not raw:
+        single = os.getenv("AZURE_OPENAI_DEPLOYMENT")
+        return [Deployment(single)] if single else []
+
+    if raw.startswith("["):
+        entries = json.loads(raw)
+        return [
+            Deployment(
+                name=entry["name"],
+                model=entry.get("model"),
+                endpoint=entry.get("endpoint"),
+                api_key=entry.get("api_key"),
+                tier=entry.get("tier", "default"),
+            )
+            for entry in entries
+        ]
+
+    return [Deployment(name.strip()) for name in raw.split(",") if name.strip()]
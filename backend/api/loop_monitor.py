@@ -0,0 +1,150 @@
+"""
+Event-loop lag monitor and blocking-call detector.
+
+A heartbeat callback is rescheduled on the event loop every ``interval``
+seconds; how late it runs is the loop lag, kept in a sliding window for
+percentiles. A watchdog thread checks the heartbeat: when it is more than
+``threshold`` overdue, something is running on the loop without yielding,
+and the watchdog records the loop thread's current stack, i.e. the blocking
+callback caught in the act. Once the heartbeat runs again, the block gets
+its final duration.
+
+``ensure_running()`` attaches the monitor to the running loop; the app
+calls it on startup, so it follows the loop wherever the app runs (uvicorn,
+or a fresh loop per ``TestClient``).
+
+Environment:
+    LOOP_LAG_INTERVAL_MS       heartbeat interval (default 50)
+    LOOP_BLOCK_THRESHOLD_MS    record stacks of callbacks blocking longer than this (default 100, 0 = off)
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+
+@dataclass
+class Block:
+    started: float  # time.time() when the loop should have run the heartbeat
+    stack: List[str] = field(default_factory=list)
+    duration: Optional[float] = None  # seconds, known once the loop runs again
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1, window: int = 2048, max_blocks: int = 50) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.lags: Deque[float] = deque(maxlen=window)
+        self.blocks: Deque[Block] = deque(maxlen=max_blocks)
+        self.blocks_total = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._last_beat: Optional[float] = None
+        self._open_block: Optional[Block] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LoopLagMonitor":
+        return cls(
+            interval=float(os.getenv("LOOP_LAG_INTERVAL_MS", 50)) / 1000,
+            threshold=float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", 100)) / 1000,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def ensure_running(self) -> None:
+        """Start monitoring the running loop, unless it is already monitored."""
+        loop = asyncio.get_running_loop()
+        if loop is self._loop or not self.enabled:
+            return
+        with self._lock:
+            self._loop = loop
+            self._loop_thread = threading.get_ident()
+            self._last_beat = time.monotonic()
+            self._open_block = None
+        # A plain callback rather than a task: nothing is left pending when the loop closes
+        loop.call_later(self.interval, self._beat, loop, self._last_beat + self.interval)
+        if self._watchdog is None:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def _beat(self, loop: asyncio.AbstractEventLoop, due: float) -> None:
+        now = time.monotonic()
+        lag = max(0.0, now - due)
+        with self._lock:
+            if loop is not self._loop:
+                return  # the monitor moved on to another loop
+            self.lags.append(lag)
+            self._last_beat = now
+            if self._open_block is not None:
+                self._open_block.duration = lag
+                self._open_block = None
+        loop.call_later(self.interval, self._beat, loop, now + self.interval)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(min(self.interval, self.threshold) / 2):
+            self.check()
+
+    def check(self) -> Optional[Block]:
+        """Record a block if the heartbeat is overdue by more than the threshold (watchdog thread)."""
+        with self._lock:
+            loop, beat, thread = self._loop, self._last_beat, self._loop_thread
+            if loop is None or beat is None or thread is None or self._open_block is not None or not loop.is_running():
+                return None
+            overdue = time.monotonic() - beat - self.interval
+            if overdue <= self.threshold:
+                return None
+            frame = sys._current_frames().get(thread)
+            block = Block(
+                started=time.time() - overdue,
+                stack=traceback.format_stack(frame) if frame is not None else [],
+            )
+            self._open_block = block
+            self.blocks.append(block)
+            self.blocks_total += 1
+            return block
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._loop = None
+
+    def percentiles(self) -> Dict[str, float]:
+        lags = sorted(self.lags)
+        return {
+            "p50": percentile(lags, 0.5),
+            "p90": percentile(lags, 0.9),
+            "p99": percentile(lags, 0.99),
+            "max": lags[-1] if lags else 0.0,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold * 1000,
+            "lag_ms": {name: round(value * 1000, 3) for name, value in self.percentiles().items()},
+            "blocks_total": self.blocks_total,
+            "recent_blocks": [
+                {
+                    "started": block.started,
+                    "duration_ms": None if block.duration is None else round(block.duration * 1000, 3),
+                    "stack": block.stack[-8:],
+                }
+                for block in list(self.blocks)[-5:]
+            ],
+        }
@@ -0,0 +1,138 @@
+"""
+Cross-request micro-batching of chat completions.
+
+``MicroBatcher`` collects items submitted within a short window (or until
+``max_items`` arrive) under the same key and hands them to ``send_batch`` in
+one go; each waiting coroutine then receives its own result. Items the batch
+response did not answer raise ``BatchItemMissing`` so the caller can fall
+back to a single request. The batch is sent from the context of its first
+item, whichever submit or timer flushes it; keys should therefore separate
+items that must not share a context (e.g. different priority classes).
+
+``build_batch_messages``/``parse_batch_response`` turn several independent
+chat requests into one structured request and back. System prompts shared by
+several items (e.g. users with the same business profile) are sent once.
+"""
+
+import asyncio
+import contextvars
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from api.prompts import BATCH_SYSTEM_PROMPT
+
+
+class BatchItemMissing(Exception):
+    """The batch response had no usable answer for this item."""
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        send_batch: Callable[[Hashable, List[Any]], Awaitable[List[Optional[Any]]]],
+        window_seconds: float = 0.02,
+        max_items: int = 8,
+    ) -> None:
+        self.send_batch = send_batch
+        self.window_seconds = window_seconds
+        self.max_items = max_items
+        self.batches = 0
+        self.items = 0
+        self.missing = 0
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+        self._contexts: Dict[Hashable, contextvars.Context] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, key: Hashable, payload: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        if not batch:
+            self._contexts[key] = contextvars.copy_context()
+        batch.append((payload, future))
+        if len(batch) >= self.max_items:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.window_seconds, self._flush, key)
+        return await future
+
+    def _flush(self, key: Hashable) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        context = self._contexts.pop(key, None)
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._send(key, batch), context=context)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, key: Hashable, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.send_batch(key, [payload for payload, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            result = results[index] if index < len(results) else None
+            if result is None:
+                self.missing += 1
+                future.set_exception(BatchItemMissing(f"no result for batch item {index}"))
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "missing": self.missing,
+        }
+
+
+def build_batch_messages(requests: List[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+    """Combine several ``[system, user]`` message lists into one structured request."""
+    contexts: Dict[str, str] = {}
+    context_ids: Dict[str, str] = {}
+    entries = []
+    for index, messages in enumerate(requests):
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user = "\n".join(m["content"] for m in messages if m["role"] == "user")
+        if system not in context_ids:
+            context_ids[system] = f"c{len(context_ids)}"
+            contexts[context_ids[system]] = system
+        entries.append({"id": str(index), "context": context_ids[system], "message": user})
+
+    return [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": json.dumps({"contexts": contexts, "requests": entries}, ensure_ascii=False)},
+    ]
+
+
+def parse_batch_response(content: Optional[str], count: int) -> List[Optional[str]]:
+    """Map a batch response back to per-request answers; unanswered requests are None."""
+    answers: List[Optional[str]] = [None] * count
+    try:
+        results = json.loads(content or "").get("results", [])
+    except (ValueError, AttributeError):
+        return answers
+    for result in results if isinstance(results, list) else []:
+        if not isinstance(result, dict):
+            continue
+        try:
+            index = int(result.get("id", -1))
+        except (TypeError, ValueError):
+            continue
+        text = result.get("content")
+        if 0 <= index < count and isinstance(text, str) and text.strip():
+            answers[index] = text
+    return answers
@@ -17,3 +17,8 @@ class SaveReportResponse(BaseModel):
 class LLMAdviceResponse(BaseModel):
     advice: str
     timestamp: str
+    degraded: bool = False  # True when advice is template text and the LLM version is still being generated
+
+class SpeculativeAdviceResponse(BaseModel):
+    scheduled: int  # questions whose advice started generating in the background
+    timestamp: str
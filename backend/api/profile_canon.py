@@ -0,0 +1,155 @@
+"""
+Canonicalisation of the business profile before it reaches prompts and cache keys.
+
+"EdTech", "edtech " and "Education technology" should all produce the same
+system prompt. Each profile field is compared case- and whitespace-
+insensitively against the field's known values and a table of exact aliases
+(spellings and abbreviations of the same value). Nothing looser is applied:
+"tech" is not "Software / SaaS", so values that match nothing are kept, with
+only their whitespace cleaned up. For ``service_type``/``revenue_type`` only
+the selected option (the part before ``": "``) is canonicalised; any
+additional text the user wrote is kept as-is.
+
+Extra aliases can be supplied as ``{field: {variant: canonical}}`` in the
+JSON file named by ``PROFILE_SYNONYMS_PATH``. Match counts per field are kept
+so the hit rate of the mapping can be monitored.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+KNOWN_VALUES: Dict[str, List[str]] = {
+    "industry": [
+        "Education Technology", "Financial Technology", "Health Technology", "Software / SaaS",
+        "IT Services", "Cybersecurity", "Artificial Intelligence", "E-commerce", "Retail",
+        "Manufacturing", "Healthcare", "Professional Services", "Consulting", "Marketing & Advertising",
+        "Recruitment", "Real Estate", "Construction", "Logistics", "Telecommunications", "Energy",
+        "Media & Entertainment", "Hospitality", "Legal", "Financial Services", "Insurance", "Education",
+        "Non-profit", "Agriculture", "Automotive", "Travel",
+    ],
+    "business_challenge": [
+        "Lead generation", "Customer acquisition", "Customer retention", "Cashflow", "Scaling",
+        "Hiring", "Pricing", "Sales process", "Marketing", "Brand awareness", "Funding",
+        "Product market fit", "Competition", "Operations",
+    ],
+    "service_type": ["Service", "Platform", "Product"],
+    "revenue_type": ["One-off fees", "Monthly recurring revenue", "Multi-year recurring revenue"],
+}
+
+# Exact aliases only: each variant names the same thing as its canonical value. Broader
+# mappings ("tech", "growth") would merge profiles the prompt should tell apart
+SYNONYMS: Dict[str, Dict[str, str]] = {
+    "industry": {
+        "edtech": "Education Technology",
+        "ed tech": "Education Technology",
+        "ed-tech": "Education Technology",
+        "education tech": "Education Technology",
+        "fintech": "Financial Technology",
+        "fin tech": "Financial Technology",
+        "fin-tech": "Financial Technology",
+        "healthtech": "Health Technology",
+        "health tech": "Health Technology",
+        "health-tech": "Health Technology",
+        "saas": "Software / SaaS",
+        "software as a service": "Software / SaaS",
+        "cyber security": "Cybersecurity",
+        "ai": "Artificial Intelligence",
+        "ecommerce": "E-commerce",
+        "e commerce": "E-commerce",
+        "nonprofit": "Non-profit",
+        "non profit": "Non-profit",
+        "telecom": "Telecommunications",
+        "telecoms": "Telecommunications",
+    },
+    "business_challenge": {
+        "lead gen": "Lead generation",
+        "client acquisition": "Customer acquisition",
+        "client retention": "Customer retention",
+        "cash flow": "Cashflow",
+        "cash-flow": "Cashflow",
+        "pmf": "Product market fit",
+        "product-market fit": "Product market fit",
+    },
+    "service_type": {
+        "services": "Service",
+        "platforms": "Platform",
+        "products": "Product",
+    },
+    "revenue_type": {
+        "one off fees": "One-off fees",
+        "one-off fee": "One-off fees",
+        "mrr": "Monthly recurring revenue",
+        "multi year recurring revenue": "Multi-year recurring revenue",
+    },
+}
+
+# Fields whose value may carry free text after the selected option ("Platform: we build LMSs")
+OPTION_FIELDS = ("service_type", "revenue_type")
+OUTCOMES = ("exact", "synonym", "unmatched")
+
+
+def normalise(value: str) -> str:
+    """Case-fold and collapse whitespace: "  Ed-Tech " -> "ed-tech"."""
+    return " ".join(value.casefold().split())
+
+
+class ProfileCanonicalizer:
+    def __init__(
+        self,
+        known_values: Optional[Dict[str, List[str]]] = None,
+        synonyms: Optional[Dict[str, Dict[str, str]]] = None,
+    ) -> None:
+        known_values = known_values if known_values is not None else KNOWN_VALUES
+        synonyms = synonyms if synonyms is not None else SYNONYMS
+        # normalised form -> canonical value, per field
+        self._exact: Dict[str, Dict[str, str]] = {
+            field: {normalise(v): v for v in values} for field, values in known_values.items()
+        }
+        self._synonyms: Dict[str, Dict[str, str]] = {
+            field: {normalise(k): v for k, v in table.items()} for field, table in synonyms.items()
+        }
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def from_env(cls) -> "ProfileCanonicalizer":
+        synonyms = {field: dict(table) for field, table in SYNONYMS.items()}
+        path = os.getenv("PROFILE_SYNONYMS_PATH")
+        if path:
+            with open(path, encoding="utf-8") as f:
+                for field, table in json.load(f).items():
+                    synonyms.setdefault(field, {}).update(table)
+        return cls(synonyms=synonyms)
+
+    def _match(self, field: str, value: str) -> Tuple[str, str]:
+        key = normalise(value)
+        exact = self._exact.get(field, {})
+        if key in exact:
+            return exact[key], "exact"
+        synonyms = self._synonyms.get(field, {})
+        if key in synonyms:
+            return synonyms[key], "synonym"
+        return " ".join(value.split()), "unmatched"
+
+    def canonicalize(self, field: str, value: str) -> str:
+        if not value or value == "N/A":
+            return value
+        head, sep, tail = value.partition(": ") if field in OPTION_FIELDS else (value, "", "")
+        canonical, outcome = self._match(field, head)
+        field_counts = self.counts.setdefault(field, dict.fromkeys(OUTCOMES, 0))
+        field_counts[outcome] += 1
+        return f"{canonical}{sep}{tail.strip()}" if sep else canonical
+
+    def canonicalize_profile(self, business_profile: Dict[str, str]) -> Dict[str, str]:
+        return {field: self.canonicalize(field, value) for field, value in business_profile.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        fields = {}
+        total = matched = 0
+        for field, counts in self.counts.items():
+            field_total = sum(counts.values())
+            field_matched = field_total - counts["unmatched"]
+            total += field_total
+            matched += field_matched
+            fields[field] = dict(counts, hit_rate=round(field_matched / field_total, 3) if field_total else 0.0)
+        return {"hit_rate": round(matched / total, 3) if total else 0.0, "fields": fields}
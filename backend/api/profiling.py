@@ -0,0 +1,175 @@
+"""
+Opt-in profiling of single ``/api/llm-advice`` requests.
+
+When ``PROFILE_SECRET`` is set, a request carrying a valid
+``X-Debug-Profile`` header runs under cProfile. The profile (``.prof``,
+readable with ``pstats`` or snakeviz) and a JSON summary (status, wall time,
+the handler's stage breakdown and the top functions by cumulative time) are
+written to ``PROFILE_DIR`` by a writer thread, and the response names them in ``X-Profile-Id``.
+
+The header is ``<unix timestamp>:<hex HMAC-SHA256 of "<timestamp>:<path>">``
+keyed with the secret (see ``sign``), accepted for ``PROFILE_MAX_AGE_S``
+seconds. Without ``PROFILE_SECRET`` the middleware is not installed at all
+and ``record_stage`` costs one context variable lookup.
+
+cProfile sees everything the event loop runs while the request is in
+flight, so other requests handled concurrently show up in the profile too;
+only one request is profiled at a time.
+
+Environment:
+    PROFILE_SECRET      HMAC key for the X-Debug-Profile header (unset = profiling off)
+    PROFILE_DIR         output directory (default profiles)
+    PROFILE_MAX_AGE_S   how long a signed header stays valid (default 300)
+"""
+
+import contextvars
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import os
+import pstats
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .background_writer import BackgroundWriter
+
+HEADER = b"x-debug-profile"
+
+_stages: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar("profile_stages", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Add a stage timing to the breakdown of the request being profiled, if any."""
+    stages = _stages.get()
+    if stages is not None:
+        stages.append((stage, seconds))
+
+
+def sign(secret: str, path: str, timestamp: Optional[int] = None) -> str:
+    """Header value that enables profiling of one request to ``path``."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode(), f"{timestamp}:{path}".encode(), hashlib.sha256).hexdigest()
+    return f"{timestamp}:{digest}"
+
+
+class RequestProfiler:
+    def __init__(
+        self,
+        secret: str,
+        directory: str = "profiles",
+        max_age: float = 300.0,
+        paths: Tuple[str, ...] = ("/api/llm-advice",),
+        top: int = 25,
+    ) -> None:
+        self.secret = secret
+        self.directory = directory
+        self.max_age = max_age
+        self.paths = paths
+        self.top = top
+        self.active = False
+        self.profiled = 0
+        self.rejected = 0
+        # Dumping and formatting the stats is file I/O and pstats work: keep it off the loop
+        self._writer: BackgroundWriter[Tuple[str, cProfile.Profile, Dict[str, Any]]] = BackgroundWriter(
+            self._write_all, name="profile-writer"
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional["RequestProfiler"]:
+        secret = os.getenv("PROFILE_SECRET")
+        if not secret:
+            return None
+        return cls(
+            secret,
+            directory=os.getenv("PROFILE_DIR", "profiles"),
+            max_age=float(os.getenv("PROFILE_MAX_AGE_S", 300)),
+        )
+
+    def verify(self, value: str, path: str) -> bool:
+        timestamp = value.partition(":")[0]
+        try:
+            age = abs(time.time() - int(timestamp))
+        except ValueError:
+            return False
+        if age > self.max_age:
+            return False
+        return hmac.compare_digest(sign(self.secret, path, int(timestamp)), value)
+
+    def submit(self, profile_id: str, profile: cProfile.Profile, summary: Dict[str, Any]) -> None:
+        """Queue a finished profile for the writer thread."""
+        self._writer.put((profile_id, profile, summary))
+
+    def flush(self) -> None:
+        """Wait until the submitted profiles are on disk."""
+        self._writer.flush()
+
+    def _write_all(self, profiles: List[Tuple[str, cProfile.Profile, Dict[str, Any]]]) -> None:
+        for profile_id, profile, summary in profiles:
+            self.write(profile_id, profile, summary)
+
+    def write(self, profile_id: str, profile: cProfile.Profile, summary: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile_id)
+        profile.dump_stats(f"{base}.prof")
+        out = io.StringIO()
+        stats = pstats.Stats(profile, stream=out)
+        stats.sort_stats("cumulative").print_stats(self.top)
+        summary["top_functions"] = [line for line in out.getvalue().splitlines() if line.strip()]
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, profiler: RequestProfiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.profiler.paths:
+            await self.app(scope, receive, send)
+            return
+        header = next((value for name, value in scope.get("headers", []) if name == HEADER), None)
+        if header is None:
+            await self.app(scope, receive, send)
+            return
+        profiler = self.profiler
+        if profiler.active or not profiler.verify(header.decode("latin-1"), scope["path"]):
+            profiler.rejected += 1
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        status: Dict[str, Optional[int]] = {"code": None}
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = dict(message, headers=list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())])
+            await send(message)
+
+        stages: List[Tuple[str, float]] = []
+        token = _stages.set(stages)
+        profile = cProfile.Profile()
+        profiler.active = True
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.disable()
+            wall = time.perf_counter() - started
+            profiler.active = False
+            _stages.reset(token)
+            profiler.profiled += 1
+            profiler.submit(profile_id, profile, {
+                "id": profile_id,
+                "path": scope["path"],
+                "status": status["code"],
+                "wall_seconds": round(wall, 6),
+                "stages": [{"stage": stage, "seconds": round(seconds, 6)} for stage, seconds in stages],
+            })
@@ -47,4 +47,16 @@ USER_PROMPT_TEMPLATE = """
 Based on this general advice, {retrieved_text}
 and user's specific context for this question: {user_answer}
 Please provide a single actionable recommendation paragraph that addresses the user's specific business context and challenges. Your recommendation should be in this {advice_type} category.
-"""
\ No newline at end of file
+"""
+
+
+# Used by api.micro_batch to send several independent advice requests in one completion
+BATCH_SYSTEM_PROMPT = """
+You will receive a JSON object with "contexts" and "requests". Each request has an "id", a "context" key and a "message".
+Treat every request as a separate conversation: the referenced context is its system instructions and the message is the user's message.
+Answer each request independently, following its context's instructions exactly as if it had been sent on its own.
+
+Respond with a single JSON object and nothing else, in this shape:
+{"results": [{"id": "<request id>", "content": "<your answer to that request>"}]}
+Include exactly one result for every request id.
+"""
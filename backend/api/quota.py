@@ -0,0 +1,289 @@
+"""
+Cluster-wide LLM quota shared by every worker and pod.
+
+Each deployment has a requests-per-minute and a tokens-per-minute quota at
+Azure OpenAI, shared by all our processes. ``ClusterQuota`` keeps one budget
+per deployment and kind in a shared backend, refilled every ``window``
+seconds (the per-minute quota scaled to the window, matching how Azure
+enforces it in short windows). Workers do not go to the backend for every
+call: they lease a chunk (``chunk_fraction`` of the window budget, or what
+the call needs if more) and spend it locally. Chunks are small and expire
+with their window, so a busy worker cannot hoard the budget and starve the
+others.
+
+Before a call the worker takes one request and ``prompt + max_tokens``
+tokens; once the real usage is known the unused tokens go back to its local
+lease.
+
+Backends only need an atomic "grant up to N from this window's budget":
+
+- ``SQLiteQuotaBackend``: a SQLite file, for several workers on one host
+  and for tests;
+- ``RedisQuotaBackend``: any server speaking the Redis protocol
+  (``SET NX EX`` + ``INCRBY``), through a minimal built-in client, so no
+  Redis package is required.
+
+Environment:
+    LLM_QUOTA_RPM          requests per minute per deployment, cluster-wide (default 0 = off)
+    LLM_QUOTA_TPM          tokens per minute per deployment, cluster-wide (default 0 = off)
+    LLM_QUOTA_BACKEND      "sqlite:<path>" (default sqlite:llm_quota.sqlite) or "redis://host:port/db"
+    LLM_QUOTA_WINDOW_S     refill window in seconds (default 10)
+    LLM_QUOTA_CHUNK        fraction of the window budget leased at a time (default 0.1)
+"""
+
+import abc
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+REQUESTS = "requests"
+TOKENS = "tokens"
+
+
+class QuotaBackend(abc.ABC):
+    @abc.abstractmethod
+    async def lease(self, key: str, amount: int, limit: int, ttl: float) -> int:
+        """Atomically grant up to ``amount`` from the ``limit`` budget stored at ``key``."""
+
+
+class SQLiteQuotaBackend(QuotaBackend):
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS quota (key TEXT PRIMARY KEY, used INTEGER NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def _lease(self, key: str, amount: int, limit: int, ttl: float) -> int:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM quota WHERE expires < ?", (now,))
+                row = self._conn.execute("SELECT used FROM quota WHERE key = ?", (key,)).fetchone()
+                used = row[0] if row is not None else 0
+                granted = max(0, min(amount, limit - used))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO quota (key, used, expires) VALUES (?, ?, ?)", (key, used + granted, now + ttl)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return granted
+
+    async def lease(self, key: str, amount: int, limit: int, ttl: float) -> int:
+        return await asyncio.to_thread(self._lease, key, amount, limit, ttl)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class RedisError(Exception):
+    pass
+
+
+def encode_command(*args: Any) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    line = (await reader.readline()).rstrip(b"\r\n")
+    if not line:
+        raise ConnectionError("Redis connection closed")
+    kind, rest = line[:1], line[1:]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise RedisError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        size = int(rest)
+        if size < 0:
+            return None
+        data = await reader.readexactly(size + 2)
+        return data[:-2].decode("utf-8")
+    if kind == b"*":
+        size = int(rest)
+        return None if size < 0 else [await read_reply(reader) for _ in range(size)]
+    raise RedisError(f"Unexpected reply: {line!r}")
+
+
+class RedisQuotaBackend(QuotaBackend):
+    """Window budget as a Redis counter: ``SET key 0 EX ttl NX`` then ``INCRBY``, pipelined."""
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, password: Optional[str] = None) -> None:
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        # One connection per event loop; the lock keeps request/reply pairs in order
+        self._conn: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.StreamReader, asyncio.StreamWriter, asyncio.Lock]] = None
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisQuotaBackend":
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip("/") or 0)
+        return cls(parsed.hostname or "localhost", parsed.port or 6379, db, parsed.password)
+
+    async def _connection(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, asyncio.Lock]:
+        loop = asyncio.get_running_loop()
+        if self._conn is not None and self._conn[0] is loop and not self._conn[2].is_closing():
+            return self._conn[1], self._conn[2], self._conn[3]
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        setup: List[Tuple[Any, ...]] = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        for command in setup:
+            writer.write(encode_command(*command))
+            await writer.drain()
+            await read_reply(reader)
+        self._conn = (loop, reader, writer, asyncio.Lock())
+        return reader, writer, self._conn[3]
+
+    async def execute(self, *commands: Tuple[Any, ...]) -> List[Any]:
+        """Send the commands in one pipeline and return their replies."""
+        reader, writer, lock = await self._connection()
+        async with lock:
+            try:
+                writer.write(b"".join(encode_command(*command) for command in commands))
+                await writer.drain()
+                return [await read_reply(reader) for _ in commands]
+            except BaseException:
+                # An error reply or a cancellation can leave replies unread, and the next caller
+                # would read them as its own: drop the connection and start a new one next time
+                writer.close()
+                if self._conn is not None and self._conn[2] is writer:
+                    self._conn = None
+                raise
+
+    async def lease(self, key: str, amount: int, limit: int, ttl: float) -> int:
+        _, used = await self.execute(("SET", key, 0, "EX", max(1, math.ceil(ttl)), "NX"), ("INCRBY", key, amount))
+        over = used - limit
+        if over <= 0:
+            return amount
+        granted = max(0, amount - over)
+        # Hand back what we could not use so other workers can still get the remainder
+        await self.execute(("DECRBY", key, amount - granted))
+        return granted
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            self._conn[2].close()
+            self._conn = None
+
+
+def quota_backend_from_spec(spec: str) -> QuotaBackend:
+    if spec.startswith("redis://"):
+        return RedisQuotaBackend.from_url(spec)
+    if spec.startswith("sqlite:"):
+        return SQLiteQuotaBackend(spec[len("sqlite:"):])
+    raise ValueError(f"LLM_QUOTA_BACKEND must be 'sqlite:<path>' or 'redis://host:port/db', got {spec!r}")
+
+
+@dataclass
+class _Lease:
+    window: int
+    remaining: int
+
+
+class ClusterQuota:
+    def __init__(
+        self,
+        backend: QuotaBackend,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        window: float = 10.0,
+        chunk_fraction: float = 0.1,
+        namespace: str = "llm-quota",
+    ) -> None:
+        self.backend = backend
+        self.window = window
+        self.chunk_fraction = chunk_fraction
+        self.namespace = namespace
+        self.limits: Dict[str, int] = {}
+        for kind, per_minute in ((REQUESTS, requests_per_minute), (TOKENS, tokens_per_minute)):
+            if per_minute > 0:
+                self.limits[kind] = max(1, int(per_minute * window / 60))
+        self._leases: Dict[Tuple[str, str], _Lease] = {}
+        self.round_trips = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional["ClusterQuota"]:
+        rpm = float(os.getenv("LLM_QUOTA_RPM", 0))
+        tpm = float(os.getenv("LLM_QUOTA_TPM", 0))
+        if rpm <= 0 and tpm <= 0:
+            return None
+        return cls(
+            quota_backend_from_spec(os.getenv("LLM_QUOTA_BACKEND", "sqlite:llm_quota.sqlite")),
+            requests_per_minute=rpm,
+            tokens_per_minute=tpm,
+            window=float(os.getenv("LLM_QUOTA_WINDOW_S", 10)),
+            chunk_fraction=float(os.getenv("LLM_QUOTA_CHUNK", 0.1)),
+        )
+
+    def _window(self) -> int:
+        return int(time.time() // self.window)
+
+    async def _take(self, deployment: str, kind: str, amount: int) -> None:
+        limit = self.limits[kind]
+        amount = min(amount, limit)  # a call larger than a whole window still has to go through
+        while True:
+            window = self._window()
+            lease = self._leases.get((deployment, kind))
+            if lease is None or lease.window != window:
+                lease = self._leases[(deployment, kind)] = _Lease(window, 0)
+            if lease.remaining < amount:
+                want = max(amount - lease.remaining, math.ceil(limit * self.chunk_fraction))
+                self.round_trips += 1
+                key = f"{self.namespace}:{deployment}:{kind}:{window}"
+                lease.remaining += await self.backend.lease(key, want, limit, ttl=2 * self.window)
+            if lease.remaining >= amount:
+                lease.remaining -= amount
+                return
+            # The cluster spent this window's budget: wait for the next one
+            delay = (window + 1) * self.window - time.time()
+            self.waits += 1
+            self.wait_seconds += max(delay, 0.0)
+            await asyncio.sleep(max(delay, 0.0))
+
+    async def acquire(self, deployment: str, tokens: int = 0) -> None:
+        """Take one request and ``tokens`` tokens for a call to ``deployment``, waiting if needed."""
+        if REQUESTS in self.limits:
+            await self._take(deployment, REQUESTS, 1)
+        if TOKENS in self.limits and tokens > 0:
+            await self._take(deployment, TOKENS, tokens)
+
+    def refund(self, deployment: str, tokens: int) -> None:
+        """Return tokens reserved for a call but not used to the local lease."""
+        lease = self._leases.get((deployment, TOKENS))
+        if tokens > 0 and lease is not None and lease.window == self._window():
+            lease.remaining += tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "limits_per_window": dict(self.limits),
+            "window_seconds": self.window,
+            "round_trips": self.round_trips,
+            "waits": self.waits,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "leased": {f"{d}:{k}": lease.remaining for (d, k), lease in self._leases.items()},
+        }
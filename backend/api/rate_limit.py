@@ -0,0 +1,289 @@
+"""
+Per-user and per-IP rate limiting for the LLM endpoints.
+
+Off unless a rule is configured. ``RateLimitMiddleware`` is a plain ASGI
+middleware: for the configured POST paths it reads the JSON body once to find
+``userId`` and takes one token from both the user's bucket and the client IP's
+bucket. Each path has its own buckets, so the partial posts made while a user
+answers do not use up the tokens of their final report request. Both are checked before either is charged, so a request refused by
+one bucket costs nothing in the other. When either is empty it answers 429
+with ``Retry-After`` / ``X-RateLimit-*`` headers; otherwise the body is
+replayed to the application unchanged.
+
+Buckets live in a ``BucketBackend``. ``InMemoryBucketBackend`` (the default)
+is per process; ``SQLiteBucketBackend`` shares buckets between the workers of
+one host through a SQLite file; any other backend can be plugged in with
+``RATE_LIMIT_BACKEND=package.module:factory``.
+
+Environment:
+    RATE_LIMIT_USER_PER_MIN   refill rate per userId (default 0: no per-user limit)
+    RATE_LIMIT_USER_BURST     bucket size per userId (default 5)
+    RATE_LIMIT_IP_PER_MIN     refill rate per client IP (default 0: no per-IP limit)
+    RATE_LIMIT_IP_BURST       bucket size per client IP (default 30)
+    RATE_LIMIT_PATHS          comma-separated POST paths (default /api/llm-advice,/api/llm-advice/partial)
+    RATE_LIMIT_TRUST_FORWARDED  use the first X-Forwarded-For address as client IP (default false);
+                              enable only behind a proxy that sets it, such as the Next.js routes
+    RATE_LIMIT_BACKEND        "memory" (default), "sqlite:<path>" or "package.module:factory"
+"""
+
+import abc
+import asyncio
+import importlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_PATHS = ("/api/llm-advice", "/api/llm-advice/partial")
+
+# (key, capacity, refill rate per second)
+Bucket = Tuple[str, float, float]
+
+
+@dataclass
+class BucketResult:
+    allowed: bool
+    remaining: float
+    retry_after: float  # seconds until one token is available again (0 when allowed)
+
+
+def refill(tokens: float, updated: float, now: float, capacity: float, rate: float) -> float:
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+def take_tokens(levels: List[float], buckets: Sequence[Bucket], cost: float) -> Tuple[List[float], List[BucketResult]]:
+    """Charge ``cost`` from every refilled bucket, or from none if any of them is short.
+
+    Returns the new levels and one result per bucket; ``allowed`` is whether
+    that bucket had enough.
+    """
+    enough = [tokens >= cost for tokens in levels]
+    if all(enough):
+        levels = [tokens - cost for tokens in levels]
+        return levels, [BucketResult(True, tokens, 0.0) for tokens in levels]
+    results = []
+    for tokens, ok, (_, _, rate) in zip(levels, enough, buckets):
+        wait = 0.0 if ok else (cost - tokens) / rate if rate > 0 else math.inf
+        results.append(BucketResult(ok, tokens, wait))
+    return levels, results
+
+
+class BucketBackend(abc.ABC):
+    """Storage for token buckets."""
+
+    @abc.abstractmethod
+    async def take(self, buckets: Sequence[Bucket], cost: float = 1.0) -> List[BucketResult]:
+        """Refill the buckets and charge ``cost`` to all of them, or to none, atomically."""
+
+
+class InMemoryBucketBackend(BucketBackend):
+    def __init__(self, max_keys: int = 100000) -> None:
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, buckets: Sequence[Bucket], cost: float = 1.0) -> List[BucketResult]:
+        now = time.monotonic()
+        levels = []
+        for key, capacity, rate in buckets:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            levels.append(refill(tokens, updated, now, capacity, rate))
+        levels, results = take_tokens(levels, buckets, cost)
+        for (key, _, _), tokens in zip(buckets, levels):
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)  # idle buckets are full anyway
+        return results
+
+
+class SQLiteBucketBackend(BucketBackend):
+    """Buckets shared by the processes of one host; each take is one IMMEDIATE transaction."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _take(self, buckets: Sequence[Bucket], cost: float) -> List[BucketResult]:
+        now = time.time()  # wall clock: shared between processes
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                levels = []
+                for key, capacity, rate in buckets:
+                    row = self._conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                    tokens, updated = row if row is not None else (capacity, now)
+                    levels.append(refill(tokens, updated, now, capacity, rate))
+                levels, results = take_tokens(levels, buckets, cost)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    [(key, tokens, now) for (key, _, _), tokens in zip(buckets, levels)],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return results
+
+    async def take(self, buckets: Sequence[Bucket], cost: float = 1.0) -> List[BucketResult]:
+        return await asyncio.to_thread(self._take, buckets, cost)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def backend_from_spec(spec: str) -> BucketBackend:
+    if not spec or spec == "memory":
+        return InMemoryBucketBackend()
+    if spec.startswith("sqlite:"):
+        return SQLiteBucketBackend(spec[len("sqlite:"):])
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"RATE_LIMIT_BACKEND must be 'memory', 'sqlite:<path>' or 'module:factory', got {spec!r}")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+@dataclass
+class Rule:
+    name: str  # "user" or "ip"
+    per_minute: float
+    burst: float
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60.0
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        backend: Optional[BucketBackend] = None,
+        user_rule: Optional[Rule] = None,
+        ip_rule: Optional[Rule] = None,
+        paths: Tuple[str, ...] = DEFAULT_PATHS,
+        trust_forwarded: bool = False,
+    ) -> None:
+        self.backend = backend or InMemoryBucketBackend()
+        self.rules = [rule for rule in (user_rule, ip_rule) if rule is not None and rule.per_minute > 0]
+        self.paths = paths
+        self.trust_forwarded = trust_forwarded
+        self.allowed = 0
+        self.limited: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        return cls(
+            backend=backend_from_spec(os.getenv("RATE_LIMIT_BACKEND", "memory")),
+            user_rule=Rule("user", float(os.getenv("RATE_LIMIT_USER_PER_MIN", 0)), float(os.getenv("RATE_LIMIT_USER_BURST", 5))),
+            ip_rule=Rule("ip", float(os.getenv("RATE_LIMIT_IP_PER_MIN", 0)), float(os.getenv("RATE_LIMIT_IP_BURST", 30))),
+            paths=tuple(p.strip() for p in os.getenv("RATE_LIMIT_PATHS", ",".join(DEFAULT_PATHS)).split(",") if p.strip()),
+            trust_forwarded=os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() in ("1", "true", "yes"),
+        )
+
+    async def check(self, path: str, identities: Dict[str, Optional[str]]) -> Optional[Tuple[Rule, BucketResult]]:
+        """Charge every applicable bucket of ``path``, or none of them; returns the first rule that limits, or None."""
+        rules = [rule for rule in self.rules if identities.get(rule.name)]
+        if rules:
+            buckets = [(f"{rule.name}:{path}:{identities[rule.name]}", rule.burst, rule.rate) for rule in rules]
+            for rule, result in zip(rules, await self.backend.take(buckets)):
+                if not result.allowed:
+                    self.limited[rule.name] = self.limited.get(rule.name, 0) + 1
+                    return rule, result
+        self.allowed += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "allowed": self.allowed,
+            "limited": dict(self.limited),
+        }
+
+
+def client_ip(scope: Scope, trust_forwarded: bool) -> Optional[str]:
+    if trust_forwarded:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+def user_id_from_body(body: bytes) -> Optional[str]:
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    user_id = data.get("userId") if isinstance(data, dict) else None
+    return str(user_id) if user_id else None
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, limiter: RateLimiter) -> None:
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.limiter.paths:
+            await self.app(scope, receive, send)
+            return
+
+        chunks: List[bytes] = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                # Client went away before sending the body; let the app see the disconnect
+                await self.app(scope, _replay([message], receive), send)
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        limited = await self.limiter.check(scope["path"], {
+            "user": user_id_from_body(body),
+            "ip": client_ip(scope, self.limiter.trust_forwarded),
+        })
+        if limited is None:
+            await self.app(scope, _replay([{"type": "http.request", "body": body, "more_body": False}], receive), send)
+            return
+
+        rule, result = limited
+        retry_after = max(1, math.ceil(result.retry_after)) if math.isfinite(result.retry_after) else 60
+        payload = json.dumps({"detail": f"Too many requests for this {rule.name}, retry in {retry_after}s"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+                (b"x-ratelimit-limit", str(int(rule.burst)).encode()),
+                (b"x-ratelimit-remaining", str(int(result.remaining)).encode()),
+                (b"x-ratelimit-reset", str(retry_after).encode()),
+                (b"x-ratelimit-scope", rule.name.encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+
+def _replay(messages: List[Message], receive: Receive) -> Receive:
+    pending = list(messages)
+
+    async def replay_receive() -> Message:
+        if pending:
+            return pending.pop(0)
+        return await receive()
+
+    return replay_receive
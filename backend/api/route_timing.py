@@ -0,0 +1,40 @@
+"""
+Timing of FastAPI's request parsing and validation.
+
+FastAPI reads the body and validates it against the endpoint's models before
+the endpoint runs, so the endpoint cannot time that work itself. Routes
+created with ``TimedRoute`` note when their handler started; the endpoint
+reads ``handler_started()`` and counts the time up to its first line as the
+validation stage. Requests that fail validation never reach the endpoint and
+are not counted.
+"""
+
+import contextvars
+import time
+from typing import Any, Callable, Coroutine, Optional
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+
+_handler_started: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("route_handler_started", default=None)
+
+
+def handler_started() -> Optional[float]:
+    """``time.perf_counter()`` when the current request's route handler started, if timed."""
+    return _handler_started.get()
+
+
+class TimedRoute(APIRoute):
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            # The endpoint runs in this task, so it sees the value
+            token = _handler_started.set(time.perf_counter())
+            try:
+                return await handler(request)
+            finally:
+                _handler_started.reset(token)
+
+        return timed_handler
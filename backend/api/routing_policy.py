@@ -0,0 +1,75 @@
+"""
+Per-category routing policy for advice generation.
+
+Maps a question's phase (``catmapping``) and advice category (``new_category``)
+to a deployment tier and completion parameters, so e.g. short Keep_Doing advice
+can go to a smaller deployment with a lower ``max_tokens``.
+
+``LLM_ROUTING_POLICY`` holds the policy as JSON (or a path to a JSON file)::
+
+    {
+      "default": {"max_tokens": 512, "temperature": 0.4},
+      "routes": {
+        "Keep_Doing": {"tier": "small", "max_tokens": 256},
+        "Scalable:Do_More": {"max_tokens": 384}
+      }
+    }
+
+Route keys are ``"<phase>:<category>"``, ``"<category>"`` or ``"<phase>"``;
+the most specific match wins and unset fields fall back to ``default``.
+Routes without a tier go to the ``"default"`` tier (untagged deployments),
+so a cheaper tier only serves the routes that name it.
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional
+
+DEFAULT_MAX_TOKENS = 512
+DEFAULT_TEMPERATURE = 0.4
+DEFAULT_TIER = "default"  # Deployment.tier when none is configured
+
+
+class RouteDecision:
+    """Deployment tier and completion parameters for one question."""
+
+    def __init__(self, tier: str, max_tokens: int, temperature: float) -> None:
+        self.tier = tier
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, RouteDecision) and vars(self) == vars(other)
+
+    def __repr__(self) -> str:
+        return f"RouteDecision(tier={self.tier!r}, max_tokens={self.max_tokens}, temperature={self.temperature})"
+
+
+class RoutingPolicy:
+    def __init__(self, default: Optional[Dict[str, Any]] = None, routes: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        self.default: Dict[str, Any] = {"tier": DEFAULT_TIER, "max_tokens": DEFAULT_MAX_TOKENS, "temperature": DEFAULT_TEMPERATURE}
+        self.default.update(default or {})
+        self.routes = routes or {}
+
+    def decide(self, phase: str, category: str) -> RouteDecision:
+        settings = dict(self.default)
+        # Apply least specific first so the most specific route wins
+        for key in (phase, category, f"{phase}:{category}"):
+            if key and key in self.routes:
+                settings.update(self.routes[key])
+        return RouteDecision(
+            tier=str(settings["tier"]),
+            max_tokens=int(settings["max_tokens"]),
+            temperature=float(settings["temperature"]),
+        )
+
+
+def routing_policy_from_env() -> RoutingPolicy:
+    raw = os.getenv("LLM_ROUTING_POLICY", "").strip()
+    if not raw:
+        return RoutingPolicy()
+    if not raw.startswith("{"):
+        with open(raw, encoding="utf-8") as f:
+            raw = f.read()
+    config = json.loads(raw)
+    return RoutingPolicy(default=config.get("default"), routes=config.get("routes"))
@@ -0,0 +1,197 @@
+"""
+Priority scheduler for LLM completions.
+
+Every completion waits here for a slot before it goes upstream. Work is
+split into three priority classes:
+
+- ``interactive``: a user waiting on ``/api/llm-advice``;
+- ``job``: background work for a user (speculative sections, refinement after
+  degradation);
+- ``precompute``: the offline precompute run.
+
+A free slot goes to the highest class with a waiter, as long as that class
+stays under its share of the capacity, so background work can never fill the
+slots interactive requests need. Within a class, users are served by
+weighted-fair queueing (start-time fair queueing, equal weights by default),
+so one user's 34 questions do not queue everyone else behind them.
+
+The class and user of the current work travel in context variables: set them
+with ``set_priority`` or ``priority`` before creating the tasks that call the
+LLM, and tasks created afterwards inherit them.
+
+Environment:
+    LLM_SCHED_SHARES   class shares of the capacity, e.g.
+                       "interactive=1.0,job=0.5,precompute=0.25" (the default)
+"""
+
+import asyncio
+import contextvars
+import heapq
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+INTERACTIVE = "interactive"
+JOB = "job"
+PRECOMPUTE = "precompute"
+PRIORITY_CLASSES = (INTERACTIVE, JOB, PRECOMPUTE)
+
+DEFAULT_SHARES = {INTERACTIVE: 1.0, JOB: 0.5, PRECOMPUTE: 0.25}
+
+priority_class: contextvars.ContextVar[str] = contextvars.ContextVar("llm_priority_class", default=INTERACTIVE)
+priority_user: contextvars.ContextVar[str] = contextvars.ContextVar("llm_priority_user", default="anonymous")
+
+
+def set_priority(cls: str, user: Optional[str] = None) -> None:
+    """Set the class (and user) for the current task and the tasks it creates from now on."""
+    if cls not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class: {cls}")
+    priority_class.set(cls)
+    if user is not None:
+        priority_user.set(user)
+
+
+@contextmanager
+def priority(cls: str, user: Optional[str] = None) -> Iterator[None]:
+    """Like set_priority, restoring the previous values on exit."""
+    if cls not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class: {cls}")
+    class_token = priority_class.set(cls)
+    user_token = priority_user.set(user if user is not None else priority_user.get())
+    try:
+        yield
+    finally:
+        priority_user.reset(user_token)
+        priority_class.reset(class_token)
+
+
+def shares_from_env() -> Dict[str, float]:
+    shares = dict(DEFAULT_SHARES)
+    raw = os.getenv("LLM_SCHED_SHARES", "")
+    for item in raw.split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            if name.strip() in shares:
+                shares[name.strip()] = float(value)
+    return shares
+
+
+class _ClassQueue:
+    """Waiters of one class, ordered by start-time fair queueing across users."""
+
+    def __init__(self) -> None:
+        self.heap: List[Tuple[float, int, asyncio.Future]] = []
+        self.virtual_time = 0.0
+        self.last_tag: Dict[str, float] = {}
+        self.in_flight = 0
+        self.dispatched = 0
+        self.wait_times: Deque[float] = deque(maxlen=1000)
+
+    def push(self, user: str, weight: float, seq: int, future: asyncio.Future) -> None:
+        tag = max(self.virtual_time, self.last_tag.get(user, 0.0)) + 1.0 / weight
+        self.last_tag[user] = tag
+        heapq.heappush(self.heap, (tag, seq, future))
+
+    def pop(self) -> Optional[asyncio.Future]:
+        while self.heap:
+            tag, _, future = heapq.heappop(self.heap)
+            if not future.done():  # cancelled waiters are dropped
+                self.virtual_time = tag
+                return future
+        # Idle: forget per-user tags so returning users start level with everyone else
+        self.last_tag.clear()
+        return None
+
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self.heap if not future.done())
+
+
+class PriorityScheduler:
+    def __init__(
+        self,
+        capacity: Callable[[], int],
+        shares: Optional[Dict[str, float]] = None,
+        user_weights: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.capacity = capacity
+        self.shares = dict(DEFAULT_SHARES, **(shares or {}))
+        self.user_weights = user_weights or {}
+        self._queues = {cls: _ClassQueue() for cls in PRIORITY_CLASSES}
+        self._seq = 0
+
+    @property
+    def in_flight(self) -> int:
+        return sum(queue.in_flight for queue in self._queues.values())
+
+    def waiting(self, cls: Optional[str] = None) -> int:
+        """Calls waiting for a slot, in one class or in all of them."""
+        queues = [self._queues[cls]] if cls is not None else list(self._queues.values())
+        return sum(queue.waiting() for queue in queues)
+
+    def _class_limit(self, cls: str) -> int:
+        return max(1, math.floor(self.capacity() * self.shares[cls]))
+
+    def _can_start(self, cls: str) -> bool:
+        return self.in_flight < self.capacity() and self._queues[cls].in_flight < self._class_limit(cls)
+
+    def _dispatch(self) -> None:
+        for cls in PRIORITY_CLASSES:
+            queue = self._queues[cls]
+            while self._can_start(cls):
+                future = queue.pop()
+                if future is None:
+                    break
+                queue.in_flight += 1
+                future.set_result(None)
+            if queue.waiting() and self.in_flight >= self.capacity():
+                # Lower classes never take a free slot from a waiting higher class
+                return
+
+    async def acquire(self) -> str:
+        cls = priority_class.get()
+        queue = self._queues[cls]
+        user = priority_user.get()
+        # Plain futures, as in AdaptiveLimiter, so the scheduler is not tied to one event loop
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        queue.push(user, self.user_weights.get(user, 1.0), self._seq, future)
+        started = time.monotonic()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(cls)  # the slot was handed over as we were cancelled
+            raise
+        queue.dispatched += 1
+        queue.wait_times.append(time.monotonic() - started)
+        return cls
+
+    def release(self, cls: str) -> None:
+        self._queues[cls].in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        cls = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(cls)
+
+    def stats(self) -> Dict[str, Any]:
+        classes = {}
+        for cls, queue in self._queues.items():
+            waits = sorted(queue.wait_times)
+            classes[cls] = {
+                "share": self.shares[cls],
+                "limit": self._class_limit(cls),
+                "in_flight": queue.in_flight,
+                "waiting": queue.waiting(),
+                "dispatched": queue.dispatched,
+                "wait_p95_ms": round(waits[int(0.95 * (len(waits) - 1))] * 1000, 1) if waits else 0.0,
+            }
+        return {"capacity": self.capacity(), "in_flight": self.in_flight, "classes": classes}
@@ -0,0 +1,99 @@
+"""
+Semantic cache for advice on answers with free-text ``additionalText``.
+
+Free text makes every prompt unique, but many notes are near-duplicates
+("we sell to schools" / "We sell to schools!!"). Each answer is embedded
+locally as an L2-normalised vector of hashed character n-grams; within a
+bucket (same question, category, phase, answer option and profile bucket, see
+``api.advice_store.advice_key``) the most similar earlier answer is found by
+cosine similarity and its advice reused when the similarity reaches the
+threshold.
+
+Vectors are sparse dicts and buckets are small (``max_per_bucket``), so a
+linear scan in plain Python is enough and no numerical dependency is needed.
+The best similarity of every lookup is kept as a histogram to tune the
+threshold.
+"""
+
+import math
+import re
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+Vector = Dict[int, float]
+
+NGRAM_SIZES = (3, 4)
+HASH_DIMENSIONS = 1 << 20
+HISTOGRAM_BINS = 20
+
+
+def text_vector(text: str) -> Vector:
+    """Hashed character n-gram counts, L2-normalised."""
+    cleaned = " " + " ".join(re.findall(r"\w+", text.casefold())) + " "
+    counts: Vector = {}
+    for n in NGRAM_SIZES:
+        for i in range(len(cleaned) - n + 1):
+            # crc32 rather than hash(): stable across processes and restarts
+            index = zlib.crc32(cleaned[i:i + n].encode("utf-8")) % HASH_DIMENSIONS
+            counts[index] = counts.get(index, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in counts.values()))
+    return {k: v / norm for k, v in counts.items()} if norm else {}
+
+
+def cosine(a: Vector, b: Vector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(index, 0.0) for index, value in a.items())
+
+
+class SemanticCache:
+    def __init__(self, threshold: float = 0.92, max_per_bucket: int = 200, max_buckets: int = 10000) -> None:
+        self.threshold = threshold
+        self.max_per_bucket = max_per_bucket
+        self.max_buckets = max_buckets
+        self.lookups = 0
+        self.hits = 0
+        self.histogram = [0] * HISTOGRAM_BINS
+        self._buckets: "OrderedDict[str, List[Tuple[Vector, str]]]" = OrderedDict()
+
+    def lookup(self, bucket: str, text: str) -> Optional[Tuple[str, float]]:
+        """Return (advice, similarity) of the closest earlier answer if it clears the threshold."""
+        self.lookups += 1
+        entries = self._buckets.get(bucket)
+        if not entries:
+            return None
+        self._buckets.move_to_end(bucket)
+        vector = text_vector(text)
+        best_similarity, best_advice = max(
+            ((cosine(vector, entry_vector), advice) for entry_vector, advice in entries), key=lambda scored: scored[0]
+        )
+        self.histogram[min(HISTOGRAM_BINS - 1, max(0, int(best_similarity * HISTOGRAM_BINS)))] += 1
+        if best_similarity < self.threshold:
+            return None
+        self.hits += 1
+        return best_advice, best_similarity
+
+    def store(self, bucket: str, text: str, advice: str) -> None:
+        entries = self._buckets.setdefault(bucket, [])
+        self._buckets.move_to_end(bucket)
+        entries.append((text_vector(text), advice))
+        if len(entries) > self.max_per_bucket:
+            del entries[0]
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        width = 1.0 / HISTOGRAM_BINS
+        return {
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "buckets": len(self._buckets),
+            "entries": sum(len(entries) for entries in self._buckets.values()),
+            # Best similarity per lookup against a non-empty bucket, in 0.05-wide bins
+            "similarity_histogram": {
+                f"{i * width:.2f}-{(i + 1) * width:.2f}": count for i, count in enumerate(self.histogram) if count
+            },
+        }
@@ -0,0 +1,135 @@
+"""
+Speculative advice generated while the user is still answering.
+
+The assessment is filled in one pillar at a time. Each finished section can be
+posted to ``/api/llm-advice/partial``; its questions are generated in the
+background with a small concurrency cap so they never compete hard with
+interactive requests. Results are keyed by user and prompt fingerprint
+(``api.incremental.prompt_fingerprint``), so the final ``/api/llm-advice``
+only reuses advice whose prompt is still identical.
+
+When the final request needs a prompt whose speculative call is already
+running, it waits for that call instead of starting a duplicate. A call still
+queued for a speculative slot is cancelled instead, and the final request
+generates the advice itself at interactive priority.
+
+Environment:
+    LLM_SPECULATIVE_CONCURRENCY   speculative calls in flight at once (default 4)
+    LLM_SPECULATIVE_TTL_S         how long unused results are kept (default 1800)
+    LLM_SPECULATIVE_MAX_PENDING   running plus queued calls; further ones are not scheduled (default 1000)
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from .concurrency import AdaptiveLimiter
+from .degradation import ReportStore
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeAdvice:
+    def __init__(
+        self, concurrency: int = 4, ttl_seconds: float = 1800.0, max_entries: int = 50000, max_pending: int = 1000
+    ) -> None:
+        # A fixed-size limiter: min == max, so the cap never adapts
+        self.limiter = AdaptiveLimiter(initial_limit=concurrency, min_limit=concurrency, max_limit=concurrency)
+        self._results = ReportStore(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.max_pending = max_pending
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._started: Set[str] = set()  # keys whose task holds a speculative slot
+        self.scheduled = 0
+        self.dropped = 0
+        self.generated = 0
+        self.failed = 0
+        self.used = 0
+        self.joined = 0
+        self.preempted = 0
+
+    @classmethod
+    def from_env(cls) -> "SpeculativeAdvice":
+        return cls(
+            concurrency=int(os.getenv("LLM_SPECULATIVE_CONCURRENCY", 4)),
+            ttl_seconds=float(os.getenv("LLM_SPECULATIVE_TTL_S", 1800)),
+            max_pending=int(os.getenv("LLM_SPECULATIVE_MAX_PENDING", 1000)),
+        )
+
+    @staticmethod
+    def key(user_id: str, fingerprint: str) -> str:
+        return f"{user_id}:{fingerprint}"
+
+    def schedule(self, user_id: str, fingerprint: str, generate: Callable[[], Awaitable[Optional[str]]]) -> bool:
+        """Start generating in the background unless a result or a running call already exists."""
+        key = self.key(user_id, fingerprint)
+        if key in self._tasks or self._results.get(key) is not None:
+            return False
+        if len(self._tasks) >= self.max_pending:
+            # Speculation is optional: past the cap the final request generates the advice itself
+            self.dropped += 1
+            return False
+        self.scheduled += 1
+        self._tasks[key] = asyncio.create_task(self._run(key, generate))
+        return True
+
+    async def _run(self, key: str, generate: Callable[[], Awaitable[Optional[str]]]) -> None:
+        try:
+            try:
+                async with self.limiter.slot():
+                    self._started.add(key)
+                    advice = await generate()
+            except Exception as e:
+                # A failed speculation only means the final request generates this question itself
+                logger.warning("Speculative advice failed for %s: %s", key, e)
+                advice = None
+            if advice is None:
+                self.failed += 1
+            else:
+                self.generated += 1
+                self._results.put(key, advice)
+        finally:
+            # take() may have cancelled this task and a new one been scheduled under the key
+            if self._tasks.get(key) is asyncio.current_task():
+                self._started.discard(key)
+                del self._tasks[key]
+
+    async def take(self, user_id: str, fingerprint: str) -> Optional[str]:
+        """Speculative advice for this prompt, waiting for it if it is already being generated.
+
+        A call still queued for a speculative slot is cancelled rather than
+        waited for, since it would hold the caller at job priority; the caller
+        then generates the advice itself.
+        """
+        key = self.key(user_id, fingerprint)
+        task = self._tasks.get(key)
+        # A task from another event loop cannot be awaited here; treat it as absent
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            if key not in self._started:
+                task.cancel()
+                self._tasks.pop(key, None)
+                self.preempted += 1
+                return None
+            await asyncio.shield(task)
+            self.joined += 1
+        advice = self._results.get(key)
+        if advice is not None:
+            self.used += 1
+        return advice
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "scheduled": self.scheduled,
+            "generated": self.generated,
+            "failed": self.failed,
+            "used": self.used,
+            "joined_in_flight": self.joined,
+            "preempted": self.preempted,
+            "dropped": self.dropped,
+            "in_flight": self.in_flight,
+            "stored": len(self._results),
+        }
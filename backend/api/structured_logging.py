@@ -0,0 +1,263 @@
+"""
+Structured, non-blocking logging.
+
+``configure_logging`` routes every record through a handler on the root
+logger to a ``BackgroundWriter`` thread that formats and writes it, so a
+log call on the event loop costs a queue put and never a write to stdout.
+When the queue is full (a slow consumer under load) records are dropped and
+counted instead of blocking the caller.
+
+Records are written as one JSON object per line with the request id
+(``X-Request-ID``, set per request by ``RequestIdMiddleware``), the trace id
+of the current span when tracing is on, and any ``extra`` fields.
+
+Records at or below ``sample_level`` (DEBUG by default) are sampled per
+request: a request either keeps all of its debug lines or none, so the
+lines that are kept still tell a whole story.
+
+Environment:
+    LOG_LEVEL          root level (default INFO)
+    LOG_LEVELS         per-logger levels, e.g. "api.cosmos_retriever=WARNING,uvicorn.access=WARNING"
+    LOG_FORMAT         json (default) or text
+    LOG_SAMPLE_RATE    fraction of requests whose sampled lines are kept (default 1.0)
+    LOG_SAMPLE_LEVEL   highest level that is sampled (default DEBUG)
+    LOG_QUEUE_SIZE     records buffered for the writer thread before dropping (default 10000)
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .background_writer import BackgroundWriter
+from .tracing import Span, current_span
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else on a record came from ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id", "trace_id"}
+
+
+def get_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def set_request_id(request_id: Optional[str] = None) -> str:
+    """Set the id that log records of the current request carry; a new one is generated if not given."""
+    request_id = request_id or uuid.uuid4().hex
+    _request_id.set(request_id)
+    return request_id
+
+
+class ContextFilter(logging.Filter):
+    """Stamp records with the request and trace id, in the thread that logs them."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        span = current_span()
+        record.trace_id = span.trace_id if isinstance(span, Span) else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rate: float = 1.0, max_level: int = logging.DEBUG) -> None:
+        super().__init__()
+        self.rate = rate
+        self.max_level = max_level
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1.0 or record.levelno > self.max_level:
+            return True
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            keep = zlib.crc32(request_id.encode()) % 10000 < self.rate * 10000
+        else:
+            keep = random.random() < self.rate
+        if not keep:
+            self.sampled_out += 1
+        return keep
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("request_id", "trace_id"):
+            if getattr(record, key, None) is not None:
+                entry[key] = getattr(record, key)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.Handler):
+    """Hand records to the writer thread, dropping them when its queue is full instead of blocking."""
+
+    def __init__(self, writer: BackgroundWriter[logging.LogRecord]) -> None:
+        super().__init__()
+        self.writer = writer
+
+    @property
+    def dropped(self) -> int:
+        return self.writer.dropped
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback now, in the logging thread; keep extras for the formatter
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.writer.put(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever ``sys.stdout`` is at the time, so redirection (and test capture) works."""
+
+    def __init__(self) -> None:
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self) -> Any:
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value: Any) -> None:
+        pass
+
+
+class LoggingPipeline:
+    def __init__(self, handler: DroppingQueueHandler, sampler: SamplingFilter) -> None:
+        self.handler = handler
+        self.sampler = sampler
+
+    def stop(self) -> None:
+        """Flush what is queued and stop the writer thread."""
+        logging.getLogger().removeHandler(self.handler)
+        self.handler.writer.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.handler.writer.queued,
+            "dropped": self.handler.dropped,
+            "sampled_out": self.sampler.sampled_out,
+        }
+
+
+_pipeline: Optional[LoggingPipeline] = None
+
+
+def _stop_pipeline() -> None:
+    if _pipeline is not None:
+        _pipeline.stop()
+
+
+atexit.register(_stop_pipeline)
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(
+    level: str = "INFO",
+    levels: Optional[Dict[str, str]] = None,
+    fmt: str = "json",
+    sample_rate: float = 1.0,
+    sample_level: str = "DEBUG",
+    queue_size: int = 10000,
+    handler: Optional[logging.Handler] = None,
+) -> LoggingPipeline:
+    """Install the queue pipeline on the root logger, replacing one installed earlier; ``handler``
+    (stdout by default) is where the writer thread sends the formatted records."""
+    global _pipeline
+    output = handler or _StdoutHandler()
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(
+        "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+    ))
+
+    def write(records: List[logging.LogRecord]) -> None:
+        for record in records:
+            if record.levelno >= output.level:
+                output.handle(record)
+
+    queue_handler = DroppingQueueHandler(BackgroundWriter(write, name="log-writer", max_queue=queue_size))
+    sampler = SamplingFilter(sample_rate, logging.getLevelName(sample_level.upper()))
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(sampler)
+
+    if _pipeline is not None:
+        _pipeline.stop()
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+    for name, logger_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    _pipeline = LoggingPipeline(queue_handler, sampler)
+    return _pipeline
+
+
+def configure_logging_from_env() -> LoggingPipeline:
+    return configure_logging(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        levels=parse_levels(os.getenv("LOG_LEVELS", "")),
+        fmt=os.getenv("LOG_FORMAT", "json"),
+        sample_rate=float(os.getenv("LOG_SAMPLE_RATE", 1.0)),
+        sample_level=os.getenv("LOG_SAMPLE_LEVEL", "DEBUG"),
+        queue_size=int(os.getenv("LOG_QUEUE_SIZE", 10000)),
+    )
+
+
+class RequestIdMiddleware:
+    """Give every HTTP request an id (the caller's X-Request-ID if sent) and echo it in the response."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = next((value for name, value in scope.get("headers", []) if name == b"x-request-id"), None)
+        # Accept only short printable ids from callers, so they cannot inject into the logs
+        candidate = incoming.decode("latin-1") if incoming is not None else ""
+        request_id = set_request_id(candidate if 0 < len(candidate) <= 128 and candidate.isprintable() else None)
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message = dict(message, headers=list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())])
+            await send(message)
+
+        await self.app(scope, receive, send_with_id)
@@ -0,0 +1,196 @@
+"""
+Offline token accounting for LLM prompts.
+
+Counts tokens per message before a request is sent, trims the variable prompt
+fields (retrieved text, user answer) to fit ``LLM_PROMPT_TOKEN_BUDGET``, and
+keeps a ledger of prompt/completion tokens per deployment so throughput can be
+compared against TPM quotas.
+
+Counts are exact with ``tiktoken`` (a runtime dependency). Without it, or when
+its encoding cannot be loaded (it is downloaded on first use), counts fall back
+to a heuristic: a conservative word/punctuation estimate where long words cost
+one token per four characters. The heuristic is not the model's tokenizer, so
+budgets and ledger estimates are then only approximate.
+"""
+
+import functools
+import logging
+import math
+import os
+import re
+import time
+from collections import deque
+from typing import Any, Collection, Deque, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    # Fallback for environments without tiktoken
+    tiktoken = None
+
+# Per-message framing overhead of the chat format and reply priming
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_OVERHEAD_TOKENS = 3
+DEFAULT_PROMPT_TOKEN_BUDGET = 2048
+TRUNCATION_MARKER = " ..."
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+_encoding = None
+_encoding_failed = False
+
+logger = logging.getLogger(__name__)
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and tiktoken is not None and not _encoding_failed:
+        try:
+            _encoding = tiktoken.get_encoding(os.getenv("LLM_TOKENIZER_ENCODING", "cl100k_base"))
+        except Exception:
+            _encoding_failed = True
+            logger.warning("tiktoken encoding unavailable, token counts are heuristic estimates", exc_info=True)
+    return _encoding
+
+
+def _estimate_pieces(text: str) -> List[Tuple[int, int]]:
+    """Return (end_offset, tokens) per word/punctuation piece for the fallback estimator."""
+    return [(m.end(), max(1, math.ceil(len(m.group()) / 4))) for m in _WORD_RE.finditer(text)]
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return sum(tokens for _, tokens in _estimate_pieces(text))
+
+
+# The system prompt and retrieved tips repeat across questions and requests; counting them
+# again costs more than the rest of request handling. Only shared text goes through this
+# cache: user free text would otherwise stay in process memory
+@functools.lru_cache(maxsize=4096)
+def count_shared_tokens(text: str) -> int:
+    return count_tokens(text)
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Prompt tokens for a chat request, including message framing.
+
+    System messages are counted through the shared cache; other roles carry
+    user text and are counted afresh.
+    """
+    total = REPLY_OVERHEAD_TOKENS
+    for message in messages:
+        count = count_shared_tokens if message.get("role") == "system" else count_tokens
+        total += MESSAGE_OVERHEAD_TOKENS + count(message.get("content", ""))
+    return total
+
+
+def trim_to_tokens(text: str, limit: int) -> str:
+    """Cut ``text`` to at most ``limit`` tokens, marking the cut."""
+    if count_tokens(text) <= limit:
+        return text
+    keep = max(0, limit - count_tokens(TRUNCATION_MARKER))
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text)[:keep]).rstrip() + TRUNCATION_MARKER
+
+    end, used = 0, 0
+    for piece_end, tokens in _estimate_pieces(text):
+        if used + tokens > keep:
+            break
+        end, used = piece_end, used + tokens
+    return text[:end].rstrip() + TRUNCATION_MARKER
+
+
+def fit_fields(fields: Dict[str, str], budget: int, shared: Collection[str] = ()) -> Dict[str, str]:
+    """Trim ``fields`` so their combined token count fits ``budget``.
+
+    Short fields are kept whole; the remaining budget is shared evenly between
+    the fields that are too long for their share. Fields named in ``shared``
+    repeat across users and are counted through the shared cache.
+    """
+    sizes = {
+        name: (count_shared_tokens if name in shared else count_tokens)(value)
+        for name, value in fields.items()
+    }
+    if sum(sizes.values()) <= budget:
+        return dict(fields)
+
+    result = dict(fields)
+    remaining = max(0, budget)
+    pending = sorted(sizes, key=lambda name: sizes[name])
+    while pending:
+        share = remaining // len(pending)
+        name = pending.pop(0)
+        if sizes[name] <= share:
+            remaining -= sizes[name]
+            continue
+        # Everything left is at least this long, so all of it gets trimmed to the share
+        for other in [name] + pending:
+            result[other] = trim_to_tokens(fields[other], share)
+        break
+    return result
+
+
+def prompt_token_budget() -> int:
+    return int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", DEFAULT_PROMPT_TOKEN_BUDGET))
+
+
+class TokenLedger:
+    """Running prompt/completion token counts, overall and per deployment."""
+
+    def __init__(self, window_seconds: float = 60.0) -> None:
+        self.window_seconds = window_seconds
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.estimated_prompt_tokens = 0
+        self.trimmed_prompts = 0
+        self.per_deployment: Dict[str, Dict[str, int]] = {}
+        self._recent: Deque[Tuple[float, int]] = deque()
+
+    def record(
+        self,
+        deployment: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        estimated_prompt_tokens: Optional[int] = None,
+        trimmed: bool = False,
+    ) -> None:
+        now = time.monotonic()
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.estimated_prompt_tokens += estimated_prompt_tokens if estimated_prompt_tokens is not None else prompt_tokens
+        self.trimmed_prompts += int(trimmed)
+
+        per = self.per_deployment.setdefault(deployment, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+        per["calls"] += 1
+        per["prompt_tokens"] += prompt_tokens
+        per["completion_tokens"] += completion_tokens
+
+        self._recent.append((now, prompt_tokens + completion_tokens))
+        self._expire(now)
+
+    def _expire(self, now: float) -> None:
+        while self._recent and now - self._recent[0][0] > self.window_seconds:
+            self._recent.popleft()
+
+    def tokens_per_minute(self) -> float:
+        self._expire(time.monotonic())
+        return sum(tokens for _, tokens in self._recent) * 60.0 / self.window_seconds
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "estimated_prompt_tokens": self.estimated_prompt_tokens,
+            "avg_prompt_tokens": round(self.prompt_tokens / self.calls, 1) if self.calls else 0.0,
+            "avg_completion_tokens": round(self.completion_tokens / self.calls, 1) if self.calls else 0.0,
+            "trimmed_prompts": self.trimmed_prompts,
+            "tokens_per_minute": round(self.tokens_per_minute(), 1),
+            "per_deployment": {name: dict(counts) for name, counts in self.per_deployment.items()},
+        }
@@ -0,0 +1,303 @@
+"""
+Request tracing for the advice pipeline.
+
+Every ``/api/llm-advice`` request becomes a trace: a root span with child
+spans for profile extraction, scoring, each Cosmos lookup, each
+per-question generation and each upstream LLM call, so one slow question
+out of 34 can be found by its span.
+
+Spans are opened with ``tracer.span(name, **attributes)`` or the ``traced``
+decorator and closed spans go to the configured exporter. The current span
+travels in a context variable, so the tasks started by ``asyncio.gather``
+become children of the span that started them. ``current_span()`` returns
+the open span (or a no-op one) for adding attributes deeper in the call
+stack.
+
+Environment:
+    TRACE_EXPORTER      "none" (default), "console", "file:<path>" (JSON lines, written off the loop) or
+                        "otel" (OpenTelemetry API, configured by the OTel SDK; falls
+                        back to "none" when opentelemetry is not installed)
+    TRACE_SAMPLE_RATE   fraction of traces to record (default 1.0); with "otel" it becomes the
+                        SDK's parent-based trace id ratio sampler unless OTEL_TRACES_SAMPLER is set
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO
+
+from .background_writer import BackgroundWriter
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.status = "ok"
+        self.attributes: Dict[str, Any] = {}
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = "error"
+        self.attributes["error.type"] = type(exc).__name__
+        self.attributes["error.message"] = str(exc)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.time()) - self.start) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    sampled = False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes: Any) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: contextvars.ContextVar[Optional[Any]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Any:
+    span = _current_span.get()
+    return span if span is not None else NOOP_SPAN
+
+
+# --- Exporters ---
+
+class SpanExporter:
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+
+class ConsoleExporter(SpanExporter):
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        self.stream = stream
+
+    def export(self, span: Span) -> None:
+        stream = self.stream or sys.stderr
+        stream.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+class FileExporter(SpanExporter):
+    """One JSON object per span, appended to ``path`` by a writer thread.
+
+    ``export`` runs on the event loop for every closed span, so it only queues
+    the line; the writer appends whatever has queued up in one write. When the
+    writer falls ``max_queue`` lines behind, new spans are dropped and counted.
+    """
+
+    def __init__(self, path: str, max_queue: int = 10000) -> None:
+        self.path = path
+        self._writer: BackgroundWriter[str] = BackgroundWriter(self._append, name="trace-file-exporter", max_queue=max_queue)
+
+    @property
+    def dropped(self) -> int:
+        return self._writer.dropped
+
+    def export(self, span: Span) -> None:
+        self._writer.put(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def _append(self, lines: List[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+
+    def shutdown(self) -> None:
+        """Write out the queued spans and stop the writer."""
+        self._writer.close()
+
+
+class InMemoryExporter(SpanExporter):
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def by_name(self, name: str) -> List[Span]:
+        return [span for span in self.spans if span.name == name]
+
+
+# --- Tracers ---
+
+class Tracer:
+    def __init__(self, exporter: Optional[SpanExporter] = None, sample_rate: float = 1.0) -> None:
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        if self.exporter is None:
+            yield NOOP_SPAN
+            return
+        parent = _current_span.get()
+        if isinstance(parent, Span):
+            span = Span(name, parent.trace_id, parent.span_id, parent.sampled)
+        elif parent is NOOP_SPAN:
+            # Inside an unsampled trace: keep the whole trace unsampled
+            yield NOOP_SPAN
+            return
+        else:
+            sampled = random.random() < self.sample_rate
+            if not sampled:
+                token = _current_span.set(NOOP_SPAN)
+                try:
+                    yield NOOP_SPAN
+                finally:
+                    _current_span.reset(token)
+                return
+            span = Span(name, f"{random.getrandbits(128):032x}", None, True)
+        span.set_attributes(**attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end = time.time()
+            try:
+                self.exporter.export(span)
+            except Exception as exc:  # tracing must never break a request
+                logger.warning("Span export failed: %s", exc)
+
+
+class _OTelSpan:
+    def __init__(self, span: Any) -> None:
+        self._span = span
+        self.sampled = True
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self._span.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+
+    def set_attributes(self, **attributes: Any) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_exception(self, exc: BaseException) -> None:
+        self._span.record_exception(exc)
+
+
+class OTelTracer:
+    """Spans through the OpenTelemetry API; exporters are whatever the OTel SDK is configured with."""
+
+    enabled = True
+
+    def __init__(self, otel_trace: Any, sample_rate: float = 1.0) -> None:
+        _apply_otel_sample_rate(otel_trace, sample_rate)
+        self._tracer = otel_trace.get_tracer("ai-sales-consultant")
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        with self._tracer.start_as_current_span(name) as otel_span:
+            span = _OTelSpan(otel_span)
+            span.set_attributes(**attributes)
+            token = _current_span.set(span)
+            try:
+                yield span
+            finally:
+                _current_span.reset(token)
+
+
+def _apply_otel_sample_rate(otel_trace: Any, sample_rate: float) -> None:
+    """Hand the sample rate to the OTel SDK, which does the sampling; the API has no sampler."""
+    if sample_rate >= 1.0 or "OTEL_TRACES_SAMPLER" in os.environ:
+        return  # keep the SDK's own sampler configuration
+    # Read by SDK tracer providers created from now on
+    os.environ["OTEL_TRACES_SAMPLER"] = "parentbased_traceidratio"
+    os.environ["OTEL_TRACES_SAMPLER_ARG"] = str(sample_rate)
+    provider = otel_trace.get_tracer_provider()
+    if not hasattr(provider, "sampler"):
+        return  # no SDK provider yet (the API's proxy)
+    try:
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        return
+    # An SDK provider that is already set up: tracers it creates from now on use this sampler
+    provider.sampler = ParentBased(TraceIdRatioBased(sample_rate))
+
+
+def tracer_from_env() -> Any:
+    spec = os.getenv("TRACE_EXPORTER", "none")
+    sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", 1.0))
+    if spec == "otel":
+        try:
+            from opentelemetry import trace as otel_trace
+        except ImportError:
+            logger.warning("TRACE_EXPORTER=otel but opentelemetry is not installed; tracing is off")
+            return Tracer()
+        return OTelTracer(otel_trace, sample_rate)
+    if spec == "console":
+        return Tracer(ConsoleExporter(), sample_rate)
+    if spec.startswith("file:"):
+        return Tracer(FileExporter(spec[len("file:"):]), sample_rate)
+    if spec in ("", "none"):
+        return Tracer()
+    raise ValueError(f"TRACE_EXPORTER must be none, console, file:<path> or otel, got {spec!r}")
+
+
+tracer = tracer_from_env()
+
+
+def traced(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Run the decorated function (sync or async) in a span of the module tracer."""
+
+    def decorate(func: Callable) -> Callable:
+        span_name = name or func.__name__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with tracer.span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorate
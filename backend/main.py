@@ -2,29 +2,89 @@
 
 import os
 import csv
+import functools
+import logging
 import openai
 import asyncio
-from fastapi import FastAPI
-from api.models import AssessmentData, SaveReportResponse, LLMAdviceRequest, LLMAdviceResponse
+import time
+from fastapi import FastAPI, HTTPException, Response
+from api.models import AssessmentData, SaveReportResponse, LLMAdviceRequest, LLMAdviceResponse, SpeculativeAdviceResponse
 from dotenv import load_dotenv
 from api.prompts import SYSTEM_PROMPT_TEMPLATE, USER_PROMPT_TEMPLATE
 from api.cosmos_retriever import get_answer_text
+from api.llm_router import Deployment, LLMRouter, deployments_from_env, retry_after_seconds
+from api.concurrency import AdaptiveLimiter
+from api.advice_store import AdviceStore, TrafficRecorder, advice_key, is_precomputable
+from api.profile_canon import ProfileCanonicalizer
+from api.semantic_cache import SemanticCache
+from api.speculative import SpeculativeAdvice
+from api.quota import ClusterQuota
+from api.metrics import (
+    ADVICE_ERRORS, ADVICE_SOURCE, CONTENT_TYPE, LLM_CALL_SECONDS, LLM_CALLS, LLM_TOKENS, REGISTRY,
+    REQUEST_SECONDS, STAGE_SECONDS, Family
+)
+from api.rate_limit import RateLimitMiddleware, RateLimiter
+from api.profiling import ProfilingMiddleware, RequestProfiler, record_stage
+from api.route_timing import TimedRoute, handler_started
+from api.loop_monitor import LoopLagMonitor
+from api.structured_logging import LoggingPipeline, RequestIdMiddleware, configure_logging_from_env
+from api.tracing import current_span, traced, tracer
+from api.admission import ADMIT, DIVERT, REJECT, AdmissionController
+from api.scheduler import INTERACTIVE, JOB, PriorityScheduler, priority, priority_class, set_priority, shares_from_env
+from api.incremental import QuestionResult, UserResultStore, UserResults, prompt_fingerprint, questions_to_rescore, r_answers, rule_index
+from api.routing_policy import RouteDecision, RoutingPolicy, routing_policy_from_env
+from api.token_budget import TokenLedger, count_message_tokens, count_tokens, fit_fields, prompt_token_budget
+from api.degradation import LLMHealthMonitor, ReportStore, report_key, template_advice
+from api.micro_batch import BatchItemMissing, MicroBatcher, build_batch_messages, parse_batch_response
 from collections import defaultdict
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
 
 load_dotenv()
 
+# JSON logs written by a background thread, installed on startup; log calls on the event loop only enqueue
+log_pipeline: Optional[LoggingPipeline] = None
+logger = logging.getLogger(__name__)
+
 # CORS configuration from environment variable
 FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "*")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    global log_pipeline
+    # Configured here rather than on import, so importing the app leaves the root logger alone
+    log_pipeline = configure_logging_from_env()
+    # Watch the loop the app serves on from the start, not from its first advice request
+    loop_monitor.ensure_running()
+    try:
+        yield
+    finally:
+        log_pipeline.stop()
+
+app = FastAPI(lifespan=lifespan)
+# Lets /api/llm-advice time FastAPI's body parsing and validation as its first stage
+app.router.route_class = TimedRoute
 
 @app.get("/healthz")
 def healthz():
     return {"status": "healthy"}
 
+# Opt-in cProfile of single requests carrying a signed X-Debug-Profile header; innermost, so the
+# profile covers the handler and not the other middleware. Not installed without PROFILE_SECRET
+request_profiler = RequestProfiler.from_env()
+if request_profiler is not None:
+    app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+
+# Per-user / per-IP token buckets on the LLM endpoints. Added before CORS so that CORS stays the
+# outermost layer and 429 responses still carry its headers
+rate_limiter = RateLimiter.from_env()
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
+# Request id for log correlation (the caller's X-Request-ID if sent), echoed in the response
+app.add_middleware(RequestIdMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[FRONTEND_ORIGIN] if FRONTEND_ORIGIN != "*" else ["*"],
@@ -55,6 +115,65 @@ def get_openai_client():
         )
     return _client
 
+# Deployment router and per-endpoint clients, also initialized lazily
+_router = None
+_deployment_clients: Dict[str, Any] = {}
+
+def get_llm_router() -> LLMRouter:
+    """Get the deployment router, building it from the environment if needed"""
+    global _router
+    if _router is None:
+        deployments = deployments_from_env()
+        if not deployments:
+            raise ValueError("AZURE_OPENAI_DEPLOYMENT environment variable is required")
+        _router = LLMRouter(deployments)
+    return _router
+
+_routing_policy = None
+token_ledger = TokenLedger()
+llm_health = LLMHealthMonitor.from_env()
+llm_limiter = AdaptiveLimiter.from_env()
+# Orders completions by priority class and user; capacity follows the AIMD limit
+llm_scheduler = PriorityScheduler(lambda: int(llm_limiter.limit), shares=shares_from_env())
+admission = AdmissionController.from_env()
+profile_canonicalizer = ProfileCanonicalizer.from_env()
+# Reuses advice for near-duplicate free-text answers; SEMANTIC_CACHE_THRESHOLD=off disables it
+_semantic_threshold = os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")
+semantic_cache = None if _semantic_threshold == "off" else SemanticCache(threshold=float(_semantic_threshold))
+# Last per-question results per user, so an edit of a few answers regenerates only those questions
+user_results = UserResultStore(max_users=int(os.getenv("LLM_INCREMENTAL_MAX_USERS", 10000)))
+speculative_advice = SpeculativeAdvice.from_env()
+refined_reports = ReportStore(ttl_seconds=float(os.getenv("LLM_REFINED_REPORT_TTL_S", 3600)))
+_refinement_tasks: Dict[str, asyncio.Task] = {}
+# Measures event-loop lag and records the stacks of callbacks that block it
+loop_monitor = LoopLagMonitor.from_env()
+
+ADVICE_ERROR_PREFIX = "Failed to generate advice due to an error"
+
+def get_routing_policy() -> RoutingPolicy:
+    """Get the per-category routing policy, loading it from LLM_ROUTING_POLICY if needed"""
+    global _routing_policy
+    if _routing_policy is None:
+        _routing_policy = routing_policy_from_env()
+    return _routing_policy
+
+def get_deployment_client(deployment: Deployment):
+    """Get the client for a deployment; deployments without an endpoint share the default client"""
+    if not deployment.endpoint:
+        return get_openai_client()
+    client = _deployment_clients.get(deployment.name)
+    if client is None:
+        api_key = deployment.api_key or os.getenv("AZURE_OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError(f"No API key configured for deployment {deployment.name}")
+        client = openai.AsyncAzureOpenAI(
+            api_key=api_key,
+            azure_endpoint=deployment.endpoint,
+            api_version="2024-02-15-preview"
+        )
+        _deployment_clients[deployment.name] = client
+    return client
+
 def load_score_rules(csv_path: str) -> Dict[str, List[str]]:
     rules = {}
     with open(csv_path, newline='') as csvfile:
@@ -86,7 +205,49 @@ def check_weighting(rules: List[str], service_offering: Dict[str, Any]) -> int:
                 
     return satisfied_count
 
+def collect_questions(assessment_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """All answered questions in section order, numbered question_00, question_01, ...
+
+    Ids are positional, so a prefix of the sections (a partial submission) gets the same
+    ids as in the full assessment.
+    """
+    all_questions = []
+    section_keys = [k for k in assessment_data if k != "serviceOffering"]
+    for section_key in section_keys:
+        section_content = assessment_data[section_key]
+        if isinstance(section_content, dict):
+            for question_key, q_value in section_content.items():
+                if isinstance(q_value, dict):
+                    all_questions.append(q_value)
+    for idx, q in enumerate(all_questions):
+        q['question_id'] = f"question_{idx:02d}"
+    return all_questions
+
+def score_question(q: Dict[str, Any], rules: List[str], service_offering: Dict[str, Any]) -> None:
+    """Set new_score and new_category on a question from its weighting rules"""
+    original_score = q.get('score', 0)
+
+    # Get the count of satisfied rules
+    satisfied_count = check_weighting(rules, service_offering)
+
+    # Calculate weight multiplier based on the number of satisfied rules
+    if satisfied_count > 0:
+        weight_multiplier = 1 + (satisfied_count * 0.25)  # Each rule adds 25% weight
+        new_score = original_score * weight_multiplier
+    else:
+        new_score = original_score
+
+    q['new_score'] = new_score
+
+    if new_score < -1:
+        q['new_category'] = 'Start_Doing'
+    elif new_score > 1:
+        q['new_category'] = 'Keep_Doing'
+    else:
+        q['new_category'] = 'Do_More'
+
 # NEW HELPER: Extracts business profile, adapting to frontend's structure
+@traced()
 def extract_business_profile(service_offering: Dict[str, Any]) -> Dict[str, str]:
     profile = {
         "industry": "N/A",
@@ -112,15 +273,11 @@ def extract_business_profile(service_offering: Dict[str, Any]) -> Dict[str, str]
                 profile['revenue_type'] = full_answer
     return profile
 
-# NEW ASYNC FUNCTION: Generates advice for a single question
-async def generate_advice_for_question(q_data: Dict[str, Any], business_profile: Dict[str, str]) -> Dict[str, Any]:
-    question_id = q_data['question_id']
-    new_category = q_data['new_category']
-    
-    retrieved_text = get_answer_text(question_id, new_category)
-    if retrieved_text is None:
-        retrieved_text = "No standard advice found."
+def build_advice_messages(q_data: Dict[str, Any], business_profile: Dict[str, str], retrieved_text: str) -> Tuple[List[Dict[str, str]], bool]:
+    """Build the chat messages for one question, trimming free text to the prompt token budget.
 
+    Returns the messages and whether anything had to be trimmed.
+    """
     # Smartly choose the user's answer: combine answer with additional text
     answer = q_data.get('anwser', 'N/A')
     additional_text = q_data.get('additionalText', '').strip()
@@ -130,97 +287,267 @@ async def generate_advice_for_question(q_data: Dict[str, Any], business_profile:
     else:
         user_answer = answer
 
-    prompt = USER_PROMPT_TEMPLATE.format(
-        retrieved_text=retrieved_text,
-        original_question=q_data.get('question', ''),
-        user_answer=user_answer,
-        advice_type=new_category
+    template_fields = {
+        "original_question": q_data.get('question', ''),
+        "advice_type": q_data['new_category'],
+    }
+    system_prompt = SYSTEM_PROMPT_TEMPLATE.format(**business_profile)
+    fixed_tokens = count_message_tokens([
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": USER_PROMPT_TEMPLATE.format(retrieved_text="", user_answer="", **template_fields)}
+    ])
+    variable_fields = {"retrieved_text": retrieved_text, "user_answer": user_answer}
+    fitted = fit_fields(variable_fields, prompt_token_budget() - fixed_tokens, shared=("retrieved_text",))
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": USER_PROMPT_TEMPLATE.format(**fitted, **template_fields)}
+    ]
+    return messages, fitted != variable_fields
+
+async def complete_chat(messages: List[Dict[str, str]], route: RouteDecision, trimmed: bool = False, **extra: Any) -> str:
+    """Send one chat completion through the router, recording health and token usage"""
+    estimated_prompt_tokens = count_message_tokens(messages)
+
+    reserved_tokens = estimated_prompt_tokens + route.max_tokens
+    quota = get_llm_quota()
+
+    async def call(deployment: Deployment):
+        with tracer.span("llm_call", deployment=deployment.name, tier=route.tier) as span:
+            # Cluster-wide RPM/TPM budget first, so waiting for the next window holds neither a
+            # priority slot nor an AIMD slot
+            if quota is not None:
+                await quota.acquire(deployment.name, tokens=reserved_tokens)
+            # Priority classes share the upstream capacity; the AIMD limiter adapts the number of
+            # concurrent upstream calls to latency and 429s
+            async with llm_scheduler.slot(), llm_limiter.slot():
+                started = time.monotonic()
+                try:
+                    # Only the upstream request counts towards the deployment's latency for routing
+                    with deployment.upstream():
+                        response = await get_deployment_client(deployment).chat.completions.create(
+                            model=deployment.model,
+                            messages=messages,
+                            temperature=route.temperature,
+                            max_tokens=route.max_tokens,
+                            **extra
+                        )
+                except Exception as exc:
+                    latency = time.monotonic() - started
+                    llm_health.record(latency, ok=False)
+                    outcome = "error"
+                    if retry_after_seconds(exc) is not None:
+                        llm_limiter.on_throttle()
+                        outcome = "throttled"
+                    LLM_CALLS.inc(deployment=deployment.name, outcome=outcome)
+                    LLM_CALL_SECONDS.observe(latency, deployment=deployment.name, outcome=outcome)
+                    span.set_attribute("outcome", outcome)
+                    raise
+                latency = time.monotonic() - started
+                llm_health.record(latency, ok=True)
+                llm_limiter.on_success(latency)
+                LLM_CALLS.inc(deployment=deployment.name, outcome="ok")
+                LLM_CALL_SECONDS.observe(latency, deployment=deployment.name, outcome="ok")
+            # Prefer the service's own usage numbers, fall back to the local count
+            usage = getattr(response, "usage", None)
+            prompt_tokens = getattr(usage, "prompt_tokens", None)
+            completion_tokens = getattr(usage, "completion_tokens", None)
+            prompt_tokens = prompt_tokens if prompt_tokens is not None else estimated_prompt_tokens
+            if completion_tokens is None:
+                completion_tokens = count_tokens(response.choices[0].message.content or "")
+            token_ledger.record(
+                deployment.name,
+                prompt_tokens,
+                completion_tokens,
+                estimated_prompt_tokens=estimated_prompt_tokens,
+                trimmed=trimmed
+            )
+            LLM_TOKENS.inc(prompt_tokens, deployment=deployment.name, kind="prompt")
+            LLM_TOKENS.inc(completion_tokens, deployment=deployment.name, kind="completion")
+            span.set_attributes(outcome="ok", prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+            if quota is not None:
+                quota.refund(deployment.name, reserved_tokens - prompt_tokens - completion_tokens)
+            return response
+
+    response = await get_llm_router().run(call, tier=route.tier)
+    return response.choices[0].message.content
+
+async def send_advice_batch(key: Any, items: List[Tuple[List[Dict[str, str]], RouteDecision, bool]]) -> List[Optional[str]]:
+    """MicroBatcher callback: answer several advice prompts with one completion"""
+    if len(items) == 1:
+        messages, route, trimmed = items[0]
+        return [await complete_chat(messages, route, trimmed=trimmed)]
+
+    routes = [route for _, route, _ in items]
+    batch_route = RouteDecision(
+        tier=routes[0].tier,
+        temperature=routes[0].temperature,
+        max_tokens=min(sum(r.max_tokens for r in routes), int(os.getenv("LLM_MICRO_BATCH_MAX_TOKENS", 4096)))
+    )
+    content = await complete_chat(
+        build_batch_messages([messages for messages, _, _ in items]),
+        batch_route,
+        trimmed=any(trimmed for _, _, trimmed in items),
+        response_format={"type": "json_object"}
     )
+    return parse_batch_response(content, len(items))
 
-    try:
-        model_name = os.getenv("AZURE_OPENAI_DEPLOYMENT")
-        if not model_name:
-            raise ValueError("AZURE_OPENAI_DEPLOYMENT environment variable is required")
-            
-        response = await get_openai_client().chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT_TEMPLATE.format(**business_profile)},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.4,
-            max_tokens=512
+_micro_batcher = None
+_llm_quota = None
+_advice_store = None
+_traffic_recorder = None
+
+def get_advice_store() -> Optional[AdviceStore]:
+    """Get the precomputed advice store; None unless PRECOMPUTED_ADVICE_DB is set"""
+    global _advice_store
+    if _advice_store is None:
+        path = os.getenv("PRECOMPUTED_ADVICE_DB")
+        if not path:
+            return None
+        _advice_store = AdviceStore(path)
+    return _advice_store
+
+def get_traffic_recorder() -> Optional[TrafficRecorder]:
+    """Get the recorder feeding the precompute job; None unless ADVICE_TRAFFIC_LOG is set"""
+    global _traffic_recorder
+    if _traffic_recorder is None:
+        path = os.getenv("ADVICE_TRAFFIC_LOG")
+        if not path:
+            return None
+        _traffic_recorder = TrafficRecorder(path)
+    return _traffic_recorder
+
+def get_llm_quota() -> Optional[ClusterQuota]:
+    """Cluster-wide RPM/TPM budget, or None when LLM_QUOTA_RPM/LLM_QUOTA_TPM are not set"""
+    global _llm_quota
+    if _llm_quota is None:
+        _llm_quota = ClusterQuota.from_env()
+    return _llm_quota
+
+def get_micro_batcher() -> Optional[MicroBatcher]:
+    """Get the cross-request micro-batcher; None unless LLM_MICRO_BATCH_WINDOW_MS is set"""
+    global _micro_batcher
+    if _micro_batcher is None:
+        window_ms = float(os.getenv("LLM_MICRO_BATCH_WINDOW_MS", 0))
+        if window_ms <= 0:
+            return None
+        _micro_batcher = MicroBatcher(
+            send_advice_batch,
+            window_seconds=window_ms / 1000,
+            max_items=int(os.getenv("LLM_MICRO_BATCH_MAX_ITEMS", 8))
         )
-        llm_response = response.choices[0].message.content
+    return _micro_batcher
+
+def retrieve_answer_text(question_id: str, category: str) -> Optional[str]:
+    """Cosmos DB lookup of the standard tip for a question and category, in its own span"""
+    with tracer.span("get_answer_text", question_id=question_id, category=category) as span:
+        retrieved_text = get_answer_text(question_id, category)
+        span.set_attribute("hit", retrieved_text is not None)
+    return retrieved_text
+
+# NEW ASYNC FUNCTION: Generates advice for a single question
+@traced()
+async def generate_advice_for_question(q_data: Dict[str, Any], business_profile: Dict[str, str]) -> Dict[str, Any]:
+    question_id = q_data['question_id']
+    new_category = q_data['new_category']
+    span = current_span()
+    span.set_attributes(question_id=question_id, category=new_category)
+
+    # Serve precomputed advice for common profile/answer combinations without an LLM call
+    store = get_advice_store()
+    if store is not None and is_precomputable(q_data):
+        # SQLite is synchronous too: keep the lookup off the event loop
+        precomputed = await asyncio.to_thread(store.get, advice_key(business_profile, q_data))
+        if precomputed is not None:
+            ADVICE_SOURCE.inc(source="precomputed")
+            span.set_attribute("cache", "precomputed")
+            return advice_result(q_data, precomputed)
+
+    # Free-text answers: reuse advice given for a near-identical note on the same question and profile
+    semantic_bucket = None
+    if semantic_cache is not None and not is_precomputable(q_data):
+        semantic_bucket = advice_key(business_profile, q_data)
+        cached = semantic_cache.lookup(semantic_bucket, q_data["additionalText"])
+        if cached is not None:
+            ADVICE_SOURCE.inc(source="semantic_cache")
+            span.set_attributes(cache="semantic", similarity=round(cached[1], 4))
+            return advice_result(q_data, cached[0])
+
+    span.set_attribute("cache", "miss")
+    # The Cosmos DB client is synchronous: run the lookup in a worker thread so it does not block the loop
+    with STAGE_SECONDS.time(stage="retrieval"):
+        retrieved_text = await asyncio.to_thread(retrieve_answer_text, question_id, new_category)
+    if retrieved_text is None:
+        retrieved_text = "No standard advice found."
+
+    messages, trimmed = build_advice_messages(q_data, business_profile, retrieved_text)
+
+    route = get_routing_policy().decide(q_data.get("catmapping", ""), new_category)
+
+    try:
+        llm_response = None
+        batcher = get_micro_batcher()
+        if batcher is not None:
+            try:
+                # Batch only with work of the same priority class: the batch runs in the first item's context
+                batch_key = (route.tier, route.temperature, priority_class.get())
+                llm_response = await batcher.submit(batch_key, (messages, route, trimmed))
+            except BatchItemMissing:
+                pass  # The batch skipped this item; ask for it on its own below
+        if llm_response is None:
+            llm_response = await complete_chat(messages, route, trimmed=trimmed)
+        if semantic_cache is not None and semantic_bucket is not None:
+            semantic_cache.store(semantic_bucket, q_data["additionalText"], llm_response)
+        ADVICE_SOURCE.inc(source="llm")
     except Exception as e:
-        print(f"Error generating advice for {question_id}: {e}")
-        llm_response = f"Failed to generate advice due to an error: {e}"
+        logger.warning(
+            "Error generating advice for %s: %s", question_id, e,
+            extra={"question_id": question_id, "category": new_category}
+        )
+        ADVICE_ERRORS.inc()
+        span.record_exception(e)
+        llm_response = f"{ADVICE_ERROR_PREFIX}: {e}"
+
+    return advice_result(q_data, llm_response)
 
+def advice_result(q_data: Dict[str, Any], advice: str) -> Dict[str, Any]:
+    """Per-question result consumed by assemble_advice_text"""
     return {
         "catmapping": q_data.get("catmapping", ""),
         "category": q_data.get("category", ""),
         "question": q_data.get("question", ""),
-        "advice": llm_response
+        "advice": advice
     }
 
-@app.post("/api/save-user-report", response_model=SaveReportResponse)
-async def save_user_report(data: AssessmentData):
-    # This endpoint is not the main focus of the change, but it's good practice.
-    return {
-        "status": "success",
-        "message": "Report saved successfully",
-        "timestamp": datetime.utcnow().isoformat()
-    }
-
-@app.post("/api/llm-advice", response_model=LLMAdviceResponse)
-async def get_llm_advice(request: LLMAdviceRequest):
-    assessment_data = request.assessmentData.model_dump()
-    service_offering = assessment_data.get('serviceOffering', {})
-    score_rules = load_score_rules('api/score_rule.csv')
-    
-    # 1. MODIFIED: Extract business profile using the new adaptive helper
-    business_profile = extract_business_profile(service_offering)
-    
-    # 2. MODIFIED: Collect all questions by adapting to the frontend's structure
-    all_questions = []
-    section_keys = [k for k in assessment_data if k != "serviceOffering"]
-    for section_key in section_keys:
-        section_content = assessment_data[section_key]
-        if isinstance(section_content, dict):
-            for question_key, q_value in section_content.items():
-                if isinstance(q_value, dict):
-                    all_questions.append(q_value)
+def template_advice_for_question(q_data: Dict[str, Any], business_profile: Dict[str, str]) -> Dict[str, Any]:
+    """Advice without an LLM call: the retrieved tip text tailored to the profile"""
+    retrieved_text = retrieve_answer_text(q_data['question_id'], q_data['new_category'])
+    if retrieved_text is None:
+        retrieved_text = "No standard advice found."
+    return advice_result(q_data, template_advice(retrieved_text, business_profile))
 
-    # 3. Process scoring and categorization for each question
-    for idx, q in enumerate(all_questions):
-        q['question_id'] = f"question_{idx:02d}"
-        rules = score_rules.get(q['question_id'], [])
-        original_score = q.get('score', 0)
-        
-        # Get the count of satisfied rules
-        satisfied_count = check_weighting(rules, service_offering)
-        
-        # Calculate weight multiplier based on the number of satisfied rules
-        if satisfied_count > 0:
-            weight_multiplier = 1 + (satisfied_count * 0.25)  # Each rule adds 25% weight
-            new_score = original_score * weight_multiplier
-        else:
-            new_score = original_score
-        
-        q['new_score'] = new_score
+@traced()
+async def refine_report(key: str, questions: List[Dict[str, Any]], business_profile: Dict[str, str]) -> None:
+    """Generate the full LLM report in the background and keep it for the next fetch"""
+    set_priority(JOB)
+    try:
+        results = await asyncio.gather(*[generate_advice_for_question(q, business_profile) for q in questions])
+        if not any(item['advice'].startswith(ADVICE_ERROR_PREFIX) for item in results):
+            refined_reports.put(key, assemble_advice_text(results))
+    finally:
+        _refinement_tasks.pop(key, None)
 
-        if new_score < -1:
-            q['new_category'] = 'Start_Doing'
-        elif new_score > 1:
-            q['new_category'] = 'Keep_Doing'
-        else:
-            q['new_category'] = 'Do_More'
+def schedule_report_refinement(key: str, questions: List[Dict[str, Any]], business_profile: Dict[str, str]) -> None:
+    if key not in _refinement_tasks:
+        _refinement_tasks[key] = asyncio.create_task(refine_report(key, questions, business_profile))
 
-    # 4. NEW: Create and run all LLM advice generation tasks concurrently
-    tasks = [generate_advice_for_question(q, business_profile) for q in all_questions]
-    results = await asyncio.gather(*tasks)
+async def speculative_generate(q_data: Dict[str, Any], business_profile: Dict[str, str]) -> Optional[str]:
+    result = await generate_advice_for_question(q_data, business_profile)
+    return None if result['advice'].startswith(ADVICE_ERROR_PREFIX) else result['advice']
 
-    # 5. Group results into phases and categories
+def assemble_advice_text(results: List[Dict[str, Any]]) -> str:
+    """Group per-question results into phases and categories and render the report text"""
+    # 1. Group results into phases and categories
     phase_map = {
         "Profitable": "Phase 1 (Profitable)",
         "Repeatable": "Phase 2 (Repeatable)",
@@ -235,7 +562,7 @@ async def get_llm_advice(request: LLMAdviceRequest):
         if phase in phase_grouped and category:
             phase_grouped[phase][category].append(item)
 
-    # 6. Assemble the final advice text
+    # 2. Assemble the final advice text
     advice_text = "Based on your assessment results, here are your business recommendations:\n\n"
     for phase in phase_order:
         if not phase_grouped[phase]:
@@ -247,12 +574,248 @@ async def get_llm_advice(request: LLMAdviceRequest):
             for item in items:
                 advice_text += f"- {item['question']}\n  {item['advice']}\n"
         advice_text += "\n"
+    return advice_text
 
+def collect_runtime_metrics() -> List[Family]:
+    """Scrape-time view of counters that live in the limiter, scheduler, admission and caches"""
+    admission_stats = admission.stats()
+    scheduler_stats = llm_scheduler.stats()["classes"]
+    loop_lag = loop_monitor.percentiles()
+    families: List[Family] = [
+        ("llm_admission_shed_total", "counter", "Assessments shed by admission control, by reason",
+         [({"reason": reason}, count) for reason, count in admission_stats["shed_reasons"].items()]),
+        ("llm_admission_diverted_total", "counter", "Shed assessments answered from templates instead of rejected",
+         [({}, admission_stats["diverted"])]),
+        ("llm_advice_in_flight", "gauge", "Assessments currently generating", [({}, admission_stats["in_flight"])]),
+        ("http_rate_limited_total", "counter", "Requests answered 429 by the rate limiter, by key type",
+         [({"scope": scope}, count) for scope, count in rate_limiter.stats()["limited"].items()]),
+        ("llm_concurrency_limit", "gauge", "Current AIMD limit on concurrent LLM calls", [({}, llm_limiter.limit)]),
+        ("llm_scheduler_in_flight", "gauge", "LLM calls holding a scheduler slot, by priority class",
+         [({"class": cls}, s["in_flight"]) for cls, s in scheduler_stats.items()]),
+        ("llm_scheduler_waiting", "gauge", "LLM calls waiting for a scheduler slot, by priority class",
+         [({"class": cls}, s["waiting"]) for cls, s in scheduler_stats.items()]),
+        ("llm_degraded", "gauge", "1 while advice is served from templates because the LLM is unhealthy",
+         [({}, 1.0 if llm_health.is_degraded() else 0.0)]),
+        ("event_loop_lag_seconds", "summary", "Event-loop lag over the recent heartbeat window",
+         [({"quantile": q}, loop_lag[name]) for q, name in (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99"), ("1", "max"))]),
+        ("event_loop_blocks_total", "counter", "Callbacks that blocked the event loop longer than the threshold",
+         [({}, loop_monitor.blocks_total)]),
+    ]
+    if semantic_cache is not None:
+        cache_stats = semantic_cache.stats()
+        families.append(("semantic_cache_lookups_total", "counter", "Semantic cache lookups by result", [
+            ({"result": "hit"}, cache_stats["hits"]),
+            ({"result": "miss"}, cache_stats["lookups"] - cache_stats["hits"]),
+        ]))
+    return families
+
+REGISTRY.add_collector(collect_runtime_metrics)
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/api/llm-stats")
+def llm_stats():
+    """Per-deployment routing statistics"""
+    deployments = _router.stats() if _router is not None else []
+    return {
+        "deployments": deployments,
+        "tokens": token_ledger.stats(),
+        "health": llm_health.stats(),
+        "refined_reports": len(refined_reports),
+        "micro_batch": _micro_batcher.stats() if _micro_batcher is not None else None,
+        "concurrency": llm_limiter.stats(),
+        "precomputed": _advice_store.stats() if _advice_store is not None else None,
+        "profile_canonicalisation": profile_canonicalizer.stats(),
+        "semantic_cache": semantic_cache.stats() if semantic_cache is not None else None,
+        "incremental": user_results.stats(),
+        "speculative": speculative_advice.stats(),
+        "scheduler": llm_scheduler.stats(),
+        "admission": admission.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "quota": _llm_quota.stats() if _llm_quota is not None else None,
+        "event_loop": loop_monitor.stats(),
+        "logging": log_pipeline.stats() if log_pipeline is not None else None
+    }
+
+@app.post("/api/save-user-report", response_model=SaveReportResponse)
+async def save_user_report(data: AssessmentData):
+    # This endpoint is not the main focus of the change, but it's good practice.
+    return {
+        "status": "success",
+        "message": "Report saved successfully",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.post("/api/llm-advice", response_model=LLMAdviceResponse)
+@traced("llm_advice")
+async def get_llm_advice(request: LLMAdviceRequest):
+    # Each request runs in its own task, so this only tags LLM work started by this request
+    set_priority(INTERACTIVE, request.userId)
+    root_span = current_span()
+    # FastAPI parsed and validated the body before this handler ran: that is the first stage
+    started = handler_started() or time.perf_counter()
+    stage_started = started
+
+    def end_stage(stage: str) -> None:
+        nonlocal stage_started
+        now = time.perf_counter()
+        STAGE_SECONDS.observe(now - stage_started, stage=stage)
+        record_stage(stage, now - stage_started)
+        stage_started = now
+
+    end_stage("validation")
+    assessment_data = request.assessmentData.model_dump()
+    service_offering = assessment_data.get('serviceOffering', {})
+
+    # 0. Serve a report that was refined in the background after a degraded response
+    key = report_key(request.userId, assessment_data)
+    end_stage("preparation")
+    refined = refined_reports.get(key)
+    if refined is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, outcome="refined")
+        root_span.set_attribute("outcome", "refined")
+        return LLMAdviceResponse(advice=refined, timestamp=datetime.utcnow().isoformat())
+
+    score_rules = await asyncio.to_thread(load_score_rules, 'api/score_rule.csv')
+    
+    # 1. MODIFIED: Extract business profile using the new adaptive helper, mapped to canonical values
+    #    so spelling variants share prompts and cache entries
+    business_profile = profile_canonicalizer.canonicalize_profile(extract_business_profile(service_offering))
+    
+    # 2. MODIFIED: Collect all questions by adapting to the frontend's structure
+    all_questions = collect_questions(assessment_data)
+    root_span.set_attribute("questions", len(all_questions))
+
+    # 3. Process scoring and categorization for each question. Scores of questions that neither
+    #    changed nor are weighted by a changed R answer are taken from the user's previous report
+    previous = user_results.get(request.userId)
+    current_r_answers = r_answers(service_offering)
+    rescore = questions_to_rescore(previous, current_r_answers, all_questions, rule_index(score_rules))
+
+    with tracer.span("scoring", questions=len(all_questions), rescored=len(rescore)):
+        for q in all_questions:
+            if previous is not None and q['question_id'] not in rescore:
+                stored = previous.questions[q['question_id']]
+                q['new_score'] = stored.new_score
+                q['new_category'] = stored.new_category
+                user_results.rescore_skipped += 1
+                continue
+            user_results.rescored += 1
+            score_question(q, score_rules.get(q['question_id'], []), service_offering)
+
+    recorder = get_traffic_recorder()
+    if recorder is not None:
+        recorder.record(business_profile, all_questions)
+    end_stage("scoring")
+
+    # 4. A degraded LLM is not used for this request at all, so there is nothing to admit: answer
+    #    from templates below. Otherwise shed assessments the LLM cannot finish within the SLO:
+    #    reject them, or divert them to the same template path
+    degraded = llm_health.is_degraded()
+    decision = ADMIT
+    if not degraded:
+        decision = admission.decide(
+            llm_scheduler.waiting(INTERACTIVE),
+            llm_scheduler.capacity(),
+            llm_health.typical_latency(),
+            pending_diverted=len(_refinement_tasks)
+        )
+    if decision == REJECT:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, outcome="rejected")
+        root_span.set_attribute("outcome", "rejected")
+        raise HTTPException(
+            status_code=503,
+            detail="LLM capacity exhausted, please retry later",
+            headers={"Retry-After": str(admission.retry_after)}
+        )
+
+    #    When the LLM is degraded (or the request was diverted), answer from templates now and
+    #    refine in the background, as long as the refinement backlog has room
+    if decision == DIVERT or degraded:
+        results = await asyncio.gather(*[
+            asyncio.to_thread(template_advice_for_question, q, business_profile) for q in all_questions
+        ])
+        ADVICE_SOURCE.inc(len(results), source="template")
+        if decision == DIVERT or len(_refinement_tasks) < admission.max_diverted:
+            schedule_report_refinement(key, all_questions, business_profile)
+        advice_text = assemble_advice_text(results)
+        end_stage("assembly")
+        REQUEST_SECONDS.observe(time.perf_counter() - started, outcome="degraded")
+        root_span.set_attribute("outcome", "degraded")
+        return LLMAdviceResponse(
+            advice=advice_text,
+            timestamp=datetime.utcnow().isoformat(),
+            degraded=True
+        )
+
+    # 5. NEW: Create and run all LLM advice generation tasks concurrently, reusing the previous
+    #    advice of questions whose prompt is unchanged
+    fingerprints = {q['question_id']: prompt_fingerprint(q, business_profile) for q in all_questions}
+    cache_hits = {"previous_report": 0, "speculative": 0}
+
+    async def advice_for(q: Dict[str, Any]) -> Dict[str, Any]:
+        stored = previous.questions.get(q['question_id']) if previous is not None else None
+        if stored is not None and stored.advice is not None and stored.prompt_hash == fingerprints[q['question_id']]:
+            user_results.reused += 1
+            ADVICE_SOURCE.inc(source="previous_report")
+            cache_hits["previous_report"] += 1
+            return advice_result(q, stored.advice)
+        speculative = await speculative_advice.take(request.userId, fingerprints[q['question_id']])
+        if speculative is not None:
+            ADVICE_SOURCE.inc(source="speculative")
+            cache_hits["speculative"] += 1
+            return advice_result(q, speculative)
+        user_results.regenerated += 1
+        return await generate_advice_for_question(q, business_profile)
+
+    end_stage("admission")
+    with admission.admitted_request():
+        results = await asyncio.gather(*[advice_for(q) for q in all_questions])
+    end_stage("generation")
+    root_span.set_attributes(**{f"cache_hits.{source}": hits for source, hits in cache_hits.items()})
+
+    current = UserResults(r_answers=current_r_answers)
+    for q, result in zip(all_questions, results):
+        advice = result['advice']
+        current.questions[q['question_id']] = QuestionResult(
+            score=q.get('score', 0),
+            new_score=q['new_score'],
+            new_category=q['new_category'],
+            prompt_hash=fingerprints[q['question_id']],
+            advice=None if advice.startswith(ADVICE_ERROR_PREFIX) else advice
+        )
+    user_results.put(request.userId, current)
+
+    # 6. Group results into phases and categories and assemble the final advice text
+    advice_text = assemble_advice_text(results)
+    end_stage("assembly")
+    REQUEST_SECONDS.observe(time.perf_counter() - started, outcome="ok")
+    root_span.set_attribute("outcome", "ok")
     return LLMAdviceResponse(
         advice=advice_text,
         timestamp=datetime.utcnow().isoformat()
     )
 
+@app.post("/api/llm-advice/partial", response_model=SpeculativeAdviceResponse)
+async def speculate_llm_advice(request: LLMAdviceRequest):
+    """Start generating advice for the sections finished so far; /api/llm-advice reuses the results"""
+    scheduled = 0
+    if not llm_health.is_degraded():
+        assessment_data = request.assessmentData.model_dump()
+        service_offering = assessment_data.get('serviceOffering', {})
+        score_rules = await asyncio.to_thread(load_score_rules, 'api/score_rule.csv')
+        business_profile = profile_canonicalizer.canonicalize_profile(extract_business_profile(service_offering))
+        with priority(JOB, request.userId):  # the background tasks inherit the job class
+            for q in collect_questions(assessment_data):
+                score_question(q, score_rules.get(q['question_id'], []), service_offering)
+                fingerprint = prompt_fingerprint(q, business_profile)
+                if speculative_advice.schedule(request.userId, fingerprint, functools.partial(speculative_generate, q, business_profile)):
+                    scheduled += 1
+    return SpeculativeAdviceResponse(scheduled=scheduled, timestamp=datetime.utcnow().isoformat())
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
@@ -0,0 +1,109 @@
+"""
+Precompute advice for the most frequent profile / question / answer combinations.
+
+Reads the anonymised traffic log written by the live service (ADVICE_TRAFFIC_LOG),
+takes the --top most frequent combinations and generates their advice with at
+most --concurrency LLM calls in flight. Each result is written to the store as
+soon as it is ready and combinations already in the store are skipped, so an
+interrupted run can simply be started again and resumes where it stopped.
+
+The live service serves these results when PRECOMPUTED_ADVICE_DB points at the
+same store.
+
+Usage (from the backend directory):
+    python precompute_advice.py --traffic traffic.jsonl --store precomputed.sqlite --top 500 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from api.advice_store import AdviceStore, advice_key, read_traffic
+
+logger = logging.getLogger(__name__)
+
+Generator = Callable[[Dict[str, Any], Dict[str, str]], Awaitable[Optional[str]]]
+
+
+def top_combinations(records: Iterable[Dict[str, Any]], top: int) -> List[Tuple[Dict[str, Any], int]]:
+    """Most frequent combinations first, with their counts."""
+    counts = Counter(json.dumps(record, sort_keys=True) for record in records)
+    return [(json.loads(combo), count) for combo, count in counts.most_common(top)]
+
+
+def combination_inputs(combo: Dict[str, Any]) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """Rebuild the (business_profile, q_data) pair the live path would see."""
+    q_data = {
+        "question_id": combo["question_id"],
+        "question": combo.get("question", ""),
+        "new_category": combo["new_category"],
+        "catmapping": combo.get("catmapping", ""),
+        "anwser": combo.get("anwser", "N/A"),
+    }
+    return dict(combo["profile"]), q_data
+
+
+async def run_precompute(
+    combos: List[Tuple[Dict[str, Any], int]],
+    store: AdviceStore,
+    generate: Generator,
+    concurrency: int = 8,
+) -> Dict[str, int]:
+    semaphore = asyncio.Semaphore(concurrency)
+    summary = {"generated": 0, "skipped": 0, "failed": 0}
+
+    async def one(combo: Dict[str, Any], count: int) -> None:
+        profile, q_data = combination_inputs(combo)
+        key = advice_key(profile, q_data)
+        if key in store:
+            summary["skipped"] += 1
+            return
+        async with semaphore:
+            try:
+                advice = await generate(q_data, profile)
+            except Exception as e:
+                logger.warning("Error precomputing %s/%s: %s", q_data['question_id'], q_data['new_category'], e)
+                advice = None
+        if advice is None:
+            summary["failed"] += 1
+            return
+        store.put(key, advice, meta=dict(combo, count=count))
+        summary["generated"] += 1
+
+    await asyncio.gather(*[one(combo, count) for combo, count in combos])
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, int]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--traffic", required=True, help="JSONL traffic log written via ADVICE_TRAFFIC_LOG")
+    parser.add_argument("--store", required=True, help="SQLite file to write (PRECOMPUTED_ADVICE_DB)")
+    parser.add_argument("--top", type=int, default=500, help="number of most frequent combinations to generate")
+    parser.add_argument("--concurrency", type=int, default=8, help="maximum LLM calls in flight")
+    args = parser.parse_args(argv)
+
+    import main as app_main  # Deferred: needs the backend environment (.env, OpenAI settings)
+    from api.scheduler import PRECOMPUTE, priority
+
+    async def generate(q_data: Dict[str, Any], profile: Dict[str, str]) -> Optional[str]:
+        result = await app_main.generate_advice_for_question(q_data, profile)
+        advice = result["advice"]
+        return None if advice.startswith(app_main.ADVICE_ERROR_PREFIX) else advice
+
+    combos = top_combinations(read_traffic(args.traffic), args.top)
+    store = AdviceStore(args.store)
+    try:
+        # Lowest class: at most its share of the LLM capacity, always behind interactive work
+        with priority(PRECOMPUTE, "precompute"):
+            summary = asyncio.run(run_precompute(combos, store, generate, args.concurrency))
+    finally:
+        store.close()
+    print(f"Precompute finished: {summary} ({len(combos)} combinations considered)")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
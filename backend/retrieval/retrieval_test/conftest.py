@@ -0,0 +1,16 @@
+import os
+import sys
+
+# Without a Cosmos account, run the suite against the in-memory stand-in seeded with the
+# same answers.jsonl that data_load.py uploads. This must happen before cosmos_retriever
+# is imported, since it connects at import time.
+if not os.getenv("COSMOS_ENDPOINT"):
+    RETRIEVAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.dirname(RETRIEVAL_DIR))
+    os.environ["COSMOS_ENDPOINT"] = "https://fake-cosmos.documents.azure.com:443/"
+    os.environ["COSMOS_KEY"] = "fake-key"
+    os.environ.setdefault("FAKE_COSMOS_DATA", os.path.join(RETRIEVAL_DIR, "answers.jsonl"))
+
+    from api import fake_cosmos
+
+    fake_cosmos.install()
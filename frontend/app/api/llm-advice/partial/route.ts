@@ -0,0 +1,53 @@
+import { NextRequest, NextResponse } from "next/server"
+
+// 将已完成的部分问卷转发到后端，提前在后台生成建议
+export async function POST(request: NextRequest) {
+  try {
+    const body = await request.json()
+    const { userId, assessmentData } = body
+
+    if (!userId || !assessmentData) {
+      return NextResponse.json(
+        { error: "Missing required fields" },
+        { status: 400 }
+      )
+    }
+
+    const backendUrl = process.env.BACKEND_URL || "http://localhost:8000"
+    // 转发客户端 IP，后端按 IP 限流时使用（后端需设置 RATE_LIMIT_TRUST_FORWARDED=true）
+    const forwardedFor = request.headers.get("x-forwarded-for") || request.headers.get("x-real-ip")
+    const response = await fetch(`${backendUrl}/api/llm-advice/partial`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        ...(forwardedFor ? { "X-Forwarded-For": forwardedFor } : {}),
+      },
+      body: JSON.stringify({
+        userId: userId,
+        assessmentData: assessmentData
+      })
+    })
+
+    // 后端过载或限流时原样返回状态码和 Retry-After
+    if (response.status === 503 || response.status === 429) {
+      const retryAfter = response.headers.get("Retry-After")
+      return NextResponse.json(await response.json(), {
+        status: response.status,
+        headers: retryAfter ? { "Retry-After": retryAfter } : undefined
+      })
+    }
+
+    if (!response.ok) {
+      throw new Error(`Backend API error: ${response.status}`)
+    }
+
+    return NextResponse.json(await response.json())
+
+  } catch (error) {
+    console.error("Partial LLM Advice API Error:", error)
+    return NextResponse.json(
+      { error: "Internal server error", details: error instanceof Error ? error.message : "Unknown error" },
+      { status: 500 }
+    )
+  }
+}
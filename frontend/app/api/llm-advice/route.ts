@@ -15,10 +15,13 @@ export async function POST(request: NextRequest) {
 
     // 调用后端API
     const backendUrl = process.env.BACKEND_URL || "http://localhost:8000"
+    // 转发客户端 IP，后端按 IP 限流时使用（后端需设置 RATE_LIMIT_TRUST_FORWARDED=true）
+    const forwardedFor = request.headers.get("x-forwarded-for") || request.headers.get("x-real-ip")
     const response = await fetch(`${backendUrl}/api/llm-advice`, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
+        ...(forwardedFor ? { "X-Forwarded-For": forwardedFor } : {}),
       },
       body: JSON.stringify({
         userId: userId,
@@ -26,6 +29,15 @@ export async function POST(request: NextRequest) {
       })
     })
 
+    // 后端过载或限流时原样返回状态码和 Retry-After，方便客户端稍后重试
+    if (response.status === 503 || response.status === 429) {
+      const retryAfter = response.headers.get("Retry-After")
+      return NextResponse.json(await response.json(), {
+        status: response.status,
+        headers: retryAfter ? { "Retry-After": retryAfter } : undefined
+      })
+    }
+
     if (!response.ok) {
       const errorText = await response.text()
       console.error("Backend API error:", response.status, errorText)
@@ -37,6 +37,21 @@ const assessmentSteps = [
   { id: "toolbox-success", title: "Toolbox for success", completed: false },
 ]
 
+// 统一 userId：用当前登录用户邮箱
+function getCurrentUserId(): string {
+  let userId = "user_default"
+  if (typeof window !== "undefined") {
+    const userStr = localStorage.getItem("currentUser")
+    if (userStr) {
+      try {
+        const user = JSON.parse(userStr)
+        if (user.email) userId = user.email
+      } catch { /* no-op */ }
+    }
+  }
+  return userId
+}
+
 export function generateNewJsonFormat(answers: Record<string, AnswerData>): AssessmentResult {
   const result: AssessmentResult = {
     serviceOffering: {},
@@ -398,16 +413,7 @@ export function AssessmentFlow() {
         // 计算三大能力分数
         const categoryScores = calculateCategoryScores(state.answers)
         // 统一 userId：用当前登录用户邮箱
-        let userId = "user_default"
-        if (typeof window !== "undefined") {
-          const userStr = localStorage.getItem("currentUser")
-          if (userStr) {
-            try {
-              const user = JSON.parse(userStr)
-              if (user.email) userId = user.email
-            } catch { /* no-op */ }
-          }
-        }
+        const userId = getCurrentUserId()
         // 保存分数到文件
         try {
           await saveScoresToFile(userId, pillarScores, categoryScores)
@@ -483,6 +489,12 @@ export function AssessmentFlow() {
         
         router.push("/dashboard")
       } else {
+        // 提交已完成的部分，后端在后台提前生成建议（失败不影响答题）
+        fetch("/api/llm-advice/partial", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ userId: getCurrentUserId(), assessmentData: generateNewJsonFormat(state.answers) })
+        }).catch(() => { /* no-op */ })
         // 否则进入下一步
         dispatch({ type: "NEXT_STEP" })
       }
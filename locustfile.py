@@ -6,7 +6,6 @@ import importlib.util
 import pathlib
 import requests
 import sys
-import types
 import shutil
 
 try:
@@ -25,47 +24,26 @@ def _is_up(base: str) -> bool:
 
 def _install_test_stubs():
     if "openai" not in sys.modules:
-        openai_stub = types.ModuleType("openai")
+        # Async OpenAI stand-in with production-like latency; FAKE_LLM_* tune it
+        from api import fake_openai
 
-        class _Msg:
-            def __init__(self, c): self.content = c
+        for name, value in fake_openai.LOAD_TEST_PROFILE.items():
+            os.environ.setdefault(name, value)
+        os.environ.setdefault("AZURE_OPENAI_DEPLOYMENT", "fake")
+        os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "http://fake-openai.local")
+        os.environ.setdefault("AZURE_OPENAI_API_KEY", "fake")
+        fake_openai.install()
 
-        class _Choice:
-            def __init__(self, c): self.message = _Msg(c)
-
-        class _Resp:
-            def __init__(self, c): self.choices = [_Choice(c)]
-
-        class _Comps:
-            def create(self, **k): return _Resp("Stubbed LLM advice")
-
-        class _Chat:
-            def __init__(self): self.completions = _Comps()
-
-        class AzureOpenAI:
-            def __init__(self, *a, **k): self.chat = _Chat()
-
-        openai_stub.AzureOpenAI = AzureOpenAI
-        sys.modules["openai"] = openai_stub
-
-    if "azure" not in sys.modules:
-        sys.modules["azure"] = types.ModuleType("azure")
     if "azure.cosmos" not in sys.modules:
-        cosmos_stub = types.ModuleType("azure.cosmos")
+        # In-memory Cosmos with the real answers, so retrieval is part of the measured path
+        from api import fake_cosmos
 
-        class _Cont:
-            def query_items(self, *a, **k): return []
-
-        class _DB:
-            def get_container_client(self, *a, **k): return _Cont()
-
-        class CosmosClient:
-            def __init__(self, *a, **k): ...
-            def get_database_client(self, *a, **k): return _DB()
-
-        cosmos_stub.CosmosClient = CosmosClient
-        sys.modules["azure.cosmos"] = cosmos_stub
-        setattr(sys.modules["azure"], "cosmos", cosmos_stub)
+        root = pathlib.Path(__file__).resolve().parent
+        os.environ.setdefault("FAKE_COSMOS_DATA", str(root / "backend" / "retrieval" / "answers.jsonl"))
+        os.environ.setdefault("FAKE_COSMOS_LATENCY", "lognormal:0.005,0.5")
+        os.environ.setdefault("COSMOS_ENDPOINT", "https://fake-cosmos.local")
+        os.environ.setdefault("COSMOS_KEY", "fake")
+        fake_cosmos.install()
 
 
 def _ensure_imports_resolve(root: pathlib.Path) -> None:
@@ -90,6 +68,13 @@ def _ensure_runtime_assets(root: pathlib.Path, cwd: pathlib.Path) -> None:
         dst.write_text("", encoding="utf-8")
 
 
+_ensure_imports_resolve(pathlib.Path(__file__).resolve().parent)
+from api.assessment_generator import AssessmentGenerator  # noqa: E402
+
+# Full 34-question assessments; ASSESSMENT_SEED / ASSESSMENT_ANSWER_WEIGHTS / ASSESSMENT_TEXT_RATE tune them
+assessments = AssessmentGenerator.from_env()
+
+
 @events.init.add_listener
 def _maybe_boot_local_api(environment, **_):
     host = (environment.host or os.getenv("LOCUST_HOST") or "").rstrip("/")
@@ -143,30 +128,7 @@ class APILoad(HttpUser):
 
     @task
     def advice(self):
-        payload = {
-            "userId": "locust",
-            "assessmentData": {
-                "serviceOffering": {
-                    "industry": {"text": "EdTech"},
-                    "business_challenge": {"text": "Lead Gen"},
-                    "service_type": {"text": "Marketing"},
-                    "revenue_type": {"text": "subscription"},
-                    "R2": {"question_name": "R2", "anwserselete": "A"},
-                    "R3": {"question_name": "R3", "anwserselete": "A"},
-                    "R4": {"question_name": "R4", "anwserselete": "B"},
-                    "R12": {"question_name": "R12", "anwserselete": "C"},
-                },
-                "section1": {
-                    "q1": {
-                        "question": "Q1",
-                        "score": 0.5,
-                        "category": "Start_Doing",
-                        "catmapping": "Profitable",
-                        "anwser": "ans1",
-                    }
-                },
-            },
-        }
+        payload = assessments.request()
         with self.client.post("/api/llm-advice", json=payload, catch_response=True) as r:
             try:
                 ok = (r.status_code == 200) and ("advice" in r.json())
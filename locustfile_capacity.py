@@ -0,0 +1,48 @@
+"""
+Step-load capacity run: the users and local API boot of locustfile.py, under a
+load shape that adds users step by step until p95 breaks the SLO or failures
+appear, then writes a capacity report (CAPACITY_* settings, backend/api/capacity.py).
+
+    locust -f locustfile_capacity.py --headless
+
+The LLM latency profile is whatever FAKE_LLM_* says; run once per profile of interest.
+"""
+from locust import LoadTestShape, events
+
+import locustfile
+from locustfile import APILoad  # noqa: F401  (the user class Locust runs)
+# locustfile put backend/ on the path
+from api import fake_openai
+from api.capacity import CapacityFinder, format_report, write_report
+
+
+def _llm_stats():
+    # LLM calls and tokens are only visible when Locust booted the API in process
+    if "_LOCUST_UVICORN" in vars(locustfile):
+        return fake_openai.get_fake_llm().stats()
+    return None
+
+
+finder = CapacityFinder.from_env(llm_stats=_llm_stats)
+
+
+@events.request.add_listener
+def _record(response_time, exception=None, **_):
+    finder.record(response_time, exception is not None)
+
+
+class StepLoad(LoadTestShape):
+    def tick(self):
+        return finder.tick(self.get_run_time())
+
+
+@events.quitting.add_listener
+def _write_capacity_report(environment, **_):
+    if environment.shape_class is not None:
+        finder.finish(environment.shape_class.get_run_time())
+    report = finder.report()
+    path = write_report(report)
+    print(format_report(report))
+    print(f"[locust] Capacity report written to {path}")
+    if report["capacity"] is None:
+        environment.process_exit_code = 1
@@ -0,0 +1,88 @@
+from unittest.mock import patch
+
+import pytest
+from starlette.testclient import TestClient
+
+import app_main_under_test as appmod
+from api.admission import ADMIT, DIVERT, REJECT, AdmissionController
+from api.degradation import LLMHealthMonitor, ReportStore
+
+
+def payload():
+    return {
+        "userId": "u-admission",
+        "assessmentData": {
+            "serviceOffering": {"industry": {"text": "Retail"}, "business-challenge": {"text": "Cashflow"}},
+            "sectionA": {"q1": {"question": "Q1", "score": 0.5, "category": "Marketing", "catmapping": "Profitable", "anwser": "Agree"}},
+        },
+    }
+
+
+def test_decide_sheds_on_each_limit_and_counts_reasons():
+    controller = AdmissionController(max_in_flight=1, max_queued_calls=10, slo_seconds=5)
+    assert controller.decide(queued_calls=0, capacity=4, call_latency=1.0) == ADMIT
+    assert controller.decide(queued_calls=10, capacity=4, call_latency=0.1) == REJECT
+    assert controller.decide(queued_calls=8, capacity=1, call_latency=1.0) == REJECT
+    assert controller.retry_after == 8
+    with controller.admitted_request():
+        assert controller.decide(queued_calls=0, capacity=4, call_latency=1.0) == REJECT
+    assert controller.stats() == {
+        "overflow": REJECT,
+        "in_flight": 0,
+        "admitted": 1,
+        "rejected": 3,
+        "diverted": 0,
+        "shed_reasons": {"in_flight": 1, "queue": 1, "slo": 1},
+    }
+
+
+def test_divert_until_background_backlog_is_full():
+    controller = AdmissionController(max_in_flight=0, overflow=DIVERT, max_diverted=2)
+    assert controller.decide(0, 1, 0.0, pending_diverted=1) == DIVERT
+    assert controller.decide(0, 1, 0.0, pending_diverted=2) == REJECT
+    with pytest.raises(ValueError):
+        AdmissionController(overflow="queue")
+
+
+def test_typical_latency_is_window_median():
+    monitor = LLMHealthMonitor()
+    assert monitor.typical_latency() == 0.0
+    for latency in (1.0, 3.0, 2.0):
+        monitor.record(latency, ok=True)
+    assert monitor.typical_latency() == 2.0
+
+
+def test_rejected_request_gets_503_with_retry_after():
+    with patch.object(appmod, "admission", AdmissionController(max_in_flight=0)), \
+         patch.object(appmod, "generate_advice_for_question") as generate:
+        client = TestClient(appmod.app)
+        response = client.post("/api/llm-advice", json=payload())
+        stats = client.get("/api/llm-stats").json()["admission"]
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    generate.assert_not_called()
+    assert stats["rejected"] == 1 and stats["shed_reasons"]["in_flight"] == 1
+
+
+def test_diverted_request_gets_template_advice():
+    with patch.object(appmod, "admission", AdmissionController(max_in_flight=0, overflow=DIVERT)), \
+         patch.object(appmod, "refined_reports", ReportStore()), \
+         patch.object(appmod, "load_score_rules", return_value={}):
+        with TestClient(appmod.app) as client:
+            body = client.post("/api/llm-advice", json=payload()).json()
+    assert body["degraded"] is True
+    assert "For a business in Retail facing Cashflow:" in body["advice"]
+
+
+def test_degraded_request_gets_templates_even_when_admission_would_reject():
+    controller = AdmissionController(max_in_flight=0, max_diverted=0)
+    with patch.object(appmod, "admission", controller), \
+         patch.object(appmod, "llm_health", LLMHealthMonitor(mode="on")), \
+         patch.object(appmod, "refined_reports", ReportStore()), \
+         patch.object(appmod, "schedule_report_refinement") as refine, \
+         patch.object(appmod, "load_score_rules", return_value={}):
+        with TestClient(appmod.app) as client:
+            response = client.post("/api/llm-advice", json=payload())
+    assert response.status_code == 200 and response.json()["degraded"] is True
+    assert controller.stats()["rejected"] == 0
+    refine.assert_not_called()  # the refinement backlog is full
@@ -0,0 +1,69 @@
+import pytest
+from starlette.testclient import TestClient
+
+import app_main_under_test as appmod
+from api.assessment_generator import (
+    PILLARS,
+    QUESTION_COUNT,
+    SCORE_MAPPING,
+    AssessmentGenerator,
+    generate_request,
+    parse_weights,
+)
+from api.models import LLMAdviceRequest
+
+
+def test_payload_matches_the_frontend_shape():
+    payload = generate_request(seed=3)
+    LLMAdviceRequest.model_validate(payload)
+    data = payload["assessmentData"]
+
+    assert list(data)[1:] == [name for name, _, _, _ in PILLARS]
+    service_offering = data["serviceOffering"]
+    assert [v["question_name"] for v in service_offering.values() if "question_name" in v] == [f"R{i}" for i in range(1, 17)]
+    assert all(v["anwserselete"] in "abc" for v in service_offering.values() if "anwserselete" in v)
+
+    questions = appmod.collect_questions(data)
+    assert len(questions) == QUESTION_COUNT == 34
+    gtm = data["Base camp for success (go to market GTM)"]
+    assert [q["question_name"] for q in gtm.values()] == [f"GTM{i}" for i in range(1, 11)]
+    assert gtm["targeted-pipeline"]["catmapping"] == "Repeatable"
+    assert all(q["score"] == SCORE_MAPPING[q["anwser"]] for q in questions)
+    assert appmod.extract_business_profile(service_offering)["revenue_type"] != "N/A"
+
+
+def test_same_seed_same_sequence_and_sizes():
+    first, second = AssessmentGenerator(seed=11), AssessmentGenerator(seed=11)
+    assert [first.request() for _ in range(3)] == [second.request() for _ in range(3)]
+    assert first.request()["userId"] == "synthetic-4"
+    assert len(appmod.collect_questions(first.assessment(10))) == 10
+    assert len(appmod.collect_questions(first.assessment(340))) == 340
+
+
+def test_answer_distribution_and_free_text():
+    generator = AssessmentGenerator(seed=1, answer_weights=parse_weights("Strongly Agree=1"), text_rate=0)
+    questions = appmod.collect_questions(generator.assessment(200))
+    assert {q["anwser"] for q in questions} == {"Strongly Agree"}
+    assert not any(q["additionalText"] for q in questions)
+
+    texts = appmod.collect_questions(AssessmentGenerator(seed=1, text_rate=1).assessment())
+    assert all(q["additionalText"] for q in texts)
+
+    with pytest.raises(ValueError):
+        parse_weights("Maybe=1")
+    with pytest.raises(ValueError):
+        AssessmentGenerator(answer_weights={"Agree": 0})
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("ASSESSMENT_SEED", "5")
+    monkeypatch.setenv("ASSESSMENT_ANSWER_WEIGHTS", "Disagree=1")
+    monkeypatch.setenv("ASSESSMENT_TEXT_RATE", "0")
+    generator = AssessmentGenerator.from_env()
+    assert generator.answers == ["Disagree"] and generator.text_rate == 0
+    assert generator.request() == AssessmentGenerator(5, {"Disagree": 1}, 0).request()
+
+
+def test_generated_request_is_served():
+    response = TestClient(appmod.app).post("/api/llm-advice", json=generate_request(seed=2))
+    assert response.status_code == 200 and "advice" in response.json()
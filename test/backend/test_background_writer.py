@@ -0,0 +1,51 @@
+import threading
+
+from api.background_writer import BackgroundWriter
+
+
+def test_items_are_written_in_batches_and_flushed_on_close():
+    batches = []
+    writer = BackgroundWriter(batches.append, name="test-writer")
+    for i in range(5):
+        assert writer.put(i)
+    writer.close()
+    assert [item for batch in batches for item in batch] == [0, 1, 2, 3, 4]
+    assert not writer.put(5) and writer.dropped == 1
+    writer.close()  # closing twice is harmless
+
+
+def test_full_queue_drops_instead_of_blocking():
+    started, release = threading.Event(), threading.Event()
+    written = []
+
+    def slow_write(items):
+        started.set()
+        release.wait()
+        written.extend(items)
+
+    writer = BackgroundWriter(slow_write, name="test-slow-writer", max_queue=1)
+    writer.put("first")
+    assert started.wait(1)  # the thread is busy writing "first"
+    assert writer.put("second") and not writer.put("third")
+    assert writer.queued == 1 and writer.dropped == 1
+    release.set()
+    writer.flush()
+    assert written == ["first", "second"]
+    writer.close()
+
+
+def test_a_failing_write_is_logged_and_the_thread_carries_on(caplog):
+    written = []
+
+    def write(items):
+        if "bad" in items:
+            raise OSError("disk full")
+        written.extend(items)
+
+    writer = BackgroundWriter(write, name="test-failing-writer")
+    writer.put("bad")
+    writer.flush()
+    writer.put("good")
+    writer.close()
+    assert written == ["good"]
+    assert "test-failing-writer failed" in caplog.text
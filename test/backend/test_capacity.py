@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from api.capacity import CapacityFinder, format_report, write_report
+
+
+def run(finder, latency_ms, failed=lambda users: False, seconds=1000, per_second=10):
+    """Drive the finder with one tick a second, each followed by `per_second` finished requests."""
+    for second in range(seconds):
+        target = finder.tick(second)
+        if target is None:
+            return second
+        users = target[0]
+        for _ in range(per_second):
+            finder.record(latency_ms(users), failed(users))
+    return seconds
+
+
+def test_knee_is_the_first_step_over_the_slo(monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_LATENCY", "lognormal:0.8,0.5")
+    llm = {"calls": 0, "throttled": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def llm_stats():
+        llm["calls"] += 340  # sampled once per step boundary, 10 s apart
+        llm["prompt_tokens"] += 34000
+        llm["completion_tokens"] += 6800
+        return dict(llm)
+
+    finder = CapacityFinder(start_users=2, step_users=2, step_seconds=12, warmup_seconds=2, slo_p95_ms=500, llm_stats=llm_stats)
+    stopped = run(finder, latency_ms=lambda users: 100 * users)
+
+    assert [s["users"] for s in finder.steps] == [2, 4, 6]
+    assert stopped == 36 and finder.knee["users"] == 6 and finder.knee["p95_ms"] == 600
+    report = finder.report()
+    capacity = report["capacity"]
+    assert capacity["users"] == 4 and capacity["p95_ms"] == 400
+    assert capacity["assessments_per_s"] == capacity["assessments_per_s_per_worker"] == 10
+    assert capacity["llm_rpm"] == pytest.approx(2040) and capacity["llm_tpm"] == pytest.approx(244800)
+    assert finder.steps[0]["llm"]["calls_per_assessment"] == 3.4
+    assert report["llm_profile"] == {"FAKE_LLM_LATENCY": "lognormal:0.8,0.5"} and not report["capacity_is_lower_bound"]
+
+    text = format_report(report)
+    assert "<- knee" in text and "10.00 assessments/s at 4 users" in text and "2040 RPM" in text
+
+
+def test_warmup_requests_are_left_out():
+    finder = CapacityFinder(step_seconds=10, warmup_seconds=5, slo_p95_ms=500)
+    # Slow during the warmup of each step, fast once it settles
+    for second in range(20):
+        finder.tick(second)
+        finder.record(5000 if second % 10 < 5 else 100, False)
+    finder.finish(20)
+    assert [s["p95_ms"] for s in finder.steps] == [100, 100]
+    assert finder.steps[0]["requests"] == 5
+
+
+def test_failures_mark_the_knee_and_no_capacity_without_a_good_step():
+    finder = CapacityFinder(start_users=1, step_seconds=10, warmup_seconds=0, max_fail_ratio=0.01)
+    run(finder, latency_ms=lambda users: 100, failed=lambda users: users >= 2)
+    assert finder.knee == finder.steps[-1] and finder.knee["fail_ratio"] == 1.0
+    assert finder.report()["capacity"]["users"] == 1
+
+    hopeless = CapacityFinder(step_seconds=10, warmup_seconds=0, slo_p95_ms=50)
+    run(hopeless, latency_ms=lambda users: 100)
+    report = hopeless.report()
+    assert report["capacity"] is None and "No step met the SLO" in format_report(report)
+
+    # Nothing completed in a step: that is past the knee too
+    idle = CapacityFinder(step_seconds=10, warmup_seconds=0)
+    run(idle, latency_ms=lambda users: 100, per_second=0)
+    assert idle.knee["requests"] == 0 and idle.report()["capacity"] is None
+
+
+def test_max_users_gives_a_lower_bound(tmp_path, monkeypatch):
+    monkeypatch.setenv("CAPACITY_STEP_SECONDS", "10")
+    monkeypatch.setenv("CAPACITY_WARMUP_SECONDS", "0")
+    monkeypatch.setenv("CAPACITY_MAX_USERS", "3")
+    monkeypatch.setenv("CAPACITY_API_WORKERS", "2")
+    finder = CapacityFinder.from_env()
+    assert run(finder, latency_ms=lambda users: 100) == 30
+    report = finder.report()
+    assert report["knee"] is None and report["capacity_is_lower_bound"]
+    assert report["capacity"]["assessments_per_s_per_worker"] == 5
+    assert "at least 10.00 assessments/s" in format_report(report)
+
+    monkeypatch.setenv("CAPACITY_REPORT", str(tmp_path / "capacity.json"))
+    path = write_report(report)
+    assert json.loads(open(path).read())["capacity"]["users"] == 3
+
+    with pytest.raises(ValueError):
+        CapacityFinder(step_seconds=5, warmup_seconds=5)
+
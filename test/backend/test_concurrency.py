@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import app_main_under_test as appmod
+from api.concurrency import AdaptiveLimiter
+from api.llm_router import Deployment, LLMRouter
+
+
+def test_limit_caps_concurrency():
+    limiter = AdaptiveLimiter(initial_limit=2)
+    peak = 0
+
+    async def work():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.005)
+
+    async def scenario():
+        await asyncio.gather(*[work() for _ in range(6)])
+
+    asyncio.run(scenario())
+    assert peak == 2
+    assert limiter.in_flight == 0 and limiter.waiting == 0
+
+
+def test_additive_increase_only_when_limit_is_used():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=4)
+    limiter.on_success(0.1)  # idle: nothing in flight, limit is not the bottleneck
+    assert limiter.limit == 2
+
+    limiter.in_flight = 2
+    for _ in range(10):
+        limiter.on_success(0.1)
+    assert 3 <= limiter.limit <= 4
+    assert [h["limit"] for h in limiter.stats()["history"]][0] == 2
+
+
+def test_multiplicative_decrease_on_throttle_and_slow_calls():
+    limiter = AdaptiveLimiter(initial_limit=20, min_limit=2, latency_target=1.0, decrease_factor=0.5, decrease_cooldown=0)
+    limiter.on_throttle()
+    assert limiter.limit == 10
+    limiter.on_success(5.0)  # slower than the target
+    assert limiter.limit == 5
+    for _ in range(5):
+        limiter.on_throttle()
+    assert limiter.limit == 2
+    stats = limiter.stats()
+    assert (stats["throttles"], stats["slow_calls"]) == (6, 1)
+
+
+def test_decrease_cooldown_treats_a_burst_as_one_signal():
+    limiter = AdaptiveLimiter(initial_limit=10, decrease_factor=0.5, decrease_cooldown=60)
+    for _ in range(3):
+        limiter.on_throttle()
+    assert limiter.limit == 5
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    limiter = AdaptiveLimiter(initial_limit=1)
+
+    async def scenario():
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        limiter.release()
+
+    asyncio.run(scenario())
+    assert limiter.in_flight == 0 and limiter.waiting == 0
+
+
+def test_completion_path_feeds_the_limiter():
+    class Throttled(Exception):
+        status_code = 429
+        response = SimpleNamespace(headers={"retry-after": "1"})
+
+    class _Completions:
+        def __init__(self):
+            self.calls = 0
+
+        async def create(self, **kwargs):
+            self.calls += 1
+            if self.calls == 1:
+                raise Throttled()
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions()))
+    limiter = AdaptiveLimiter(initial_limit=10, decrease_factor=0.5)
+    q = {"question_id": "question_00", "new_category": "Do_More", "catmapping": "Profitable"}
+    profile = {"industry": "Tech", "business_challenge": "Growth", "service_type": "N/A", "revenue_type": "N/A"}
+    with patch.object(appmod, "llm_limiter", limiter), \
+         patch.object(appmod, "_router", LLMRouter([Deployment("east"), Deployment("west")])), \
+         patch.object(appmod, "get_openai_client", return_value=fake_client):
+        result = asyncio.run(appmod.generate_advice_for_question(q, profile))
+
+    assert result["advice"] == "ok"
+    assert limiter.throttles == 1 and limiter.limit == 5
+    assert limiter.in_flight == 0
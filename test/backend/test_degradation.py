@@ -0,0 +1,95 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from starlette.testclient import TestClient
+
+import app_main_under_test as appmod
+from api.degradation import LLMHealthMonitor, ReportStore, report_key, template_advice
+from api.llm_router import Deployment, LLMRouter
+
+
+def payload(user_id="u-degraded"):
+    return {
+        "userId": user_id,
+        "assessmentData": {
+            "serviceOffering": {"industry": {"text": "EdTech"}, "business-challenge": {"text": "Lead Gen"}},
+            "section1": {
+                "q1": {"question": "Q1", "score": 0.5, "category": "Marketing", "catmapping": "Profitable", "anwser": "Agree"}
+            },
+        },
+    }
+
+
+def test_monitor_degrades_on_error_rate_and_recovers_after_cooldown():
+    monitor = LLMHealthMonitor(min_samples=4, cooldown_seconds=0.05)
+    for _ in range(3):
+        monitor.record(0.1, ok=False)
+    assert not monitor.is_degraded()  # not enough samples yet
+    monitor.record(0.1, ok=False)
+    assert monitor.is_degraded()
+    assert monitor.stats()["times_degraded"] == 1
+
+    time.sleep(0.06)
+    assert not monitor.is_degraded()
+
+
+def test_monitor_degrades_on_p95_latency_and_honours_mode():
+    monitor = LLMHealthMonitor(min_samples=2, p95_latency_threshold=1.0)
+    monitor.record(5.0, ok=True)
+    monitor.record(5.0, ok=True)
+    assert monitor.is_degraded()
+
+    assert LLMHealthMonitor(mode="on").is_degraded()
+    off = LLMHealthMonitor(mode="off", min_samples=1)
+    off.record(1.0, ok=False)
+    assert not off.is_degraded()
+
+
+def test_report_store_ttl_and_lru():
+    store = ReportStore(max_entries=2, ttl_seconds=60)
+    store.put("a", "A")
+    store.put("b", "B")
+    store.get("a")
+    store.put("c", "C")
+    assert store.get("b") is None and store.get("a") == "A" and len(store) == 2
+
+    expired = ReportStore(ttl_seconds=0)
+    expired.put("a", "A")
+    time.sleep(0.001)
+    assert expired.get("a") is None
+
+
+def test_report_key_and_template_advice():
+    data = payload()["assessmentData"]
+    assert report_key("u1", data) == report_key("u1", dict(data))
+    assert report_key("u1", data) != report_key("u2", data)
+    profile = {"industry": "EdTech", "business_challenge": "Lead Gen"}
+    assert template_advice("Do X.", profile) == "For a business in EdTech facing Lead Gen: Do X."
+    assert template_advice("Do X.", {"industry": "N/A"}) == "Do X."
+
+
+def test_degraded_request_returns_template_then_refined_report():
+    class _Completions:
+        async def create(self, **kwargs):
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Refined LLM advice"))])
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions()))
+    with patch.object(appmod, "llm_health", LLMHealthMonitor(mode="on")), \
+         patch.object(appmod, "refined_reports", ReportStore()), \
+         patch.object(appmod, "_router", LLMRouter([Deployment("east")])), \
+         patch.object(appmod, "get_openai_client", return_value=fake_client), \
+         patch.object(appmod, "load_score_rules", return_value={}):
+        with TestClient(appmod.app) as client:
+            first = client.post("/api/llm-advice", json=payload()).json()
+            assert first["degraded"] is True
+            assert "For a business in Education Technology facing Lead generation:" in first["advice"]
+
+            for _ in range(50):
+                if not appmod._refinement_tasks:
+                    break
+                time.sleep(0.01)
+
+            second = client.post("/api/llm-advice", json=payload()).json()
+            assert second["degraded"] is False
+            assert "Refined LLM advice" in second["advice"]
@@ -0,0 +1,145 @@
+import importlib.util
+import sys
+import time
+
+import pytest
+
+from api import fake_cosmos
+from api.fake_cosmos import (
+    CONTAINER_NAME,
+    DATABASE_NAME,
+    CosmosClient,
+    CosmosHttpResponseError,
+    CosmosResourceExistsError,
+    CosmosResourceNotFoundError,
+    FakeContainer,
+    FakeCosmosAccount,
+    PartitionKey,
+    install,
+    load_answers,
+)
+from api.fake_openai import parse_latency
+
+ANSWERS = "backend/retrieval/answers.jsonl"
+QUERY = "SELECT c.text FROM c WHERE c.question_id = @question_id AND c.category = @category"
+
+
+def params(**values):
+    return [{"name": f"@{name}", "value": value} for name, value in values.items()]
+
+
+@pytest.fixture
+def answers():
+    container = FakeContainer("answers")
+    assert load_answers(container, ANSWERS) == 102
+    return container
+
+
+@pytest.fixture
+def retriever(monkeypatch):
+    """The real api/cosmos_retriever.py (tests otherwise use a stub), on a fake account seeded with the answers."""
+    for name in ("azure", "azure.cosmos", "azure.cosmos.exceptions"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    monkeypatch.setenv("COSMOS_ENDPOINT", "https://fake.documents.azure.com")
+    monkeypatch.setenv("COSMOS_KEY", "key")
+    monkeypatch.setenv("FAKE_COSMOS_DATA", ANSWERS)
+    monkeypatch.setattr(fake_cosmos, "_account", None)
+    install()
+    spec = importlib.util.spec_from_file_location("api.cosmos_retriever_on_fake", "backend/api/cosmos_retriever.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_retriever_reads_answers_from_the_fake(retriever):
+    assert "specific clients" in retriever.get_answer_text("question_01", "Start_Doing")
+    assert retriever.get_answer_text("question_99", "Start_Doing") is None
+    container = retriever.container_client
+    assert container.stats()["queries"] == 2
+    # Both queries pin the partition key: base charge only (plus returned KB)
+    assert container.last_response_headers["x-ms-request-charge"] == "2.30"
+
+
+def test_query_shapes(answers):
+    def query(text, **values):
+        return list(answers.query_items(text, parameters=params(**values)))
+
+    assert len(query(QUERY, question_id="question_00", category="Do_More")) == 1
+    pinned_charge = float(answers.last_response_headers["x-ms-request-charge"])
+
+    # A batched lookup: several pairs in one query, fanned out to their partitions only
+    batch = query(
+        "SELECT c.question_id, c.text FROM c WHERE (c.question_id = @q0 AND c.category = @c0) "
+        "OR (c.question_id = @q1 AND c.category = @c1)",
+        q0="question_00", c0="Do_More", q1="question_05", c1="Keep_Doing",
+    )
+    assert sorted(r["question_id"] for r in batch) == ["question_00", "question_05"]
+    assert float(answers.last_response_headers["x-ms-request-charge"]) == pytest.approx(pinned_charge + 1.0)
+
+    categories = query("SELECT VALUE c.category FROM c WHERE c.question_id IN (@a, 'question_01') AND NOT c.category != 'Do_More'", a="question_00")
+    assert categories == ["Do_More", "Do_More"]
+    assert len(query("SELECT TOP 5 * FROM c")) == 5
+    everything = query("SELECT * FROM c WHERE c.missing = NULL OR c.question_id = \"question_33\"")
+    assert len(everything) == 3 and {"_ts", "_etag"} <= set(everything[0])
+
+    for bad in ("SELECT c.text FROM c ORDER BY c.text", "SELECT c.text FROM c WHERE c.category > 1", "DELETE FROM c", "SELECT c.text FROM c WHERE c.category = @nope", "SELECT ^"):
+        with pytest.raises(CosmosHttpResponseError) as exc:
+            query(bad)
+        assert exc.value.status_code == 400
+
+
+def test_point_reads_creates_and_upserts():
+    account = FakeCosmosAccount()
+    container = account.database(DATABASE_NAME).create_container_if_not_exists("items", PartitionKey("/question_id"))
+    item = {"id": "a", "question_id": "question_00", "category": "Do_More", "text": "x", "rank": 1}
+    container.create_item(item)
+    with pytest.raises(CosmosResourceExistsError):
+        container.create_item(item)
+    container.upsert_item(dict(item, text="y"))
+    assert container.read_item("a", partition_key="question_00")["text"] == "y"
+    assert container.last_response_headers["x-ms-request-charge"] == "1.00"
+    with pytest.raises(CosmosResourceNotFoundError):
+        container.read_item("a", partition_key="question_01")
+    with pytest.raises(CosmosHttpResponseError):
+        container.upsert_item({"question_id": "question_00"})
+    assert list(container.query_items("SELECT VALUE c.id FROM c WHERE c.rank = 1.0", partition_key="question_00")) == ["a"]
+    assert container.stats() == {"items": 1, "reads": 1, "writes": 2, "queries": 1, "throttled": 0, "request_charge": 15.7}
+
+
+def test_throughput_budget_and_injected_throttles(answers):
+    answers.ru_per_second = 5  # two queries per second
+    with pytest.raises(CosmosHttpResponseError) as exc:
+        for _ in range(10):
+            list(answers.query_items(QUERY, parameters=params(question_id="question_00", category="Do_More")))
+    assert exc.value.status_code == 429 and 0 < int(exc.value.headers["x-ms-retry-after-ms"]) <= 1000
+    assert answers.throttled == 1
+
+    flaky = FakeContainer("flaky", throttle_rate=1.0)
+    with pytest.raises(CosmosHttpResponseError) as exc:
+        flaky.upsert_item({"id": "a", "question_id": "q"})
+    assert exc.value.status_code == 429 and flaky.stats()["items"] == 0
+
+
+def test_latency_and_from_env(monkeypatch):
+    container = FakeContainer("slow", latency=parse_latency("0.02"))
+    started = time.monotonic()
+    container.upsert_item({"id": "a", "question_id": "q"})
+    assert time.monotonic() - started >= 0.02
+
+    monkeypatch.setenv("FAKE_COSMOS_DATA", ANSWERS)
+    monkeypatch.setenv("FAKE_COSMOS_RU_PER_S", "400")
+    monkeypatch.setenv("FAKE_COSMOS_SEED", "2")
+    account = FakeCosmosAccount.from_env()
+    container = account.databases[DATABASE_NAME].containers[CONTAINER_NAME]
+    assert container.ru_per_second == 400 and container.stats()["items"] == 102
+
+
+def test_client_shares_one_account(monkeypatch):
+    monkeypatch.setattr(fake_cosmos, "_account", FakeCosmosAccount())
+    database = CosmosClient("https://fake", credential="key").create_database("db")
+    with pytest.raises(CosmosResourceExistsError):
+        CosmosClient().create_database("db")
+    database.create_container("c", PartitionKey("/pk"))
+    with pytest.raises(CosmosResourceExistsError):
+        database.create_container("c", PartitionKey("/pk"))
+    assert CosmosClient().create_database_if_not_exists("db").get_container_client("c") is database.containers["c"]
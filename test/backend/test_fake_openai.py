@@ -0,0 +1,131 @@
+import asyncio
+import json
+import random
+import time
+
+import pytest
+from starlette.testclient import TestClient
+
+import app_main_under_test as appmod
+from api import fake_openai
+from api.assessment_generator import generate_request
+from api.fake_openai import FakeLLM, InternalServerError, RateLimitError, create_app, parse_latency
+from api.llm_router import Deployment, LLMRouter, retry_after_seconds
+from api.micro_batch import build_batch_messages, parse_batch_response
+
+MESSAGES = [{"role": "system", "content": "You are a sales consultant."}, {"role": "user", "content": "How do I grow?"}]
+
+
+@pytest.fixture
+def fake_llm():
+    """Route the app's OpenAI client to a fresh FakeLLM for the test."""
+    saved = fake_openai._llm
+
+    def install(**kwargs):
+        return fake_openai.install(FakeLLM(seed=1, **kwargs))
+
+    yield install
+    fake_openai._llm = saved
+
+
+def test_the_app_client_runs_concurrently_against_the_fake(fake_llm, monkeypatch):
+    llm = fake_llm(latency=parse_latency("uniform:0.02,0.05"), completion_tokens=40)
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "https://fake.openai.azure.com")
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "key")
+    monkeypatch.setattr(appmod, "_client", None)
+    monkeypatch.setattr(appmod, "_router", LLMRouter([Deployment("east")]))
+
+    response = TestClient(appmod.app).post("/api/llm-advice", json=generate_request(seed=4, questions=10, text_rate=1))
+    assert response.status_code == 200
+    assert "Start by writing down" in response.json()["advice"]
+    assert llm.ok == llm.calls == 10 and llm.max_in_flight > 1
+    assert llm.stats()["completion_tokens"] == 400
+
+
+def test_injected_errors_look_like_the_sdk():
+    async def call(llm):
+        return await llm.complete("east", MESSAGES)
+
+    with pytest.raises(RateLimitError) as throttled:
+        asyncio.run(call(FakeLLM(rate_429=1.0, retry_after=2.5)))
+    assert retry_after_seconds(throttled.value) == 2.5
+
+    llm = FakeLLM(rate_500=1.0)
+    with pytest.raises(InternalServerError) as failed:
+        asyncio.run(call(llm))
+    assert failed.value.status_code == 500 and retry_after_seconds(failed.value) is None
+    assert llm.stats()["errors"] == 1 and llm.in_flight == 0
+
+
+def test_rpm_and_tpm_quotas_answer_429_until_the_window_frees():
+    llm = FakeLLM(rpm=2)
+
+    async def calls(n, **kwargs):
+        for _ in range(n):
+            await llm.complete("east", MESSAGES, **kwargs)
+
+    asyncio.run(calls(2))
+    with pytest.raises(RateLimitError) as exc:
+        asyncio.run(calls(1))
+    assert 59 < retry_after_seconds(exc.value) <= 60
+    assert llm.throttled == 1
+
+    # max_tokens counts against TPM, as Azure estimates it before answering
+    llm = FakeLLM(tpm=1000)
+    asyncio.run(calls(1, max_tokens=600))
+    with pytest.raises(RateLimitError):
+        asyncio.run(calls(1, max_tokens=600))
+    asyncio.run(calls(1, max_tokens=100))
+
+
+def test_streaming_is_paced_by_tokens_per_second():
+    llm = FakeLLM(tokens_per_second=400, completion_tokens=20)
+
+    async def scenario():
+        started = time.monotonic()
+        chunks = [chunk async for chunk in await llm.complete("east", MESSAGES, stream=True)]
+        return chunks, time.monotonic() - started
+
+    chunks, elapsed = asyncio.run(scenario())
+    text = "".join(c["choices"][0]["delta"].get("content", "") for c in chunks)
+    assert len(text.split()) == 20 and chunks[-1]["choices"][0]["finish_reason"] == "stop"
+    assert elapsed >= 0.04 and llm.ok == 1 and llm.in_flight == 0
+
+
+def test_batched_prompts_get_one_result_per_request():
+    messages = build_batch_messages([MESSAGES, MESSAGES, MESSAGES])
+    result = asyncio.run(FakeLLM().complete("east", messages, response_format={"type": "json_object"}))
+    answers = parse_batch_response(result["choices"][0]["message"]["content"], 3)
+    assert all(answers)
+
+
+def test_http_server_has_the_azure_routes():
+    llm = FakeLLM(rpm=1, completion_tokens=5)
+    client = TestClient(create_app(llm))
+    url = "/openai/deployments/east/chat/completions?api-version=2024-02-15-preview"
+
+    body = client.post(url, json={"messages": MESSAGES, "max_tokens": 50}).json()
+    assert body["usage"]["completion_tokens"] == 5 and body["model"] == "east"
+    throttled = client.post(url, json={"messages": MESSAGES})
+    assert throttled.status_code == 429 and "retry-after-ms" in throttled.headers
+
+    stream = client.post("/v1/chat/completions", json={"model": "west", "messages": MESSAGES, "stream": True})
+    events = [line[6:] for line in stream.text.splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]" and json.loads(events[0])["object"] == "chat.completion.chunk"
+    assert client.get("/stats").json()["ok"] == 2
+
+
+def test_latency_specs_and_from_env(monkeypatch):
+    rng = random.Random(0)
+    assert parse_latency("0.25")(rng) == 0.25
+    assert 0.2 <= parse_latency("uniform:0.2,0.3")(rng) <= 0.3
+    assert parse_latency("lognormal:0.8,0.5")(rng) > 0
+    assert parse_latency("exponential:0.5")(rng) > 0
+    with pytest.raises(ValueError):
+        parse_latency("pareto:1")
+
+    monkeypatch.setenv("FAKE_LLM_LATENCY", "0.1")
+    monkeypatch.setenv("FAKE_LLM_TPM", "30000")
+    monkeypatch.setenv("FAKE_LLM_SEED", "3")
+    llm = FakeLLM.from_env()
+    assert llm.latency(llm.rng) == 0.1 and llm.tpm == 30000 and llm.rpm == 0
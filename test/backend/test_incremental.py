@@ -0,0 +1,100 @@
+import copy
+from unittest.mock import patch
+
+from starlette.testclient import TestClient
+
+import app_main_under_test as appmod
+from api.incremental import UserResults, prompt_fingerprint, questions_to_rescore, r_answers, rule_index
+
+RULES = {
+    "question_00": ["R2 - A or B", "R3 - C", ""],
+    "question_01": ["R3 - A"],
+    "question_02": [],
+}
+
+
+def payload():
+    return {
+        "userId": "u-incremental",
+        "assessmentData": {
+            "serviceOffering": {
+                "industry": {"text": "EdTech"},
+                "business-challenge": {"text": "Lead Gen"},
+                "r2": {"question_name": "R2", "anwserselete": "A"},
+                "r3": {"question_name": "R3", "anwserselete": "B"},
+            },
+            "sectionA": {
+                f"q{i}": {"question": f"Q{i}", "category": "Marketing", "catmapping": "Profitable", "anwser": "Agree", "score": 1}
+                for i in range(3)
+            },
+        },
+    }
+
+
+def test_rule_index_and_r_answers():
+    assert rule_index(RULES) == {"R2": {"question_00"}, "R3": {"question_00", "question_01"}}
+    offering = payload()["assessmentData"]["serviceOffering"]
+    assert r_answers(offering) == {"R2": "a", "R3": "b"}
+
+
+def test_questions_to_rescore_uses_reverse_index():
+    questions = [{"question_id": f"question_0{i}", "score": 1} for i in range(3)]
+    assert questions_to_rescore(None, {}, questions, {}) == {"question_00", "question_01", "question_02"}
+
+    previous = UserResults(r_answers={"R2": "a", "R3": "b"})
+    for q in questions:
+        previous.questions[q["question_id"]] = appmod.QuestionResult(1, 1.25, "Keep_Doing", "h")
+    index = rule_index(RULES)
+    assert questions_to_rescore(previous, {"R2": "a", "R3": "b"}, questions, index) == set()
+    assert questions_to_rescore(previous, {"R2": "b", "R3": "b"}, questions, index) == {"question_00"}
+    questions[2]["score"] = -2
+    assert questions_to_rescore(previous, {"R2": "a"}, questions, index) == {"question_00", "question_01", "question_02"}
+
+
+def test_prompt_fingerprint_tracks_prompt_inputs():
+    q = {"question_id": "question_00", "question": "Q", "anwser": "Agree", "new_category": "Do_More"}
+    profile = {"industry": "Retail"}
+    assert prompt_fingerprint(q, profile) == prompt_fingerprint(dict(q, score=2), profile)
+    assert prompt_fingerprint(q, profile) != prompt_fingerprint(dict(q, additionalText="note"), profile)
+    assert prompt_fingerprint(q, profile) != prompt_fingerprint(dict(q, new_category="Keep_Doing"), profile)
+    assert prompt_fingerprint(q, profile) != prompt_fingerprint(q, {"industry": "Legal"})
+
+
+def test_editing_one_answer_regenerates_only_that_question():
+    generated = []
+
+    async def fake_generate(q, profile):
+        generated.append(q["question_id"])
+        return appmod.advice_result(q, f"advice {q['question_id']} {q['anwser']}")
+
+    with patch.object(appmod, "generate_advice_for_question", side_effect=fake_generate), \
+         patch.object(appmod, "load_score_rules", return_value=RULES):
+        client = TestClient(appmod.app)
+        first = payload()
+        client.post("/api/llm-advice", json=first)
+        assert sorted(generated) == ["question_00", "question_01", "question_02"]
+
+        generated.clear()
+        edited = copy.deepcopy(first)
+        edited["assessmentData"]["sectionA"]["q2"]["anwser"] = "Strongly Agree"
+        text = client.post("/api/llm-advice", json=edited).json()["advice"]
+        assert generated == ["question_02"]
+        assert "advice question_00 Agree" in text and "advice question_02 Strongly Agree" in text
+
+        # Changing R3 rescores questions 00 and 01; only question_01's category (and prompt) changes
+        generated.clear()
+        edited["assessmentData"]["serviceOffering"]["r3"]["anwserselete"] = "A"
+        client.post("/api/llm-advice", json=edited)
+        assert sorted(generated) == ["question_01"]
+
+        stats = client.get("/api/llm-stats").json()["incremental"]
+    assert stats["regenerated"] == 5 and stats["reused"] == 4
+    assert stats["rescore_skipped"] == 3 + 1  # the answer edit keeps every score; the R3 edit spares question_02
+
+
+def test_failed_advice_is_regenerated_next_time():
+    with patch.object(appmod, "load_score_rules", return_value=RULES):
+        client = TestClient(appmod.app)
+        client.post("/api/llm-advice", json=payload())
+        client.post("/api/llm-advice", json=payload())
+    assert appmod.user_results.stats()["reused"] == 0
@@ -0,0 +1,124 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from starlette.testclient import TestClient
+
+import app_main_under_test as appmod
+from api.llm_router import Deployment, LLMRouter, deployments_from_env, retry_after_seconds
+
+
+class Throttled(Exception):
+    def __init__(self, headers):
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        self.response = SimpleNamespace(headers=headers)
+
+
+def test_pick_prefers_fewer_in_flight_and_lower_latency():
+    a, b = Deployment("a"), Deployment("b")
+    a.ewma_latency = b.ewma_latency = 1.0
+    a.routed = 2
+    router = LLMRouter([a, b])
+    assert router.pick().name == "b"
+
+    b.ewma_latency = 4.0  # (0+1)*4 > (2+1)*1
+    assert router.pick().name == "a"
+
+
+def test_retry_after_parsing():
+    assert retry_after_seconds(ValueError("x")) is None
+    assert retry_after_seconds(Throttled({"retry-after": "3"})) == 3.0
+    assert retry_after_seconds(Throttled({"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(Throttled({})) > 0
+
+
+def test_throttled_deployment_is_cooled_down_and_call_fails_over():
+    a, b = Deployment("a"), Deployment("b")
+    a.ewma_latency, b.ewma_latency = 0.1, 1.0
+    router = LLMRouter([a, b])
+    calls = []
+
+    async def call(deployment):
+        calls.append(deployment.name)
+        with deployment.upstream():
+            if deployment.name == "a":
+                raise Throttled({"retry-after": "30"})
+            return "ok"
+
+    assert asyncio.run(router.run(call)) == "ok"
+    assert calls == ["a", "b"]
+    assert not a.is_available(time.monotonic())
+    # While "a" cools down, new calls go straight to "b"
+    assert router.pick().name == "b"
+
+    stats = {s["name"]: s for s in router.stats()}
+    assert stats["a"]["throttled"] == 1 and stats["a"]["available"] is False
+    assert stats["b"]["successes"] == 1 and stats["b"]["in_flight"] == stats["b"]["routed"] == 0
+
+
+def test_latency_is_the_upstream_request_only():
+    deployment = Deployment("a")
+    router = LLMRouter([deployment])
+
+    async def call(d):
+        await asyncio.sleep(0.2)  # queued locally, e.g. for a scheduler slot
+        assert (d.routed, d.in_flight) == (1, 0)
+        with d.upstream():
+            assert d.in_flight == 1
+            await asyncio.sleep(0.01)
+        return "ok"
+
+    assert asyncio.run(router.run(call)) == "ok"
+    assert deployment.ewma_latency is not None and deployment.ewma_latency < 0.1
+    assert deployment.successes == 1 and deployment.routed == deployment.in_flight == 0
+
+
+def test_all_deployments_throttled_raises():
+    router = LLMRouter([Deployment("a"), Deployment("b")])
+
+    async def call(deployment):
+        raise Throttled({"retry-after": "1"})
+
+    with pytest.raises(Throttled):
+        asyncio.run(router.run(call))
+
+
+def test_deployments_from_env(monkeypatch):
+    monkeypatch.delenv("AZURE_OPENAI_DEPLOYMENTS", raising=False)
+    monkeypatch.setenv("AZURE_OPENAI_DEPLOYMENT", "single")
+    assert [d.name for d in deployments_from_env()] == ["single"]
+
+    monkeypatch.setenv("AZURE_OPENAI_DEPLOYMENTS", "east, west")
+    assert [d.name for d in deployments_from_env()] == ["east", "west"]
+
+    monkeypatch.setenv(
+        "AZURE_OPENAI_DEPLOYMENTS",
+        '[{"name": "eu", "model": "gpt-4o", "endpoint": "https://eu.example", "api_key": "k"}]',
+    )
+    (eu,) = deployments_from_env()
+    assert (eu.model, eu.endpoint, eu.api_key) == ("gpt-4o", "https://eu.example", "k")
+
+
+def test_advice_generation_routes_through_router_and_reports_stats():
+    seen = []
+
+    class _Completions:
+        async def create(self, **kwargs):
+            seen.append(kwargs["model"])
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Routed advice"))])
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions()))
+    router = LLMRouter([Deployment("east", model="gpt-east"), Deployment("west", model="gpt-west")])
+    q = {"question_id": "question_00", "new_category": "Do_More", "question": "Q?", "catmapping": "Profitable"}
+    profile = {"industry": "Tech", "business_challenge": "Growth", "service_type": "N/A", "revenue_type": "N/A"}
+
+    with patch.object(appmod, "_router", router), patch.object(appmod, "get_openai_client", return_value=fake_client):
+        result = asyncio.run(appmod.generate_advice_for_question(q, profile))
+        stats = TestClient(appmod.app).get("/api/llm-stats").json()
+
+    assert result["advice"] == "Routed advice"
+    assert seen and seen[0] in ("gpt-east", "gpt-west")
+    assert sum(d["successes"] for d in stats["deployments"]) == 1
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from starlette.testclient import TestClient
+
+import app_main_under_test as appmod
+from api.loop_monitor import LoopLagMonitor, percentile
+
+
+def blocking_call(seconds):
+    time.sleep(seconds)
+
+
+def test_blocking_callback_is_caught_with_its_stack():
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+
+    async def run():
+        monitor.ensure_running()
+        monitor.ensure_running()  # already attached: no second heartbeat
+        await asyncio.sleep(0.05)
+        blocking_call(0.25)
+        await asyncio.sleep(0.05)
+
+    try:
+        asyncio.run(run())
+    finally:
+        monitor.stop()
+
+    assert monitor.blocks_total == 1
+    block = monitor.blocks[0]
+    assert any("blocking_call" in line for line in block.stack)
+    assert block.duration is not None and block.duration >= 0.15
+    assert monitor.percentiles()["max"] >= 0.15
+    assert monitor.stats()["recent_blocks"][0]["duration_ms"] >= 150
+
+
+def test_disabled_monitor_does_nothing():
+    monitor = LoopLagMonitor(threshold=0)
+
+    async def run():
+        monitor.ensure_running()
+
+    asyncio.run(run())
+    assert monitor.check() is None and monitor.stats()["lag_ms"]["max"] == 0.0
+    assert percentile([], 0.5) == 0.0
+
+
+@pytest.mark.allow_loop_blocks
+def test_blocking_request_is_reported_in_metrics(monkeypatch):
+    monkeypatch.setattr(appmod.loop_monitor, "threshold", 0.05)
+    before = appmod.loop_monitor.blocks_total
+    original = appmod.assemble_advice_text
+
+    def slow_assembly(results):
+        blocking_call(0.3)
+        return original(results)
+
+    payload = {
+        "userId": "u-loop",
+        "assessmentData": {
+            "serviceOffering": {"industry": {"text": "Retail"}},
+            "sectionA": {"q1": {"question": "Q1", "score": 0.5, "category": "Marketing", "catmapping": "Profitable"}},
+        },
+    }
+    # Entering the client runs the app's startup, which attaches the monitor
+    with TestClient(appmod.app) as client:
+        with patch.object(appmod, "assemble_advice_text", slow_assembly):
+            assert client.post("/api/llm-advice", json=payload).status_code == 200
+
+        assert appmod.loop_monitor.blocks_total == before + 1
+        assert any("slow_assembly" in line for line in appmod.loop_monitor.blocks[-1].stack)
+        text = client.get("/metrics").text
+        assert 'event_loop_lag_seconds{quantile="0.99"}' in text
+        assert f"event_loop_blocks_total {float(before + 1)}" in text
+        assert client.get("/api/llm-stats").json()["event_loop"]["blocks_total"] == before + 1
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from fastapi import Depends, FastAPI
+from starlette.testclient import TestClient
+
+import app_main_under_test as appmod
+from api.llm_router import Deployment, LLMRouter
+from api.metrics import LLM_CALLS, LLM_TOKENS, STAGE_SECONDS, Counter, Gauge, Histogram, Registry
+from api.route_timing import TimedRoute, handler_started
+from api.routing_policy import RouteDecision
+
+
+def test_text_exposition_format():
+    registry = Registry()
+    requests = Counter("demo_requests_total", "Requests", ["path"], registry=registry)
+    in_flight = Gauge("demo_in_flight", "In flight", registry=registry)
+    latency = Histogram("demo_seconds", "Latency", ["stage"], buckets=(0.1, 1.0), registry=registry)
+    requests.inc(path='/a"b')
+    requests.inc(2, path='/a"b')
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    latency.observe(0.05, stage="x")
+    latency.observe(0.5, stage="x")
+    latency.observe(5, stage="x")
+    registry.add_collector(lambda: [("demo_cache_total", "counter", "Cache", [({"result": "hit"}, 4)])])
+
+    text = registry.render()
+    assert '# TYPE demo_requests_total counter\ndemo_requests_total{path="/a\\"b"} 3.0' in text
+    assert "demo_in_flight 1.0" in text
+    assert 'demo_seconds_bucket{stage="x",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="x",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{stage="x",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{stage="x"} 3' in text
+    assert 'demo_cache_total{result="hit"} 4.0' in text
+    assert latency.count(stage="x") == 3 and requests.value(path='/a"b') == 3
+
+
+def test_timed_route_covers_work_done_before_the_endpoint():
+    app = FastAPI()
+    app.router.route_class = TimedRoute
+
+    def slow_validation():
+        time.sleep(0.05)  # stands in for parsing and validating a large body
+
+    @app.post("/x", dependencies=[Depends(slow_validation)])
+    async def endpoint():
+        return {"waited": time.perf_counter() - handler_started()}
+
+    assert TestClient(app).post("/x").json()["waited"] >= 0.05
+    assert handler_started() is None
+
+
+def test_metric_misuse_is_rejected():
+    registry = Registry()
+    counter = Counter("misuse_total", "x", ["a"], registry=registry)
+    with pytest.raises(ValueError):
+        counter.inc(-1, a="1")
+    with pytest.raises(ValueError):
+        counter.inc(b="1")
+    with pytest.raises(ValueError):
+        Counter("misuse_total", "again", registry=registry)
+
+
+def test_metrics_endpoint_reports_stages_and_errors():
+    payload = {
+        "userId": "u-metrics",
+        "assessmentData": {
+            "serviceOffering": {"industry": {"text": "Retail"}},
+            "sectionA": {"q1": {"question": "Q1", "score": 0.5, "category": "Marketing", "catmapping": "Profitable"}},
+        },
+    }
+    scoring_before = STAGE_SECONDS.count(stage="scoring")
+    client = TestClient(appmod.app)
+    assert client.post("/api/llm-advice", json=payload).status_code == 200
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert STAGE_SECONDS.count(stage="scoring") == scoring_before + 1
+    for stage in ("validation", "preparation", "scoring", "retrieval", "admission", "generation", "assembly"):
+        assert f'llm_advice_stage_seconds_count{{stage="{stage}"}}' in response.text
+    assert 'llm_advice_request_seconds_count{outcome="ok"}' in response.text
+    assert "llm_advice_errors_total" in response.text  # no LLM configured in tests
+    assert 'llm_admission_shed_total{reason="slo"}' in response.text
+    assert 'llm_scheduler_waiting{class="interactive"} 0.0' in response.text
+    assert 'semantic_cache_lookups_total{result="hit"}' in response.text
+
+
+def test_llm_calls_and_tokens_are_counted_per_deployment():
+    class _Completions:
+        async def create(self, **kwargs):
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+                usage=SimpleNamespace(prompt_tokens=30, completion_tokens=7),
+            )
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions()))
+    before = (LLM_CALLS.value(deployment="metrics-east", outcome="ok"), LLM_TOKENS.value(deployment="metrics-east", kind="completion"))
+    with patch.object(appmod, "_router", LLMRouter([Deployment("metrics-east")])), \
+         patch.object(appmod, "get_openai_client", return_value=fake_client):
+        asyncio.run(appmod.complete_chat([{"role": "user", "content": "hi"}], RouteDecision("default", 64, 0.4)))
+    assert LLM_CALLS.value(deployment="metrics-east", outcome="ok") == before[0] + 1
+    assert LLM_TOKENS.value(deployment="metrics-east", kind="completion") == before[1] + 7
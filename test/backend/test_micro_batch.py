@@ -0,0 +1,162 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import app_main_under_test as appmod
+from api.llm_router import Deployment, LLMRouter
+from api.micro_batch import BatchItemMissing, MicroBatcher, build_batch_messages, parse_batch_response
+from api.scheduler import INTERACTIVE, JOB, priority, priority_class
+
+PROFILE = {"industry": "Tech", "business_challenge": "Growth", "service_type": "N/A", "revenue_type": "N/A"}
+
+
+def test_items_within_window_share_one_batch():
+    sent = []
+
+    async def send_batch(key, payloads):
+        sent.append((key, list(payloads)))
+        return [p.upper() for p in payloads]
+
+    async def scenario():
+        batcher = MicroBatcher(send_batch, window_seconds=0.01, max_items=10)
+        return await asyncio.gather(*[batcher.submit("k", p) for p in ("a", "b", "c")]), batcher
+
+    results, batcher = asyncio.run(scenario())
+    assert results == ["A", "B", "C"]
+    assert sent == [("k", ["a", "b", "c"])]
+    assert batcher.stats()["avg_batch_size"] == 3.0
+
+
+def test_max_items_flushes_early_and_keys_are_separate():
+    sent = []
+
+    async def send_batch(key, payloads):
+        sent.append((key, len(payloads)))
+        return payloads
+
+    async def scenario():
+        batcher = MicroBatcher(send_batch, window_seconds=10, max_items=2)
+        # Key "x" fills up and flushes immediately; "y" would wait, so only await "x"
+        return await asyncio.gather(batcher.submit("x", 1), batcher.submit("x", 2))
+
+    assert asyncio.run(scenario()) == [1, 2]
+    assert sent == [("x", 2)]
+
+
+def test_batch_runs_in_the_first_items_context():
+    seen = []
+
+    async def send_batch(key, payloads):
+        seen.append(priority_class.get())
+        return payloads
+
+    async def submit(batcher, cls, payload):
+        with priority(cls):
+            return await batcher.submit("k", payload)
+
+    async def scenario():
+        batcher = MicroBatcher(send_batch, window_seconds=10, max_items=2)
+        # The second submit flushes the batch, but it still runs as the first item's class
+        return await asyncio.gather(submit(batcher, JOB, 1), submit(batcher, INTERACTIVE, 2))
+
+    assert asyncio.run(scenario()) == [1, 2]
+    assert seen == [JOB]
+
+
+def test_missing_items_and_batch_errors_propagate():
+    async def partial(key, payloads):
+        return ["ok", None]
+
+    async def broken(key, payloads):
+        raise RuntimeError("upstream down")
+
+    async def scenario(send_batch):
+        batcher = MicroBatcher(send_batch, window_seconds=0.001)
+        return await asyncio.gather(batcher.submit("k", 1), batcher.submit("k", 2), return_exceptions=True)
+
+    first, second = asyncio.run(scenario(partial))
+    assert first == "ok" and isinstance(second, BatchItemMissing)
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(scenario(broken)))
+
+
+def test_batch_messages_dedupe_contexts_and_parse_back():
+    requests = [
+        [{"role": "system", "content": "S1"}, {"role": "user", "content": "U0"}],
+        [{"role": "system", "content": "S1"}, {"role": "user", "content": "U1"}],
+        [{"role": "system", "content": "S2"}, {"role": "user", "content": "U2"}],
+    ]
+    messages = build_batch_messages(requests)
+    body = json.loads(messages[1]["content"])
+    assert body["contexts"] == {"c0": "S1", "c1": "S2"}
+    assert [r["context"] for r in body["requests"]] == ["c0", "c0", "c1"]
+
+    content = json.dumps({"results": [{"id": "2", "content": "two"}, {"id": "0", "content": "zero"}, {"id": "9", "content": "x"}]})
+    assert parse_batch_response(content, 3) == ["zero", None, "two"]
+    assert parse_batch_response("not json", 2) == [None, None]
+
+
+@pytest.fixture
+def batching_app(monkeypatch):
+    monkeypatch.setenv("LLM_MICRO_BATCH_WINDOW_MS", "20")
+    calls = []
+
+    class _Completions:
+        async def create(self, **kwargs):
+            calls.append(kwargs)
+            if "response_format" in kwargs:
+                body = json.loads(kwargs["messages"][1]["content"])
+                # Answer all but the last request to exercise the single-call fallback
+                results = [{"id": r["id"], "content": f"batched {r['id']}"} for r in body["requests"][:-1]]
+                content = json.dumps({"results": results})
+            else:
+                content = "single"
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions()))
+    with patch.object(appmod, "_micro_batcher", None), \
+         patch.object(appmod, "_router", LLMRouter([Deployment("east")])), \
+         patch.object(appmod, "get_openai_client", return_value=fake_client):
+        yield calls
+
+
+def test_concurrent_questions_are_sent_as_one_batch(batching_app):
+    questions = [
+        {"question_id": f"question_{i:02d}", "new_category": "Do_More", "catmapping": "Profitable"} for i in range(3)
+    ]
+
+    async def scenario():
+        return await asyncio.gather(*[appmod.generate_advice_for_question(q, PROFILE) for q in questions])
+
+    results = asyncio.run(scenario())
+    assert [r["advice"] for r in results] == ["batched 0", "batched 1", "single"]
+    assert len(batching_app) == 2  # one batch + one fallback for the unanswered item
+    assert appmod.get_micro_batcher().stats()["missing"] == 1
+
+
+def test_priority_classes_are_not_batched_together(batching_app):
+    questions = [
+        {"question_id": f"question_{i:02d}", "new_category": "Do_More", "catmapping": "Profitable"} for i in range(2)
+    ]
+
+    async def generate(q, cls):
+        with priority(cls):
+            return await appmod.generate_advice_for_question(q, PROFILE)
+
+    async def scenario():
+        return await asyncio.gather(generate(questions[0], JOB), generate(questions[1], INTERACTIVE))
+
+    results = asyncio.run(scenario())
+    # Each class is a batch of one, sent as a plain completion
+    assert [r["advice"] for r in results] == ["single", "single"]
+    assert len(batching_app) == 2 and not any("response_format" in call for call in batching_app)
+
+
+def test_single_item_batch_keeps_the_trimmed_flag(batching_app):
+    messages = [{"role": "system", "content": "S"}, {"role": "user", "content": "U"}]
+    route = appmod.get_routing_policy().decide("Profitable", "Do_More")
+    with patch.object(appmod, "token_ledger", appmod.TokenLedger()) as ledger:
+        assert asyncio.run(appmod.send_advice_batch("k", [(messages, route, True)])) == ["single"]
+    assert ledger.stats()["trimmed_prompts"] == 1
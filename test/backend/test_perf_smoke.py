@@ -7,33 +7,15 @@ from typing import List
 import pytest
 from fastapi.testclient import TestClient
 
+from api.assessment_generator import generate_request
+
 
 def _payload() -> dict:
-    """Minimal valid request aligned with /api/llm-advice schema."""
-    return {
-        "userId": "pytest",
-        "assessmentData": {
-            "serviceOffering": {
-                "industry": {"text": "EdTech"},
-                "business_challenge": {"text": "Lead Gen"},
-                "service_type": {"text": "Marketing"},
-                "revenue_type": {"text": "subscription"},
-                "R2": {"question_name": "R2", "anwserselete": "A"},
-                "R3": {"question_name": "R3", "anwserselete": "A"},
-                "R4": {"question_name": "R4", "anwserselete": "B"},
-                "R12": {"question_name": "R12", "anwserselete": "C"},
-            },
-            "section1": {
-                "q1": {
-                    "question": "Q1",
-                    "score": 0.5,
-                    "category": "Start_Doing",
-                    "catmapping": "Profitable",
-                    "anwser": "ans1",
-                }
-            },
-        },
-    }
+    """Frontend-shaped request: full serviceOffering, first question of the assessment.
+
+    One question keeps this a per-request latency smoke; locustfile.py sends all 34.
+    """
+    return generate_request(seed=0, questions=1, user_id="pytest")
 
 
 @pytest.fixture(scope="session")
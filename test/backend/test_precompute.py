@@ -0,0 +1,148 @@
+import asyncio
+import importlib.util
+import pathlib
+import sys
+import threading
+from unittest.mock import patch
+
+import pytest
+
+import app_main_under_test as appmod
+from api.advice_store import AdviceStore, TrafficRecorder, advice_key, prompt_profile, read_traffic
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parents[2] / "backend"
+PROFILE = {"industry": "EdTech", "business_challenge": "Lead Generation", "service_type": "Platform", "revenue_type": "N/A"}
+
+
+def _load_job():
+    spec = importlib.util.spec_from_file_location("precompute_advice", BACKEND_DIR / "precompute_advice.py")
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def question(idx=0, category="Do_More", answer="Agree", additional=""):
+    return {
+        "question_id": f"question_{idx:02d}",
+        "question": f"Question {idx} text",
+        "new_category": category,
+        "catmapping": "Profitable",
+        "anwser": answer,
+        "additionalText": additional,
+    }
+
+
+def test_key_covers_every_prompt_input():
+    key = advice_key(PROFILE, question())
+    assert key == advice_key(dict(PROFILE), question())
+    # A different spelling of the profile or question text is a different prompt
+    assert key != advice_key(dict(PROFILE, industry="edtech"), question())
+    assert key != advice_key(PROFILE, dict(question(), question="Other text"))
+    assert key != advice_key(PROFILE, question(answer="Disagree"))
+
+
+def test_recorded_combination_rebuilds_the_live_prompt(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    recorder = TrafficRecorder(str(path))
+    recorder.record(PROFILE, [question(3)])
+    recorder.close()
+    (record,) = read_traffic(str(path))
+
+    profile, q_data = _load_job().combination_inputs(record)
+    assert profile == prompt_profile(PROFILE)
+    assert appmod.build_advice_messages(q_data, profile, "tip") == appmod.build_advice_messages(question(3), PROFILE, "tip")
+    assert advice_key(profile, q_data) == advice_key(PROFILE, question(3))
+
+
+def test_store_roundtrip_and_stats(tmp_path):
+    store = AdviceStore(str(tmp_path / "advice.sqlite"))
+    assert store.get("k") is None
+    store.put("k", "advice", meta={"n": 1})
+    assert store.get("k") == "advice" and "k" in store and len(store) == 1
+    assert store.stats() == {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+    store.close()
+
+
+def test_traffic_recorder_skips_free_text_answers(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    recorder = TrafficRecorder(str(path))
+    recorder.record(PROFILE, [question(0), question(1, additional="we sell to schools")])
+    recorder.record(PROFILE, [question(1, additional="only free text")])
+    recorder.close()
+    records = list(read_traffic(str(path)))
+    assert len(records) == 1 and records[0]["question_id"] == "question_00"
+    assert "additionalText" not in records[0]
+
+
+def test_job_generates_top_combinations_with_bounded_concurrency_and_resumes(tmp_path):
+    job = _load_job()
+    profile = prompt_profile(PROFILE)
+    records = [dict(question(0), profile=profile)] * 3 + [dict(question(1), profile=profile)] * 2 + [dict(question(2), profile=profile)]
+    for r in records:
+        r.pop("additionalText", None)
+    combos = job.top_combinations(records, top=2)
+    assert [c["question_id"] for c, _ in combos] == ["question_00", "question_01"]
+
+    store = AdviceStore(str(tmp_path / "advice.sqlite"))
+    in_flight, peak = 0, 0
+
+    async def generate(q_data, prof):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        return None if q_data["question_id"] == "question_01" else f"advice for {q_data['question_id']}"
+
+    summary = asyncio.run(job.run_precompute(combos, store, generate, concurrency=1))
+    assert summary == {"generated": 1, "skipped": 0, "failed": 1}
+    assert peak == 1
+
+    summary = asyncio.run(job.run_precompute(combos, store, generate, concurrency=4))
+    assert summary == {"generated": 0, "skipped": 1, "failed": 1}
+
+
+def test_live_path_serves_precomputed_advice(tmp_path, monkeypatch):
+    db = tmp_path / "advice.sqlite"
+    store = AdviceStore(str(db))
+    store.put(advice_key(PROFILE, question()), "Precomputed advice")
+    monkeypatch.setenv("PRECOMPUTED_ADVICE_DB", str(db))
+
+    threads = []
+    real_get = AdviceStore.get
+
+    def get(self, key):
+        threads.append(threading.current_thread())
+        return real_get(self, key)
+
+    with patch.object(appmod, "_advice_store", None), patch.object(appmod, "get_llm_router") as router, \
+         patch.object(AdviceStore, "get", get):
+        hit = asyncio.run(appmod.generate_advice_for_question(question(), PROFILE))
+        assert hit["advice"] == "Precomputed advice"
+        router.assert_not_called()
+        assert threads and threading.main_thread() not in threads  # the lookup left the event loop
+        miss = asyncio.run(appmod.generate_advice_for_question(question(additional="free text"), PROFILE))
+        assert miss["advice"] != "Precomputed advice"
+
+
+@pytest.fixture
+def app_as_main():
+    with patch.dict(sys.modules, {"main": appmod}):
+        yield
+
+
+def test_job_cli_end_to_end(tmp_path, app_as_main):
+    job = _load_job()
+    traffic = tmp_path / "traffic.jsonl"
+    recorder = TrafficRecorder(str(traffic))
+    recorder.record(PROFILE, [question(0), question(1)])
+    recorder.close()
+
+    async def fake_generate(q_data, profile):
+        return appmod.advice_result(q_data, f"LLM advice {q_data['question_id']}")
+
+    store_path = tmp_path / "out.sqlite"
+    with patch.object(appmod, "generate_advice_for_question", side_effect=fake_generate):
+        summary = job.main(["--traffic", str(traffic), "--store", str(store_path), "--top", "10"])
+    assert summary["generated"] == 2
+    assert len(AdviceStore(str(store_path))) == 2
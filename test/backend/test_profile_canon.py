@@ -0,0 +1,87 @@
+import json
+from unittest.mock import patch
+
+from starlette.testclient import TestClient
+
+import app_main_under_test as appmod
+from api.profile_canon import ProfileCanonicalizer, normalise
+
+
+def test_normalise():
+    assert normalise("  Ed-Tech  ") == "ed-tech"
+    assert normalise("Marketing & Advertising") == "marketing & advertising"
+
+
+def test_spelling_variants_share_one_bucket():
+    canon = ProfileCanonicalizer()
+    variants = ["EdTech", "edtech ", "Education  technology", "Ed-Tech"]
+    assert {canon.canonicalize("industry", v) for v in variants} == {"Education Technology"}
+    assert canon.counts["industry"] == {"exact": 1, "synonym": 3, "unmatched": 0}
+
+
+def test_broader_terms_are_not_merged():
+    canon = ProfileCanonicalizer()
+    assert canon.canonicalize("industry", "tech") == "tech"
+    assert canon.canonicalize("industry", "Technology") == "Technology"
+    assert canon.canonicalize("business_challenge", "growth") == "growth"
+    assert canon.canonicalize("industry", "education technolgy") == "education technolgy"  # no fuzzy matching
+    assert canon.counts["industry"]["unmatched"] == 3
+
+
+def test_unmatched_values_are_cleaned_and_counted():
+    canon = ProfileCanonicalizer()
+    assert canon.canonicalize("industry", "  Artisanal   cheese ") == "Artisanal cheese"
+    assert canon.canonicalize("industry", "N/A") == "N/A"
+    stats = canon.stats()
+    assert stats["fields"]["industry"]["unmatched"] == 1
+    assert stats["hit_rate"] == 0.0
+
+
+def test_option_fields_keep_additional_text():
+    canon = ProfileCanonicalizer()
+    assert canon.canonicalize("service_type", "platform: We build LMS tools") == "Platform: We build LMS tools"
+    assert canon.canonicalize("revenue_type", "MRR") == "Monthly recurring revenue"
+    profile = canon.canonicalize_profile(
+        {"industry": "fintech", "business_challenge": "lead gen", "service_type": "Product", "revenue_type": "N/A"}
+    )
+    assert profile == {
+        "industry": "Financial Technology",
+        "business_challenge": "Lead generation",
+        "service_type": "Product",
+        "revenue_type": "N/A",
+    }
+    assert canon.stats()["hit_rate"] == 1.0
+
+
+def test_extra_synonyms_from_file(tmp_path, monkeypatch):
+    path = tmp_path / "synonyms.json"
+    path.write_text(json.dumps({"industry": {"b2b widgets": "Manufacturing"}}))
+    monkeypatch.setenv("PROFILE_SYNONYMS_PATH", str(path))
+    canon = ProfileCanonicalizer.from_env()
+    assert canon.canonicalize("industry", "B2B Widgets") == "Manufacturing"
+    assert canon.canonicalize("industry", "edtech") == "Education Technology"
+
+
+def test_llm_advice_uses_canonical_profile_and_reports_hit_rate():
+    seen = []
+
+    async def fake_generate(q, profile):
+        seen.append(profile)
+        return appmod.advice_result(q, "ok")
+
+    payload = {
+        "userId": "u1",
+        "assessmentData": {
+            "serviceOffering": {"industry": {"text": "edtech "}, "business-challenge": {"text": "Lead Gen"}},
+            "sectionA": {"q1": {"question": "Q", "category": "Marketing", "catmapping": "Profitable", "score": 1.0}},
+        },
+    }
+    with patch.object(appmod, "profile_canonicalizer", ProfileCanonicalizer()), \
+         patch.object(appmod, "generate_advice_for_question", side_effect=fake_generate):
+        client = TestClient(appmod.app)
+        assert client.post("/api/llm-advice", json=payload).status_code == 200
+        stats = client.get("/api/llm-stats").json()["profile_canonicalisation"]
+
+    assert seen[0]["industry"] == "Education Technology"
+    assert seen[0]["business_challenge"] == "Lead generation"
+    assert stats["fields"]["industry"]["synonym"] == 1
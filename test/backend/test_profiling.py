@@ -0,0 +1,63 @@
+import json
+import pstats
+import time
+
+from starlette.testclient import TestClient
+
+import app_main_under_test as appmod
+from api.profiling import ProfilingMiddleware, RequestProfiler, record_stage, sign
+
+PAYLOAD = {
+    "userId": "u-profile",
+    "assessmentData": {
+        "serviceOffering": {"industry": {"text": "Retail"}},
+        "sectionA": {"q1": {"question": "Q1", "score": 0.5, "category": "Marketing", "catmapping": "Profitable"}},
+    },
+}
+
+
+def _client(tmp_path):
+    profiler = RequestProfiler("s3cret", directory=str(tmp_path / "profiles"))
+    return TestClient(ProfilingMiddleware(appmod.app, profiler)), profiler
+
+
+def test_signed_request_writes_profile_and_stage_breakdown(tmp_path):
+    client, profiler = _client(tmp_path)
+    response = client.post("/api/llm-advice", json=PAYLOAD, headers={"X-Debug-Profile": sign("s3cret", "/api/llm-advice")})
+
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    profiler.flush()
+    summary = json.loads((tmp_path / "profiles" / f"{profile_id}.json").read_text())
+    assert summary["status"] == 200 and summary["wall_seconds"] > 0
+    assert [s["stage"] for s in summary["stages"]] == ["validation", "preparation", "scoring", "admission", "generation", "assembly"]
+    assert summary["top_functions"]
+    profiled = pstats.Stats(str(tmp_path / "profiles" / f"{profile_id}.prof")).stats
+    assert any(function == "generate_advice_for_question" for _, _, function in profiled)
+    assert profiler.profiled == 1 and not profiler.active
+
+
+def test_requests_without_a_valid_header_are_not_profiled(tmp_path):
+    client, profiler = _client(tmp_path)
+    stale = sign("s3cret", "/api/llm-advice", int(time.time()) - 3600)
+    for headers in ({}, {"X-Debug-Profile": sign("wrong", "/api/llm-advice")}, {"X-Debug-Profile": stale},
+                    {"X-Debug-Profile": "garbage"}):
+        response = client.post("/api/llm-advice", json=PAYLOAD, headers=headers)
+        assert response.status_code == 200 and "x-profile-id" not in response.headers
+    assert profiler.rejected == 3 and profiler.profiled == 0
+    assert not (tmp_path / "profiles").exists()
+
+
+def test_only_one_request_is_profiled_at_a_time(tmp_path):
+    client, profiler = _client(tmp_path)
+    profiler.active = True
+    response = client.post("/api/llm-advice", json=PAYLOAD, headers={"X-Debug-Profile": sign("s3cret", "/api/llm-advice")})
+    assert "x-profile-id" not in response.headers and profiler.rejected == 1
+
+
+def test_disabled_without_secret_and_outside_profiled_requests(monkeypatch):
+    monkeypatch.delenv("PROFILE_SECRET", raising=False)
+    assert RequestProfiler.from_env() is None
+    monkeypatch.setenv("PROFILE_SECRET", "x")
+    assert RequestProfiler.from_env().secret == "x"
+    record_stage("scoring", 0.1)  # no request being profiled: nothing to record into
@@ -0,0 +1,221 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import app_main_under_test as appmod
+from api.llm_router import Deployment, LLMRouter
+from api.quota import (
+    REQUESTS,
+    TOKENS,
+    ClusterQuota,
+    QuotaBackend,
+    RedisError,
+    RedisQuotaBackend,
+    SQLiteQuotaBackend,
+    encode_command,
+    quota_backend_from_spec,
+    read_reply,
+)
+from api.routing_policy import RouteDecision
+
+
+class RedisStandIn:
+    """Just enough of the Redis protocol for the quota backend: SET NX EX, INCRBY, DECRBY, SELECT."""
+
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+        self.stall = False  # hold replies back, as a slow server would
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                command = await read_reply(reader)
+                self.commands.append(command[0].upper())
+                while self.stall:
+                    await asyncio.sleep(0.01)
+                writer.write(self.reply(command))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+
+    def reply(self, command):
+        name, args = command[0].upper(), command[1:]
+        if name == "SELECT":
+            return b"+OK\r\n"
+        if name == "SET":
+            if "NX" in args and args[0] in self.data:
+                return b"$-1\r\n"
+            self.data[args[0]] = int(args[1])
+            return b"+OK\r\n"
+        if name in ("INCRBY", "DECRBY"):
+            delta = int(args[1]) * (1 if name == "INCRBY" else -1)
+            self.data[args[0]] = self.data.get(args[0], 0) + delta
+            return b":%d\r\n" % self.data[args[0]]
+        return b"-ERR unknown command\r\n"
+
+
+def stay_inside_one_window(window):
+    if window - time.time() % window < 1:
+        time.sleep(1.1)
+
+
+def test_sqlite_backend_grants_up_to_limit_across_connections(tmp_path):
+    path = str(tmp_path / "quota.sqlite")
+    a, b = SQLiteQuotaBackend(path), SQLiteQuotaBackend(path)
+    assert asyncio.run(a.lease("k", 6, limit=10, ttl=10)) == 6
+    assert asyncio.run(b.lease("k", 6, limit=10, ttl=10)) == 4
+    assert asyncio.run(a.lease("k", 1, limit=10, ttl=10)) == 0
+    assert asyncio.run(a.lease("expired", 5, limit=5, ttl=-1)) == 5
+    assert asyncio.run(b.lease("expired", 5, limit=5, ttl=10)) == 5  # the expired row was dropped
+    a.close()
+    b.close()
+
+
+def test_redis_backend_against_protocol_stand_in():
+    async def scenario():
+        stand_in = RedisStandIn()
+        server = await asyncio.start_server(stand_in.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        worker_a = RedisQuotaBackend.from_url(f"redis://127.0.0.1:{port}/2")
+        worker_b = RedisQuotaBackend("127.0.0.1", port)
+        grants = [
+            await worker_a.lease("k", 6, limit=10, ttl=10),
+            await worker_b.lease("k", 6, limit=10, ttl=10),
+            await worker_a.lease("k", 3, limit=10, ttl=10),
+        ]
+        with pytest.raises(RedisError):
+            await worker_a.execute(("BOGUS",), ("INCRBY", "k", 0))
+        # The failed pipeline left a reply unread: the next call must not see it
+        assert await worker_a.execute(("INCRBY", "other", 1)) == [1]
+
+        # A cancellation mid-pipeline drops the connection too
+        stand_in.stall = True
+        pending = asyncio.create_task(worker_b.execute(("INCRBY", "k", 0)))
+        await asyncio.sleep(0.05)
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+        stand_in.stall = False
+        assert await worker_b.execute(("INCRBY", "other", 1)) == [2]
+        await worker_a.close()
+        await worker_b.close()
+        server.close()
+        await server.wait_closed()
+        return grants, stand_in
+
+    grants, stand_in = asyncio.run(scenario())
+    assert grants == [6, 4, 0]
+    assert stand_in.data["k"] == 10  # overshoot was handed back
+    assert stand_in.commands[0] == "SELECT"
+
+
+def test_encode_and_backend_spec(tmp_path):
+    assert encode_command("INCRBY", "k", 5) == b"*3\r\n$6\r\nINCRBY\r\n$1\r\nk\r\n$1\r\n5\r\n"
+    assert isinstance(quota_backend_from_spec("redis://cache:6380/1"), RedisQuotaBackend)
+    assert isinstance(quota_backend_from_spec(f"sqlite:{tmp_path / 'q.sqlite'}"), SQLiteQuotaBackend)
+    with pytest.raises(ValueError):
+        quota_backend_from_spec("memcached://x")
+
+
+def test_workers_lease_in_chunks_and_share_the_budget(tmp_path):
+    path = str(tmp_path / "quota.sqlite")
+    # 600 RPM -> 100 requests per 10 s window, leased 10 at a time
+    workers = [ClusterQuota(SQLiteQuotaBackend(path), requests_per_minute=600, window=10) for _ in range(2)]
+
+    async def scenario():
+        for _ in range(25):
+            for worker in workers:
+                await worker.acquire("east")
+
+    stay_inside_one_window(10)
+    asyncio.run(scenario())
+    # 50 calls each, but only a handful of backend round trips
+    assert [w.round_trips for w in workers] == [3, 3]
+    assert all(w.waits == 0 for w in workers)
+    assert workers[0].stats()["leased"] == {"east:requests": 5}
+
+
+def test_exhausted_window_waits_for_the_next(tmp_path):
+    quota = ClusterQuota(SQLiteQuotaBackend(str(tmp_path / "q.sqlite")), requests_per_minute=300, window=0.2)
+    assert quota.limits == {REQUESTS: 1}
+
+    async def scenario():
+        # Start just after a window boundary, so both calls fall in the same window
+        await asyncio.sleep(quota.window - time.time() % quota.window)
+        started = time.monotonic()
+        await quota.acquire("east")
+        await quota.acquire("east")
+        return time.monotonic() - started
+
+    # The second call waits out (nearly) the whole window the first one opened
+    assert asyncio.run(scenario()) >= 0.8 * quota.window
+    assert quota.waits == 1
+
+
+def test_tokens_are_reserved_and_refunded(tmp_path):
+    quota = ClusterQuota(SQLiteQuotaBackend(str(tmp_path / "q.sqlite")), tokens_per_minute=6000, window=10)
+    assert quota.limits == {TOKENS: 1000}
+    asyncio.run(quota.acquire("east", tokens=300))
+    assert quota.stats()["leased"]["east:tokens"] == 0
+    quota.refund("east", 120)
+    quota.refund("west", 50)  # nothing leased there: ignored
+    assert quota.stats()["leased"] == {"east:tokens": 120}
+
+
+def test_from_env_is_off_by_default(tmp_path, monkeypatch):
+    assert ClusterQuota.from_env() is None
+    monkeypatch.setenv("LLM_QUOTA_RPM", "120")
+    monkeypatch.setenv("LLM_QUOTA_BACKEND", f"sqlite:{tmp_path / 'q.sqlite'}")
+    quota = ClusterQuota.from_env()
+    assert quota.limits == {REQUESTS: 20}
+
+
+def test_completion_path_charges_the_cluster_quota(tmp_path):
+    class _Completions:
+        async def create(self, **kwargs):
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+                usage=SimpleNamespace(prompt_tokens=40, completion_tokens=10),
+            )
+
+    quota = ClusterQuota(SQLiteQuotaBackend(str(tmp_path / "q.sqlite")), requests_per_minute=600, tokens_per_minute=60000)
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions()))
+    with patch.object(appmod, "_llm_quota", quota), \
+         patch.object(appmod, "_router", LLMRouter([Deployment("east")])), \
+         patch.object(appmod, "get_openai_client", return_value=fake_client):
+        route = RouteDecision("default", 100, 0.4)
+        stay_inside_one_window(10)
+        assert asyncio.run(appmod.complete_chat([{"role": "user", "content": "hi"}], route)) == "ok"
+        stats = appmod.llm_stats()["quota"]
+    # One request leased in a chunk of 10; the unused part of the token reservation was refunded
+    assert stats["leased"]["east:requests"] == 9
+    assert stats["leased"]["east:tokens"] == 1000 - 50
+
+
+def test_waiting_for_quota_holds_no_scheduler_slot(tmp_path):
+    slots_held = []
+
+    class _Quota(ClusterQuota):
+        async def acquire(self, deployment, tokens=0):
+            slots_held.append(appmod.llm_scheduler.in_flight)
+            await super().acquire(deployment, tokens)
+
+    class _Completions:
+        async def create(self, **kwargs):
+            slots_held.append(appmod.llm_scheduler.in_flight)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))], usage=None)
+
+    quota = _Quota(SQLiteQuotaBackend(str(tmp_path / "q.sqlite")), requests_per_minute=600)
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions()))
+    with patch.object(appmod, "_llm_quota", quota), \
+         patch.object(appmod, "_router", LLMRouter([Deployment("east")])), \
+         patch.object(appmod, "get_openai_client", return_value=fake_client):
+        asyncio.run(appmod.complete_chat([{"role": "user", "content": "hi"}], RouteDecision("default", 100, 0.4)))
+    assert slots_held == [0, 1]
+
+    with pytest.raises(TypeError):
+        QuotaBackend()
@@ -0,0 +1,150 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+import app_main_under_test as appmod
+from api.rate_limit import (
+    DEFAULT_PATHS,
+    BucketBackend,
+    InMemoryBucketBackend,
+    RateLimiter,
+    RateLimitMiddleware,
+    Rule,
+    SQLiteBucketBackend,
+    backend_from_spec,
+    client_ip,
+    user_id_from_body,
+)
+
+
+def make_app(limiter):
+    app = FastAPI()
+
+    @app.post("/api/llm-advice")
+    async def advice(body: dict):
+        return {"echo": body.get("userId")}
+
+    @app.post("/api/llm-advice/partial")
+    async def partial(body: dict):
+        return {"echo": body.get("userId")}
+
+    @app.post("/other")
+    async def other():
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    return app
+
+
+def test_in_memory_bucket_refills():
+    async def scenario():
+        backend = InMemoryBucketBackend()
+        bucket = [("k", 2, 1000)]
+        first, = await backend.take(bucket)
+        second, = await backend.take(bucket)
+        third, = await backend.take(bucket)
+        await asyncio.sleep(0.01)
+        refilled, = await backend.take(bucket)
+        return first, second, third, refilled
+
+    first, second, third, refilled = asyncio.run(scenario())
+    assert first.allowed and second.allowed and first.remaining == 1
+    assert not third.allowed and 0 < third.retry_after <= 0.001
+    assert refilled.allowed
+
+
+def test_sqlite_backend_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "buckets.sqlite")
+    a, b = SQLiteBucketBackend(path), SQLiteBucketBackend(path)
+    assert asyncio.run(a.take([("user:u1", 1, 0.01)]))[0].allowed
+    denied, ip = asyncio.run(b.take([("user:u1", 1, 0.01), ("ip:1.2.3.4", 1, 0.01)]))
+    assert not denied.allowed and denied.retry_after > 90
+    # The IP bucket was not charged for the refused request
+    assert ip.allowed and asyncio.run(a.take([("ip:1.2.3.4", 1, 0.01)]))[0].allowed
+    a.close()
+    b.close()
+
+
+def test_a_refused_request_charges_no_bucket():
+    limiter = RateLimiter(user_rule=Rule("user", per_minute=1, burst=1), ip_rule=Rule("ip", per_minute=1, burst=2))
+    client = TestClient(make_app(limiter))
+    assert client.post("/api/llm-advice", json={"userId": "u1"}).status_code == 200
+    # u1 is out of tokens: refused without spending the IP's second token
+    assert client.post("/api/llm-advice", json={"userId": "u1"}).headers["X-RateLimit-Scope"] == "user"
+    assert client.post("/api/llm-advice", json={"userId": "u2"}).status_code == 200
+    assert client.post("/api/llm-advice", json={"userId": "u3"}).headers["X-RateLimit-Scope"] == "ip"
+
+    with pytest.raises(TypeError):
+        BucketBackend()
+
+
+def test_partial_posts_do_not_use_up_the_final_request():
+    limiter = RateLimiter(user_rule=Rule("user", per_minute=1, burst=5))
+    client = TestClient(make_app(limiter))
+    # The assessment posts each of its six sections before the final report
+    partials = [client.post("/api/llm-advice/partial", json={"userId": "u1"}).status_code for _ in range(6)]
+    assert partials == [200] * 5 + [429]
+    assert client.post("/api/llm-advice", json={"userId": "u1"}).status_code == 200
+
+
+def test_off_by_default_and_covers_the_partial_endpoint(monkeypatch):
+    for name in ("RATE_LIMIT_USER_PER_MIN", "RATE_LIMIT_IP_PER_MIN", "RATE_LIMIT_PATHS"):
+        monkeypatch.delenv(name, raising=False)
+    assert RateLimiter.from_env().rules == []
+    monkeypatch.setenv("RATE_LIMIT_USER_PER_MIN", "10")
+    limiter = RateLimiter.from_env()
+    assert [rule.name for rule in limiter.rules] == ["user"]
+    assert limiter.paths == DEFAULT_PATHS and "/api/llm-advice/partial" in DEFAULT_PATHS
+
+
+def test_backend_from_spec(tmp_path):
+    assert isinstance(backend_from_spec("memory"), InMemoryBucketBackend)
+    assert isinstance(backend_from_spec(f"sqlite:{tmp_path / 'b.sqlite'}"), SQLiteBucketBackend)
+    assert isinstance(backend_from_spec("api.rate_limit:InMemoryBucketBackend"), InMemoryBucketBackend)
+    with pytest.raises(ValueError):
+        backend_from_spec("redis")
+
+
+def test_user_limit_returns_429_with_retry_headers():
+    limiter = RateLimiter(user_rule=Rule("user", per_minute=1, burst=2), ip_rule=Rule("ip", per_minute=0, burst=0))
+    client = TestClient(make_app(limiter))
+    for _ in range(2):
+        assert client.post("/api/llm-advice", json={"userId": "u1"}).json() == {"echo": "u1"}
+    limited = client.post("/api/llm-advice", json={"userId": "u1"})
+    assert limited.status_code == 429
+    assert 1 <= int(limited.headers["Retry-After"]) <= 60
+    assert limited.headers["X-RateLimit-Limit"] == "2" and limited.headers["X-RateLimit-Scope"] == "user"
+    # Other users and other paths are unaffected
+    assert client.post("/api/llm-advice", json={"userId": "u2"}).status_code == 200
+    assert client.post("/other").status_code == 200
+    assert limiter.stats() == {"backend": "InMemoryBucketBackend", "allowed": 3, "limited": {"user": 1}}
+
+
+def test_ip_limit_applies_across_users_and_honours_forwarded_for():
+    limiter = RateLimiter(ip_rule=Rule("ip", per_minute=1, burst=1), trust_forwarded=True)
+    client = TestClient(make_app(limiter))
+    headers = {"X-Forwarded-For": "203.0.113.7, 10.0.0.1"}
+    assert client.post("/api/llm-advice", json={"userId": "a"}, headers=headers).status_code == 200
+    assert client.post("/api/llm-advice", json={"userId": "b"}, headers=headers).status_code == 429
+    assert client.post("/api/llm-advice", json={"userId": "c"}, headers={"X-Forwarded-For": "203.0.113.8"}).status_code == 200
+
+
+def test_helpers():
+    assert user_id_from_body(b'{"userId": "u1"}') == "u1"
+    assert user_id_from_body(b"not json") is None
+    assert user_id_from_body(b"[1, 2]") is None
+    assert client_ip({"client": ("1.2.3.4", 5)}, trust_forwarded=False) == "1.2.3.4"
+    assert client_ip({"headers": [(b"x-forwarded-for", b"9.9.9.9")], "client": None}, trust_forwarded=True) == "9.9.9.9"
+    assert client_ip({"headers": []}, trust_forwarded=False) is None
+
+
+def test_llm_advice_endpoint_is_limited_per_user():
+    payload = {"userId": "u-flood", "assessmentData": {"serviceOffering": {}}}
+    with patch.object(appmod.rate_limiter, "rules", [Rule("user", per_minute=1, burst=1)]):
+        client = TestClient(appmod.app)
+        assert client.post("/api/llm-advice", json=payload).status_code == 200
+        assert client.post("/api/llm-advice", json=payload).status_code == 429
+        assert client.get("/api/llm-stats").json()["rate_limit"]["limited"] == {"user": 1}
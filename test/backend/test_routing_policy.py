@@ -0,0 +1,75 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import app_main_under_test as appmod
+from api.llm_router import Deployment, LLMRouter
+from api.routing_policy import RouteDecision, RoutingPolicy, routing_policy_from_env
+
+POLICY = {
+    "default": {"max_tokens": 512, "temperature": 0.4},
+    "routes": {
+        "Keep_Doing": {"tier": "small", "max_tokens": 256},
+        "Scalable": {"temperature": 0.2},
+        "Scalable:Keep_Doing": {"max_tokens": 128},
+    },
+}
+
+
+def test_default_policy_matches_previous_parameters():
+    assert RoutingPolicy().decide("Profitable", "Start_Doing") == RouteDecision("default", 512, 0.4)
+
+
+def test_most_specific_route_wins():
+    policy = RoutingPolicy(**POLICY)
+    assert policy.decide("Profitable", "Start_Doing") == RouteDecision("default", 512, 0.4)
+    assert policy.decide("Profitable", "Keep_Doing") == RouteDecision("small", 256, 0.4)
+    assert policy.decide("Scalable", "Keep_Doing") == RouteDecision("small", 128, 0.2)
+
+
+def test_policy_from_env_accepts_json_or_file(monkeypatch, tmp_path):
+    monkeypatch.delenv("LLM_ROUTING_POLICY", raising=False)
+    assert routing_policy_from_env().routes == {}
+
+    monkeypatch.setenv("LLM_ROUTING_POLICY", json.dumps(POLICY))
+    assert routing_policy_from_env().decide("", "Keep_Doing").tier == "small"
+
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps(POLICY))
+    monkeypatch.setenv("LLM_ROUTING_POLICY", str(path))
+    assert routing_policy_from_env().decide("", "Keep_Doing").max_tokens == 256
+
+
+def test_router_pool_falls_back_to_all_deployments_for_unknown_tier():
+    big, small = Deployment("big"), Deployment("small-1", tier="small")
+    router = LLMRouter([big, small])
+    assert router.pool("small") == [small]
+    assert router.pool("missing") == [big, small]
+    assert router.pick(tier="small").name == "small-1"
+
+
+def test_keep_doing_goes_to_small_tier_with_lower_max_tokens():
+    calls = []
+
+    class _Completions:
+        async def create(self, **kwargs):
+            calls.append((kwargs["model"], kwargs["max_tokens"]))
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions()))
+    big, small = Deployment("big", model="gpt-big"), Deployment("small", model="gpt-small", tier="small")
+    # The small deployment looks faster, but untiered categories must stay off it
+    big.ewma_latency, small.ewma_latency = 2.0, 0.5
+    router = LLMRouter([big, small])
+    profile = {"industry": "Tech", "business_challenge": "Growth", "service_type": "N/A", "revenue_type": "N/A"}
+
+    with patch.object(appmod, "_router", router), \
+         patch.object(appmod, "_routing_policy", RoutingPolicy(**POLICY)), \
+         patch.object(appmod, "get_openai_client", return_value=fake_client):
+        for category in ("Keep_Doing", "Start_Doing"):
+            q = {"question_id": "question_00", "new_category": category, "catmapping": "Profitable"}
+            asyncio.run(appmod.generate_advice_for_question(q, profile))
+
+    assert calls[0] == ("gpt-small", 256)
+    assert calls[1] == ("gpt-big", 512)
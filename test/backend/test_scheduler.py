@@ -0,0 +1,118 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import app_main_under_test as appmod
+from api.llm_router import Deployment, LLMRouter
+from api.routing_policy import RouteDecision
+from api.scheduler import INTERACTIVE, JOB, PRECOMPUTE, PriorityScheduler, priority, priority_class, priority_user, set_priority, shares_from_env
+
+
+async def run_as(scheduler, cls, user, order, hold=0.0):
+    with priority(cls, user):
+        async with scheduler.slot():
+            order.append((cls, user))
+            await asyncio.sleep(hold)
+
+
+def test_higher_class_goes_first():
+    async def scenario():
+        scheduler = PriorityScheduler(lambda: 1)
+        order = []
+        first = asyncio.create_task(run_as(scheduler, JOB, "a", order, hold=0.01))
+        await asyncio.sleep(0)
+        waiting = [
+            asyncio.create_task(run_as(scheduler, PRECOMPUTE, "p", order)),
+            asyncio.create_task(run_as(scheduler, JOB, "b", order)),
+            asyncio.create_task(run_as(scheduler, INTERACTIVE, "c", order)),
+        ]
+        await asyncio.gather(first, *waiting)
+        return order
+
+    assert [cls for cls, _ in asyncio.run(scenario())] == [JOB, INTERACTIVE, JOB, PRECOMPUTE]
+
+
+def test_class_shares_cap_background_work():
+    async def scenario():
+        scheduler = PriorityScheduler(lambda: 4)
+        order = []
+        background = [asyncio.create_task(run_as(scheduler, PRECOMPUTE, "p", order, hold=0.02)) for _ in range(5)]
+        await asyncio.sleep(0.005)
+        assert scheduler.stats()["classes"][PRECOMPUTE]["in_flight"] == 1
+        interactive = [asyncio.create_task(run_as(scheduler, INTERACTIVE, f"u{i}", order, hold=0.001)) for i in range(3)]
+        await asyncio.gather(*interactive)
+        stats = scheduler.stats()
+        await asyncio.gather(*background)
+        return stats
+
+    stats = asyncio.run(scenario())
+    # Interactive requests found their slots free and never queued behind the precompute flood
+    assert stats["classes"][INTERACTIVE]["wait_p95_ms"] < 5
+    assert stats["classes"][PRECOMPUTE]["waiting"] == 4
+
+
+def test_users_are_served_fairly_within_a_class():
+    async def scenario():
+        scheduler = PriorityScheduler(lambda: 1)
+        order = []
+        tasks = [asyncio.create_task(run_as(scheduler, INTERACTIVE, "heavy", order, hold=0.001)) for _ in range(4)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(run_as(scheduler, INTERACTIVE, "light", order, hold=0.001)))
+        await asyncio.gather(*tasks)
+        return [user for _, user in order]
+
+    order = asyncio.run(scenario())
+    assert order.index("light") <= 2  # not behind all of heavy's queued calls
+
+
+def test_cancelled_waiter_frees_its_place():
+    async def scenario():
+        scheduler = PriorityScheduler(lambda: 1)
+        order = []
+        holder = asyncio.create_task(run_as(scheduler, INTERACTIVE, "a", order, hold=0.01))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(run_as(scheduler, INTERACTIVE, "b", order))
+        later = asyncio.create_task(run_as(scheduler, INTERACTIVE, "c", order))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(holder, later)
+        return order, scheduler.in_flight
+
+    order, in_flight = asyncio.run(scenario())
+    assert [user for _, user in order] == ["a", "c"] and in_flight == 0
+
+
+def test_priority_context_and_shares_from_env(monkeypatch):
+    with priority(JOB, "u1"):
+        assert (priority_class.get(), priority_user.get()) == (JOB, "u1")
+    assert (priority_class.get(), priority_user.get()) == (INTERACTIVE, "anonymous")
+    with pytest.raises(ValueError):
+        set_priority("urgent")
+    with pytest.raises(ValueError):
+        with priority("urgent"):
+            pass
+
+    monkeypatch.setenv("LLM_SCHED_SHARES", "job=0.3, precompute=0.1,bogus=1")
+    assert shares_from_env() == {INTERACTIVE: 1.0, JOB: 0.3, PRECOMPUTE: 0.1}
+
+
+def test_completions_go_through_the_scheduler():
+    class _Completions:
+        async def create(self, **kwargs):
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+    scheduler = PriorityScheduler(lambda: 2)
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions()))
+
+    async def call_as_job():
+        set_priority(JOB, "u1")
+        return await appmod.complete_chat([{"role": "user", "content": "hi"}], RouteDecision("default", 64, 0.4))
+
+    with patch.object(appmod, "llm_scheduler", scheduler), \
+         patch.object(appmod, "_router", LLMRouter([Deployment("east")])), \
+         patch.object(appmod, "get_openai_client", return_value=fake_client):
+        assert asyncio.run(call_as_job()) == "ok"
+    assert scheduler.stats()["classes"][JOB]["dispatched"] == 1
+    assert "scheduler" in appmod.llm_stats()
@@ -0,0 +1,79 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from starlette.testclient import TestClient
+
+import app_main_under_test as appmod
+from api.semantic_cache import SemanticCache, cosine, text_vector
+
+PROFILE = {"industry": "Education Technology", "business_challenge": "Lead generation", "service_type": "Platform", "revenue_type": "N/A"}
+
+
+def question(additional):
+    return {
+        "question_id": "question_01",
+        "new_category": "Do_More",
+        "catmapping": "Profitable",
+        "category": "Marketing",
+        "question": "Q1",
+        "anwser": "Agree",
+        "additionalText": additional,
+    }
+
+
+def test_vectors_are_normalised_and_ignore_case_and_punctuation():
+    a = text_vector("We sell to schools")
+    assert abs(cosine(a, a) - 1.0) < 1e-9
+    assert abs(cosine(a, text_vector("we SELL to schools!!")) - 1.0) < 1e-9
+    assert cosine(a, text_vector("Our clients are hospitals")) < 0.5
+    assert text_vector("  ...  ") == {}
+
+
+def test_lookup_hits_only_above_threshold_within_bucket():
+    cache = SemanticCache(threshold=0.8)
+    assert cache.lookup("b1", "we sell to schools") is None  # empty bucket
+    cache.store("b1", "We sell software to schools", "Advice A")
+    advice, similarity = cache.lookup("b1", "we sell software to schools.")
+    assert advice == "Advice A" and similarity > 0.99
+    assert cache.lookup("b1", "Our clients are hospitals") is None
+    assert cache.lookup("b2", "We sell software to schools") is None
+
+    stats = cache.stats()
+    assert stats["lookups"] == 4 and stats["hits"] == 1 and stats["hit_rate"] == 0.25
+    assert sum(stats["similarity_histogram"].values()) == 2
+    assert stats["similarity_histogram"]["0.95-1.00"] == 1
+
+
+def test_buckets_and_entries_are_bounded():
+    cache = SemanticCache(max_per_bucket=2, max_buckets=2)
+    for i in range(3):
+        cache.store("b1", f"note {i}", f"advice {i}")
+    cache.store("b2", "x", "y")
+    cache.store("b3", "x", "y")
+    stats = cache.stats()
+    assert stats["buckets"] == 2 and stats["entries"] == 2
+    assert cache.lookup("b1", "note 2") is None  # evicted with its bucket
+
+
+def test_generate_advice_reuses_advice_for_similar_free_text():
+    complete = AsyncMock(return_value="LLM advice")
+    with patch.object(appmod, "semantic_cache", SemanticCache(threshold=0.9)), \
+         patch.object(appmod, "complete_chat", complete), \
+         patch.object(appmod, "get_answer_text", return_value="Standard advice"):
+        first = asyncio.run(appmod.generate_advice_for_question(question("We sell to schools"), PROFILE))
+        second = asyncio.run(appmod.generate_advice_for_question(question("we sell to schools."), PROFILE))
+        third = asyncio.run(appmod.generate_advice_for_question(question("Hospitals buy from us"), PROFILE))
+        stats = TestClient(appmod.app).get("/api/llm-stats").json()["semantic_cache"]
+
+    assert first["advice"] == second["advice"] == third["advice"] == "LLM advice"
+    assert complete.await_count == 2
+    assert stats["hits"] == 1 and stats["entries"] == 2
+
+
+def test_failed_generation_is_not_cached():
+    with patch.object(appmod, "semantic_cache", SemanticCache()), \
+         patch.object(appmod, "complete_chat", AsyncMock(side_effect=RuntimeError("boom"))), \
+         patch.object(appmod, "get_answer_text", return_value=None):
+        result = asyncio.run(appmod.generate_advice_for_question(question("We sell to schools"), PROFILE))
+        assert result["advice"].startswith(appmod.ADVICE_ERROR_PREFIX)
+        assert appmod.semantic_cache.stats()["entries"] == 0
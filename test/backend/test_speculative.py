@@ -0,0 +1,138 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+from starlette.testclient import TestClient
+
+import app_main_under_test as appmod
+from api.degradation import LLMHealthMonitor
+from api.speculative import SpeculativeAdvice
+
+SECTION_A = {f"q{i}": {"question": f"A{i}", "category": "Marketing", "catmapping": "Profitable", "anwser": "Agree", "score": 1} for i in range(2)}
+SECTION_B = {f"q{i}": {"question": f"B{i}", "category": "Sales", "catmapping": "Repeatable", "anwser": "Disagree", "score": -1} for i in range(2)}
+
+
+def payload(*sections):
+    data = {"serviceOffering": {"industry": {"text": "Retail"}, "business-challenge": {"text": "Cashflow"}}}
+    for name, section in zip(("sectionA", "sectionB"), sections):
+        data[name] = section
+    return {"userId": "u-spec", "assessmentData": data}
+
+
+def test_schedule_take_and_join_in_flight():
+    async def scenario():
+        spec = SpeculativeAdvice(concurrency=1)
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "advice"
+
+        async def failing():
+            return None
+
+        assert spec.schedule("u", "fp1", slow)
+        assert not spec.schedule("u", "fp1", slow)  # already running
+        assert spec.schedule("u", "fp2", failing)
+        waiter = asyncio.create_task(spec.take("u", "fp1"))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        release.set()
+        assert await waiter == "advice"
+        assert not spec.schedule("u", "fp1", slow)  # result already stored
+        await asyncio.sleep(0.01)
+        assert await spec.take("u", "fp2") is None
+        assert await spec.take("other", "fp1") is None
+        return spec.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats == {
+        "scheduled": 2, "generated": 1, "failed": 1, "used": 1, "joined_in_flight": 1,
+        "preempted": 0, "dropped": 0, "in_flight": 0, "stored": 1,
+    }
+
+
+def test_queued_speculation_is_cancelled_instead_of_joined():
+    async def scenario():
+        spec = SpeculativeAdvice(concurrency=1, max_pending=2)
+        release = asyncio.Event()
+        queued_ran = []
+
+        async def slow():
+            await release.wait()
+            return "advice"
+
+        async def queued():
+            queued_ran.append(True)
+            return "late"
+
+        assert spec.schedule("u", "fp1", slow)
+        assert spec.schedule("u", "fp2", queued)
+        assert not spec.schedule("u", "fp3", queued)  # over max_pending
+        await asyncio.sleep(0)
+        # fp2 waits behind fp1 for the only slot: the caller gets nothing instead of waiting at job priority
+        assert await spec.take("u", "fp2") is None
+        assert spec.schedule("u", "fp2", queued)  # a new call may be scheduled under the same key
+        release.set()
+        assert await spec.take("u", "fp1") == "advice"
+        await asyncio.sleep(0.01)
+        assert queued_ran == [True] and await spec.take("u", "fp2") == "late"
+        return spec.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["preempted"] == 1 and stats["dropped"] == 1 and stats["joined_in_flight"] == 1
+    assert stats["in_flight"] == 0 and stats["used"] == 2
+
+
+def test_failed_speculation_falls_back_to_the_normal_path():
+    async def scenario():
+        spec = SpeculativeAdvice()
+
+        async def broken():
+            raise RuntimeError("LLM down")
+
+        assert spec.schedule("u", "fp", broken)
+        await asyncio.sleep(0)
+        # The failed call returns nothing instead of raising
+        assert await spec.take("u", "fp") is None
+        return spec.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["failed"] == 1 and stats["in_flight"] == 0 and stats["used"] == 0
+
+
+def test_final_report_reuses_speculative_sections():
+    generated = []
+
+    async def fake_generate(q, profile):
+        generated.append(q["question"])
+        return appmod.advice_result(q, f"advice {q['question']} {q['anwser']}")
+
+    with patch.object(appmod, "speculative_advice", SpeculativeAdvice()), \
+         patch.object(appmod, "generate_advice_for_question", side_effect=fake_generate), \
+         patch.object(appmod, "load_score_rules", return_value={}):
+        with TestClient(appmod.app) as client:
+            assert client.post("/api/llm-advice/partial", json=payload(SECTION_A)).json()["scheduled"] == 2
+            assert client.post("/api/llm-advice/partial", json=payload(SECTION_A)).json()["scheduled"] == 0
+            for _ in range(50):
+                if not appmod.speculative_advice.in_flight:
+                    break
+                time.sleep(0.01)
+
+            final = payload(SECTION_A, dict(SECTION_B))
+            final["assessmentData"]["sectionA"] = dict(SECTION_A, q1=dict(SECTION_A["q1"], anwser="Strongly Agree"))
+            generated.clear()
+            text = client.post("/api/llm-advice", json=final).json()["advice"]
+            stats = client.get("/api/llm-stats").json()["speculative"]
+
+    # q0 of section A is reused; the edited answer and section B are generated now
+    assert sorted(generated) == ["A1", "B0", "B1"]
+    assert "advice A0 Agree" in text and "advice A1 Strongly Agree" in text
+    assert stats["used"] == 1 and stats["generated"] == 2
+
+
+def test_partial_submission_is_ignored_while_degraded():
+    with patch.object(appmod, "llm_health", LLMHealthMonitor(mode="on")), \
+         patch.object(appmod, "speculative_advice", SpeculativeAdvice()):
+        response = TestClient(appmod.app).post("/api/llm-advice/partial", json=payload(SECTION_A))
+    assert response.status_code == 200 and response.json()["scheduled"] == 0
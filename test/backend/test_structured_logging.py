@@ -0,0 +1,106 @@
+import io
+import json
+import logging
+
+import pytest
+from starlette.testclient import TestClient
+
+import app_main_under_test as appmod
+from api.background_writer import BackgroundWriter
+from api.structured_logging import (
+    DroppingQueueHandler,
+    SamplingFilter,
+    configure_logging,
+    parse_levels,
+    set_request_id,
+)
+from api.tracing import InMemoryExporter, Tracer
+
+
+@pytest.fixture
+def captured():
+    """Route the logging pipeline into a buffer for the test, then restore the app's pipeline."""
+    stream = io.StringIO()
+    pipelines = []
+
+    def configure(**kwargs):
+        pipeline = configure_logging(handler=logging.StreamHandler(stream), **kwargs)
+        pipelines.append(pipeline)
+        return pipeline
+
+    def lines():
+        pipelines[-1].stop()  # flush the writer thread
+        return stream.getvalue().splitlines()
+
+    yield configure, lines
+    for pipeline in pipelines:
+        pipeline.stop()
+
+
+def test_records_are_json_with_request_id_and_extras(captured):
+    configure, lines = captured
+    configure()
+    set_request_id("req-1")
+    log = logging.getLogger("test.structured")
+    with Tracer(InMemoryExporter()).span("llm_advice") as span:
+        log.warning("advice failed for %s", "question_01", extra={"question_id": "question_01"})
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        log.exception("with traceback")
+
+    first, second = (json.loads(line) for line in lines())
+    assert first["message"] == "advice failed for question_01"
+    assert first["request_id"] == "req-1" and first["question_id"] == "question_01"
+    assert first["trace_id"] == span.trace_id and "trace_id" not in second
+    assert first["level"] == "WARNING" and first["logger"] == "test.structured"
+    assert "ValueError: boom" in second["exc"]
+
+
+def test_per_logger_levels_and_text_format(captured):
+    configure, lines = captured
+    configure(fmt="text", levels=parse_levels("test.quiet=ERROR, test.loud = debug,broken"))
+    set_request_id("req-2")
+    logging.getLogger("test.quiet").warning("hidden")
+    logging.getLogger("test.loud").info("shown")
+    output = lines()
+    assert len(output) == 1 and "[req-2] shown" in output[0]
+
+
+def test_debug_lines_are_sampled_per_request():
+    sampler = SamplingFilter(rate=0.5)
+
+    def record(level, request_id):
+        rec = logging.LogRecord("x", level, __file__, 1, "msg", None, None)
+        rec.request_id = request_id
+        return rec
+
+    for i in range(50):
+        kept = {sampler.filter(record(logging.DEBUG, f"r{i}")) for _ in range(5)}
+        assert len(kept) == 1  # all or nothing per request
+        assert sampler.filter(record(logging.WARNING, f"r{i}"))
+    assert 0 < sampler.sampled_out < 250
+
+    assert not SamplingFilter(rate=0.0).filter(record(logging.DEBUG, None))
+
+
+def test_records_are_resolved_before_queueing_and_dropped_once_closed():
+    written = []
+    writer = BackgroundWriter(written.extend, name="test-log-writer", max_queue=1)
+    handler = DroppingQueueHandler(writer)
+    handler.emit(logging.LogRecord("x", logging.INFO, __file__, 1, "msg %s", ("a",), None))
+    writer.close()
+    for _ in range(2):
+        handler.emit(logging.LogRecord("x", logging.INFO, __file__, 1, "msg %s", ("b",), None))
+    assert [r.msg for r in written] == ["msg a"] and written[0].args is None
+    assert handler.dropped == 2
+
+
+def test_request_id_header_is_echoed_or_generated():
+    # Entering the client runs the app's startup, which installs the logging pipeline
+    with TestClient(appmod.app) as client:
+        assert client.get("/healthz", headers={"X-Request-ID": "abc-123"}).headers["x-request-id"] == "abc-123"
+        generated = client.get("/healthz", headers={"X-Request-ID": "x" * 500}).headers["x-request-id"]
+        assert len(generated) == 32
+        assert set(client.get("/api/llm-stats").json()["logging"]) == {"queued", "dropped", "sampled_out"}
+    assert appmod.log_pipeline.handler not in logging.getLogger().handlers  # removed again on shutdown
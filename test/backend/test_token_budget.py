@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import app_main_under_test as appmod
+from api.llm_router import Deployment, LLMRouter
+from api.token_budget import (
+    TokenLedger,
+    count_message_tokens,
+    count_shared_tokens,
+    count_tokens,
+    fit_fields,
+    trim_to_tokens,
+)
+
+PROFILE = {"industry": "Tech", "business_challenge": "Growth", "service_type": "N/A", "revenue_type": "N/A"}
+
+
+def test_count_tokens_and_message_overhead():
+    assert count_tokens("") == 0
+    assert count_tokens("hello world") >= 2
+    messages = [{"role": "system", "content": "a"}, {"role": "user", "content": "b"}]
+    assert count_message_tokens(messages) > count_tokens("a") + count_tokens("b")
+
+
+def test_only_shared_text_is_cached():
+    count_shared_tokens.cache_clear()
+    messages = [{"role": "system", "content": "shared prompt"}, {"role": "user", "content": "my private answer"}]
+    count_message_tokens(messages)
+    fit_fields({"retrieved_text": "tip", "user_answer": "secret " * 10}, 5, shared=("retrieved_text",))
+    assert count_shared_tokens.cache_info().currsize == 2  # the system prompt and the tip
+
+
+def test_trim_to_tokens_respects_limit():
+    text = "word " * 500
+    trimmed = trim_to_tokens(text, 50)
+    assert count_tokens(trimmed) <= 50
+    assert trimmed.endswith("...")
+    assert trim_to_tokens("short", 50) == "short"
+
+
+def test_fit_fields_keeps_short_fields_whole_and_shares_the_rest():
+    fields = {"short": "tiny answer", "long_a": "alpha " * 400, "long_b": "beta " * 400}
+    fitted = fit_fields(fields, 200)
+    assert fitted["short"] == "tiny answer"
+    assert sum(count_tokens(v) for v in fitted.values()) <= 200
+    assert abs(count_tokens(fitted["long_a"]) - count_tokens(fitted["long_b"])) <= 2
+    assert fit_fields({"a": "x"}, 100) == {"a": "x"}
+
+
+def test_ledger_totals_and_per_deployment():
+    ledger = TokenLedger()
+    ledger.record("east", 100, 20, estimated_prompt_tokens=90)
+    ledger.record("west", 50, 10, trimmed=True)
+    stats = ledger.stats()
+    assert (stats["calls"], stats["prompt_tokens"], stats["completion_tokens"]) == (2, 150, 30)
+    assert stats["estimated_prompt_tokens"] == 140
+    assert stats["trimmed_prompts"] == 1
+    assert stats["tokens_per_minute"] == 180.0
+    assert stats["per_deployment"]["east"] == {"calls": 1, "prompt_tokens": 100, "completion_tokens": 20}
+
+
+def test_long_additional_text_is_trimmed_to_budget(monkeypatch):
+    monkeypatch.setenv("LLM_PROMPT_TOKEN_BUDGET", "900")
+    q = {"question_id": "question_00", "new_category": "Do_More", "anwser": "Agree", "additionalText": "detail " * 5000}
+    messages, trimmed = appmod.build_advice_messages(q, PROFILE, "Standard text")
+    assert trimmed
+    assert count_message_tokens(messages) <= 900
+    assert "Standard text" in messages[1]["content"]
+
+    short = dict(q, additionalText="just a note")
+    messages, trimmed = appmod.build_advice_messages(short, PROFILE, "Standard text")
+    assert not trimmed and "Agree - just a note" in messages[1]["content"]
+
+
+def test_usage_is_recorded_per_call():
+    class _Completions:
+        async def create(self, **kwargs):
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+                usage=SimpleNamespace(prompt_tokens=321, completion_tokens=12),
+            )
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions()))
+    ledger = TokenLedger()
+    q = {"question_id": "question_00", "new_category": "Do_More", "catmapping": "Profitable"}
+    with patch.object(appmod, "_router", LLMRouter([Deployment("east")])), \
+         patch.object(appmod, "token_ledger", ledger), \
+         patch.object(appmod, "get_openai_client", return_value=fake_client):
+        asyncio.run(appmod.generate_advice_for_question(q, PROFILE))
+
+    assert ledger.per_deployment["east"] == {"calls": 1, "prompt_tokens": 321, "completion_tokens": 12}
+    assert ledger.estimated_prompt_tokens > 0
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import sys
+import types
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from starlette.testclient import TestClient
+
+import app_main_under_test as appmod
+from api.llm_router import Deployment, LLMRouter
+from api.routing_policy import RouteDecision
+from api.tracing import NOOP_SPAN, FileExporter, InMemoryExporter, Tracer, current_span, tracer_from_env
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    exporter = InMemoryExporter()
+    monkeypatch.setattr(appmod.tracer, "exporter", exporter)
+    return exporter
+
+
+def test_nested_and_concurrent_spans_share_the_trace():
+    exporter = InMemoryExporter()
+    tracer = Tracer(exporter)
+
+    async def child(i):
+        with tracer.span("child", index=i):
+            await asyncio.sleep(0)
+
+    async def run():
+        with tracer.span("root") as root:
+            await asyncio.gather(*[child(i) for i in range(3)])
+            current_span().set_attribute("done", True)
+        return root
+
+    root = asyncio.run(run())
+    children = exporter.by_name("child")
+    assert len(children) == 3
+    assert {c.parent_id for c in children} == {root.span_id}
+    assert {c.trace_id for c in children} == {root.trace_id}
+    assert sorted(c.attributes["index"] for c in children) == [0, 1, 2]
+    assert root.attributes["done"] is True
+    assert current_span() is NOOP_SPAN
+
+
+def test_errors_are_recorded_and_unsampled_traces_export_nothing():
+    exporter = InMemoryExporter()
+    tracer = Tracer(exporter)
+    with pytest.raises(RuntimeError):
+        with tracer.span("boom"):
+            raise RuntimeError("upstream down")
+    assert exporter.spans[0].status == "error"
+    assert exporter.spans[0].attributes["error.message"] == "upstream down"
+
+    unsampled = Tracer(exporter, sample_rate=0.0)
+    with unsampled.span("root"):
+        with unsampled.span("child") as child:
+            child.set_attribute("ignored", 1)
+    assert len(exporter.spans) == 1
+
+
+def test_file_exporter_writes_json_lines(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    exporter = FileExporter(str(path))
+    tracer = Tracer(exporter)
+    with tracer.span("root"):
+        with tracer.span("child", question_id="q1"):
+            pass
+    exporter.shutdown()
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["name"] for r in records] == ["child", "root"]
+    assert records[0]["parent_id"] == records[1]["span_id"]
+    assert records[0]["attributes"] == {"question_id": "q1"}
+
+
+def test_tracer_from_env(monkeypatch, tmp_path, capsys):
+    monkeypatch.setenv("TRACE_EXPORTER", "console")
+    with tracer_from_env().span("printed"):
+        pass
+    assert json.loads(capsys.readouterr().err)["name"] == "printed"
+
+    monkeypatch.setenv("TRACE_EXPORTER", f"file:{tmp_path / 't.jsonl'}")
+    assert isinstance(tracer_from_env().exporter, FileExporter)
+
+    monkeypatch.setenv("TRACE_EXPORTER", "otel")
+    monkeypatch.setitem(sys.modules, "opentelemetry", None)  # as if it were not installed
+    assert not tracer_from_env().enabled
+
+    monkeypatch.setenv("TRACE_EXPORTER", "jaeger")
+    with pytest.raises(ValueError):
+        tracer_from_env()
+
+
+def test_otel_sample_rate_goes_to_the_sdk_sampler(monkeypatch):
+    provider = SimpleNamespace(sampler="always_on")
+    otel_trace = types.ModuleType("opentelemetry.trace")
+    otel_trace.get_tracer_provider = lambda: provider
+    otel_trace.get_tracer = lambda name: SimpleNamespace()
+    sampling = types.ModuleType("opentelemetry.sdk.trace.sampling")
+    sampling.TraceIdRatioBased = lambda rate: ("ratio", rate)
+    sampling.ParentBased = lambda root: ("parent_based", root)
+    otel = types.ModuleType("opentelemetry")
+    otel.trace = otel_trace
+    for name, module in {"opentelemetry": otel, "opentelemetry.trace": otel_trace, "opentelemetry.sdk": types.ModuleType("sdk"),
+                         "opentelemetry.sdk.trace": types.ModuleType("sdk.trace"), "opentelemetry.sdk.trace.sampling": sampling}.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    for name in ("OTEL_TRACES_SAMPLER", "OTEL_TRACES_SAMPLER_ARG"):
+        monkeypatch.setenv(name, "")  # restored afterwards
+        monkeypatch.delenv(name)
+    monkeypatch.setenv("TRACE_EXPORTER", "otel")
+    monkeypatch.setenv("TRACE_SAMPLE_RATE", "0.25")
+
+    assert tracer_from_env().enabled
+    assert provider.sampler == ("parent_based", ("ratio", 0.25))
+    # SDK providers created later pick the rate up from the environment
+    assert os.environ["OTEL_TRACES_SAMPLER"] == "parentbased_traceidratio" and os.environ["OTEL_TRACES_SAMPLER_ARG"] == "0.25"
+
+    # An explicit OTel sampler configuration wins
+    provider.sampler = "configured"
+    monkeypatch.setenv("OTEL_TRACES_SAMPLER", "always_off")
+    tracer_from_env()
+    assert provider.sampler == "configured"
+
+
+def test_llm_advice_request_produces_one_trace(spans):
+    payload = {
+        "userId": "u-trace",
+        "assessmentData": {
+            "serviceOffering": {"industry": {"text": "Retail"}},
+            "sectionA": {
+                "q1": {"question": "Q1", "score": 0.5, "category": "Marketing", "catmapping": "Profitable"},
+                "q2": {"question": "Q2", "score": -1, "category": "Sales", "catmapping": "Profitable"},
+            },
+        },
+    }
+    assert TestClient(appmod.app).post("/api/llm-advice", json=payload).status_code == 200
+
+    (root,) = spans.by_name("llm_advice")
+    assert root.attributes["outcome"] == "ok" and root.attributes["questions"] == 2
+    assert {span.trace_id for span in spans.spans} == {root.trace_id}
+    assert spans.by_name("extract_business_profile")[0].parent_id == root.span_id
+    assert spans.by_name("scoring")[0].attributes["rescored"] == 2
+
+    generated = spans.by_name("generate_advice_for_question")
+    assert len(generated) == 2 and {span.parent_id for span in generated} == {root.span_id}
+    assert all(span.attributes["cache"] == "miss" for span in generated)
+    assert all(span.status == "error" for span in generated)  # no LLM configured in tests
+    lookups = spans.by_name("get_answer_text")
+    assert {span.parent_id for span in lookups} == {span.span_id for span in generated}
+    assert {(span.attributes["question_id"], span.attributes["category"]) for span in lookups} == {
+        (span.attributes["question_id"], span.attributes["category"]) for span in generated
+    }
+
+
+def test_llm_call_span_carries_deployment_and_tokens(spans):
+    class _Completions:
+        async def create(self, **kwargs):
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+                usage=SimpleNamespace(prompt_tokens=12, completion_tokens=3),
+            )
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions()))
+    with patch.object(appmod, "_router", LLMRouter([Deployment("trace-east")])), \
+         patch.object(appmod, "get_openai_client", return_value=fake_client):
+        asyncio.run(appmod.complete_chat([{"role": "user", "content": "hi"}], RouteDecision("default", 64, 0.4)))
+
+    (call,) = spans.by_name("llm_call")
+    assert call.attributes == {
+        "deployment": "trace-east", "tier": "default", "outcome": "ok", "prompt_tokens": 12, "completion_tokens": 3
+    }
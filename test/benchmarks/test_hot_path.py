@@ -0,0 +1,84 @@
+"""
+Micro-benchmarks of the /api/llm-advice hot path (not part of the default test run).
+
+Needs pytest-benchmark (requirements-dev.txt). Run from the repository root:
+    pytest test/benchmarks --no-cov --benchmark-json=bench.json
+"""
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import app_main_under_test as appmod  # noqa: E402
+from api.assessment_generator import AssessmentGenerator  # noqa: E402
+from api.models import LLMAdviceRequest  # noqa: E402
+
+SIZES = [34, 340, 3400]
+RULES_CSV = "api/score_rule.csv"
+
+
+def scaled_assessment(questions: int, seed: int = 7):
+    return AssessmentGenerator(seed).assessment(questions)
+
+
+@pytest.fixture(scope="module")
+def score_rules():
+    return appmod.load_score_rules(RULES_CSV)
+
+
+def test_load_score_rules(benchmark):
+    rules = benchmark(appmod.load_score_rules, RULES_CSV)
+    assert len(rules) == 34
+
+
+def test_check_weighting(benchmark, score_rules):
+    service_offering = AssessmentGenerator(7).service_offering()
+    benchmark(appmod.check_weighting, score_rules["question_00"], service_offering)
+
+
+def test_extract_business_profile(benchmark):
+    service_offering = AssessmentGenerator(7).service_offering()
+    profile = benchmark(appmod.extract_business_profile, service_offering)
+    assert "N/A" not in profile.values()
+
+
+@pytest.mark.benchmark(group="enumeration")
+@pytest.mark.parametrize("questions", SIZES)
+def test_question_enumeration_and_scoring(benchmark, score_rules, questions):
+    assessment = scaled_assessment(questions)
+    service_offering = assessment["serviceOffering"]
+
+    def enumerate_and_score():
+        all_questions = appmod.collect_questions(assessment)
+        for i, q in enumerate(all_questions):
+            # The rule file covers the 34 real questions; larger inputs reuse them
+            appmod.score_question(q, score_rules.get(f"question_{i % 34:02d}", []), service_offering)
+        return all_questions
+
+    benchmark.extra_info["questions"] = questions
+    assert len(benchmark(enumerate_and_score)) == questions
+
+
+@pytest.mark.benchmark(group="assembly")
+@pytest.mark.parametrize("questions", SIZES)
+def test_phase_grouping_and_assembly(benchmark, questions):
+    results = [
+        appmod.advice_result(q, "Focus on the next step. " * 8)
+        for q in appmod.collect_questions(scaled_assessment(questions))
+    ]
+    benchmark.extra_info["questions"] = questions
+    text = benchmark(appmod.assemble_advice_text, results)
+    assert text.startswith("Based on your assessment results")
+
+
+@pytest.mark.benchmark(group="validation")
+@pytest.mark.parametrize("questions", SIZES)
+def test_request_validation(benchmark, questions):
+    payload = {"userId": "bench", "assessmentData": scaled_assessment(questions)}
+
+    def validate():
+        # What the handler does: validate the body, then dump assessmentData back to dicts
+        return LLMAdviceRequest.model_validate(payload).assessmentData.model_dump()
+
+    benchmark.extra_info["questions"] = questions
+    assert len(benchmark(validate)) == 7
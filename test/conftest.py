@@ -3,8 +3,8 @@ Pytest bootstrap for backend tests.
 
 - Ensures repository working directory and import paths are correct.
 - Makes `backend/api` resolvable as the `api` package for absolute imports.
-- Provides tiny stubs for OpenAI and Cosmos retriever so tests do not depend
-  on external services or secrets.
+- Provides a tiny Cosmos retriever stub and installs the async OpenAI fake
+  (``api.fake_openai``) so tests do not depend on external services or secrets.
 - Ensures runtime asset `api/score_rule.csv` exists at CWD for code that uses
   relative path loading.
 """
@@ -18,6 +18,8 @@ import shutil
 import sys
 import types
 
+import pytest
+
 
 REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
 PROJECT_BACKEND_DIR = REPO_ROOT / "backend"
@@ -36,12 +38,16 @@ def _load(name: str, path: str):
     return mod
 
 
-def pytest_configure(config):  # noqa: ARG001  (pytest hook signature)
+def pytest_configure(config):
     """
     Prepare runtime environment before any tests are collected:
+    - register the ``allow_loop_blocks`` marker;
     - chdir to repo root;
     - ensure ./api/score_rule.csv exists (copy from backend/api if needed).
     """
+    config.addinivalue_line(
+        "markers", "allow_loop_blocks: the test blocks the event loop on purpose (exempt from LOOP_BLOCK_FAIL_MS)"
+    )
     os.chdir(str(REPO_ROOT))
     (REPO_ROOT / "api").mkdir(exist_ok=True)
     src = API_DIR / "score_rule.csv"
@@ -57,7 +63,7 @@ def pytest_sessionstart(session):  # noqa: ARG001  (pytest hook signature)
     """
     Make application imports resolvable and install test doubles:
     - alias backend/api as top-level package 'api';
-    - install a minimal cosmos retriever and openai client stub;
+    - install a minimal cosmos retriever and the openai fake;
     - (optionally) import the FastAPI app to catch import errors early.
     """
     # Alias `backend/api` as package "api"
@@ -83,33 +89,61 @@ def pytest_sessionstart(session):  # noqa: ARG001  (pytest hook signature)
     cr.get_answer_text = get_answer_text  # type: ignore[attr-defined]
     sys.modules["api.cosmos_retriever"] = cr
 
-    # Provide a tiny OpenAI stub compatible with app usage
-    class _Msg:
-        def __init__(self, content: str) -> None:
-            self.content = content
-
-    class _Choice:
-        def __init__(self, content: str) -> None:
-            self.message = _Msg(content)
-
-    class _Resp:
-        def __init__(self, content: str) -> None:
-            self.choices = [_Choice(content)]
-
-    class _Completions:
-        def create(self, **kwargs):  # noqa: ANN003
-            return _Resp("Stubbed LLM advice")
-
-    class _Chat:
-        def __init__(self) -> None:
-            self.completions = _Completions()
-
-    class _AzureOpenAI:
-        def __init__(self, *args, **kwargs) -> None:  # noqa: ANN002, ANN003
-            self.chat = _Chat()
-
-    sys.modules["openai"] = types.SimpleNamespace(AzureOpenAI=_AzureOpenAI)
+    # Answer LLM calls with the async fake (instant, no errors unless FAKE_LLM_* say otherwise)
+    _load("api.fake_openai", str(API_DIR / "fake_openai.py")).install()
 
     # Optionally preload the app to fail fast on import issues.
     if MAIN_FILE.exists():
         _load("app_main_under_test", str(MAIN_FILE))
+
+
+@pytest.fixture(autouse=True)
+def _fresh_app_state():
+    """Each test starts without previous per-user results, so reports never carry over between tests."""
+    appmod = sys.modules.get("app_main_under_test")
+    if appmod is None or not hasattr(appmod, "user_results"):
+        yield
+        return
+    original_results = appmod.user_results
+    appmod.user_results = type(original_results)()
+    try:
+        yield
+    finally:
+        appmod.user_results = original_results
+
+
+@pytest.fixture(autouse=True)
+def _fail_on_loop_blocks(request):
+    """With LOOP_BLOCK_FAIL_MS set, fail any test during which a request blocked the app's event
+    loop for longer than that many milliseconds, showing the blocking stack."""
+    fail_ms = os.getenv("LOOP_BLOCK_FAIL_MS")
+    appmod = sys.modules.get("app_main_under_test")
+    monitor = getattr(appmod, "loop_monitor", None)
+    if not fail_ms or monitor is None or request.node.get_closest_marker("allow_loop_blocks"):
+        yield
+        return
+    saved_threshold, saved_stack = monitor.threshold, appmod.app.middleware_stack
+    monitor.threshold = float(fail_ms) / 1000
+    stack = saved_stack or appmod.app.build_middleware_stack()
+
+    async def monitored(scope, receive, send):
+        # A TestClient used without `with` skips the app's startup, which attaches the monitor
+        monitor.ensure_running()
+        await stack(scope, receive, send)
+
+    appmod.app.middleware_stack = monitored
+    seen = monitor.blocks_total
+    try:
+        yield
+    finally:
+        monitor.threshold = saved_threshold
+        appmod.app.middleware_stack = saved_stack
+    new_blocks = list(monitor.blocks)[-(monitor.blocks_total - seen):] if monitor.blocks_total > seen else []
+    if new_blocks:
+        block = new_blocks[-1]
+        duration = "unknown" if block.duration is None else f"{block.duration * 1000:.0f} ms"
+        pytest.fail(
+            f"{len(new_blocks)} event-loop block(s) over {fail_ms} ms (last: {duration}) at:\n"
+            + "".join(block.stack),
+            pytrace=False,
+        )